@@ -0,0 +1,271 @@
+# baseline_store.py
+"""
+Per weekday × IRIS period baselines over every capture loaded into the database.
+
+_compute_baselines() works from the samples of the capture being analysed, so
+comparing this Tuesday with the last eight would mean reading all eight
+captures again. The baseline_history table instead keeps running statistics
+of every mgstat sample loaded into the database (the first -i run and each -a
+append) for each (weekday, period, metric): sample count, mean, M2 (the sum of
+squared differences from the mean, for sigma), max, and a p95 sketch. Each
+load folds its new samples in with the parallel form of Welford's update, so
+the baselines of months of captures cost the same to read as those of one.
+
+The sketch counts samples in logarithmic buckets, each SKETCH_ACCURACY
+(relative) either side of its value, so a percentile read from it is within
+about 1% of the exact one and the sketches of separate loads add up bucket by
+bucket. Values of zero or less share one bucket.
+
+The baseline_progress table records the last mgstat rowid folded in and
+update() reads only the rows after it, so it is cheap to call after every load
+and before every analysis.
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+
+import performance_analysis as _pa
+from datetime_resolver import parse_datetimes
+
+
+BASELINES_TABLE = "baseline_history"
+PROGRESS_TABLE = "baseline_progress"
+
+# Bump when the statistics change so the history is rebuilt from the mgstat table.
+BASELINE_VERSION = 1
+
+# The baseline-relative mgstat metrics (as in llm_context.build_llm_context)
+BASELINE_METRICS = ("Glorefs", "PhyRds", "PhyWrs", "Gloupds", "Jrnwrts", "Rdratio")
+
+SKETCH_ACCURACY = 0.01
+
+# Combinations with fewer samples have no baseline, as in _compute_baselines()
+MIN_SAMPLES = 3
+
+# mgstat rows read per query when folding in new rows
+CHUNK_ROWS = 200_000
+
+_GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+_LOG_GAMMA = np.log(_GAMMA)
+
+
+class RunningStats:
+    """Count, mean, M2, max and bucket sketch of one (weekday, period, metric)."""
+
+    def __init__(self, n=0, mean=0.0, m2=0.0, maximum=-np.inf, zeros=0, buckets=None):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.max = maximum
+        self.zeros = zeros  # samples of zero or less
+        self.buckets = buckets if buckets is not None else {}  # bucket -> samples
+
+    def merge(self, other):
+        """Add other's samples to these statistics."""
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.max = max(self.max, other.max)
+        self.zeros += other.zeros
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+
+    @property
+    def sigma(self):
+        """Sample standard deviation, 0 for a single sample (as pandas' std)."""
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else 0.0
+
+    def _value(self, i):
+        """The i-th smallest sample (from 0), as the sketch has it."""
+        if i < self.zeros:
+            return 0.0
+        seen = self.zeros
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > i:
+                return min(2 * _GAMMA ** bucket / (_GAMMA + 1), self.max)
+        return self.max
+
+    def quantile(self, q):
+        """The q quantile from the sketch, interpolated between samples like np.percentile."""
+        rank = q * (self.n - 1)
+        below = int(np.floor(rank))
+        lower = self._value(below)
+        return lower + (self._value(below + 1) - lower) * (rank - below) if rank > below else lower
+
+
+def _bucket(values):
+    """Sketch bucket of each (positive) value: value is in (gamma ** (bucket - 1), gamma ** bucket]."""
+    return np.ceil(np.log(values) / _LOG_GAMMA).astype(np.int64)
+
+
+def _pack_sketch(buckets):
+    buffer = io.BytesIO()
+    np.savez(buffer, buckets=np.array(list(buckets), dtype=np.int64),
+             counts=np.array(list(buckets.values()), dtype=np.int64))
+    return buffer.getvalue()
+
+
+def _unpack_sketch(blob):
+    arrays = np.load(io.BytesIO(blob))
+    return dict(zip(arrays["buckets"].tolist(), arrays["counts"].tolist()))
+
+
+def sample_stats(df, metrics):
+    """{(weekday, period, metric): RunningStats} of the samples in df (with a 'dt' column)."""
+    df = _pa._with_periods(df)
+    if df is None or df.empty or "_period" not in df.columns:
+        return {}
+    metrics = [m for m in metrics if m in df.columns]
+    if not metrics:
+        return {}
+    df = df[df["_period"].notna()]
+    keys = ["_weekday", "_period", "metric"]
+    long = df.melt(id_vars=keys[:2], value_vars=metrics, var_name="metric", value_name="value")
+    long["value"] = pd.to_numeric(long["value"], errors="coerce")
+    long = long.dropna(subset=["value"])
+    if long.empty:
+        return {}
+
+    grouped = long.groupby(keys, observed=True)["value"]
+    agg = grouped.agg(["count", "mean", "max"])
+    agg["m2"] = grouped.var(ddof=0).fillna(0.0) * agg["count"]
+    agg["zeros"] = (long["value"] <= 0).groupby([long[k] for k in keys], observed=True).sum()
+    positive = long[long["value"] > 0]
+    buckets = positive.groupby(keys + [pd.Series(_bucket(positive["value"].to_numpy()), index=positive.index,
+                                                 name="bucket")], observed=True).size()
+
+    stats = {
+        key: RunningStats(int(row["count"]), float(row["mean"]), float(row["m2"]), float(row["max"]),
+                          int(row["zeros"]))
+        for key, row in zip(agg.index, agg.to_dict("records"))
+    }
+    for key, counts in buckets.groupby(level=[0, 1, 2], observed=True):
+        stats[key].buckets = dict(zip(counts.index.get_level_values(3).tolist(), counts.tolist()))
+    return stats
+
+
+def _table_exists(connection, table_name):
+    cursor = connection.execute("SELECT count(name) FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
+    return cursor.fetchone()[0] == 1
+
+
+def _sample_times(chunk):
+    """'dt' for mgstat rows from RunDate + RunTime; NaT where they do not parse."""
+    values = chunk["RunDate"].astype(str).str.strip() + " " + chunk["RunTime"].astype(str).str.strip()
+    try:
+        return parse_datetimes(values)
+    except (ValueError, OverflowError):
+        return pd.to_datetime(values, errors="coerce", format="mixed")
+
+
+class BaselineStore:
+    """The baseline_history table: running statistics of every mgstat sample loaded into the database."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {BASELINES_TABLE} "
+            "(weekday TEXT, period TEXT, metric TEXT, n INTEGER, mean REAL, m2 REAL, max REAL, zeros INTEGER, "
+            "sketch BLOB, PRIMARY KEY (weekday, period, metric))"
+        )
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} "
+            "(source TEXT PRIMARY KEY, version INTEGER, last_rowid INTEGER, samples INTEGER, "
+            "first_time TEXT, last_time TEXT)"
+        )
+
+    def _progress(self):
+        """(last rowid, samples, first time, last time) folded in so far; nothing for another version."""
+        row = self.connection.execute(
+            f"SELECT last_rowid, samples, first_time, last_time FROM {PROGRESS_TABLE} "
+            "WHERE source = 'mgstat' AND version = ?", (BASELINE_VERSION,)
+        ).fetchone()
+        return row if row is not None else (0, 0, None, None)
+
+    def load(self):
+        """{(weekday, period, metric): RunningStats} of the stored history."""
+        rows = self.connection.execute(
+            f"SELECT weekday, period, metric, n, mean, m2, max, zeros, sketch FROM {BASELINES_TABLE}"
+        ).fetchall()
+        return {
+            (weekday, period, metric): RunningStats(n, mean, m2, maximum, zeros, _unpack_sketch(sketch))
+            for weekday, period, metric, n, mean, m2, maximum, zeros, sketch in rows
+        }
+
+    def update(self, metrics=BASELINE_METRICS):
+        """Fold the mgstat rows loaded since the last update into the history. Returns the rows read."""
+        if not _table_exists(self.connection, "mgstat"):
+            return 0
+        columns = {row[1] for row in self.connection.execute('PRAGMA table_info("mgstat")')}
+        metrics = [m for m in metrics if m in columns]
+        if not metrics or not {"RunDate", "RunTime"} <= columns:
+            return 0
+        last_rowid, samples, first_time, last_time = self._progress()
+        if last_rowid == 0:
+            # A first update, or a history of another version: rebuild it
+            self.connection.execute(f"DELETE FROM {BASELINES_TABLE}")
+        end_rowid = self.connection.execute("SELECT max(rowid) FROM mgstat").fetchone()[0] or 0
+        if end_rowid <= last_rowid:
+            return 0
+
+        stats = self.load()
+        read = 0
+        select = ", ".join(f'"{m}"' for m in metrics)
+        for chunk in pd.read_sql_query(
+            f"SELECT RunDate, RunTime, {select} FROM mgstat WHERE rowid > ? AND rowid <= ?",
+            self.connection, params=(last_rowid, end_rowid), chunksize=CHUNK_ROWS,
+        ):
+            read += len(chunk)
+            chunk = chunk.dropna(subset=["RunDate", "RunTime"])
+            chunk["dt"] = _sample_times(chunk)
+            chunk = chunk.dropna(subset=["dt"])
+            if chunk.empty:
+                continue
+            samples += len(chunk)
+            first, last = chunk["dt"].min().isoformat(sep=" "), chunk["dt"].max().isoformat(sep=" ")
+            first_time = min(first_time, first) if first_time else first
+            last_time = max(last_time, last) if last_time else last
+            for key, new in sample_stats(chunk, metrics).items():
+                stats.setdefault(key, RunningStats()).merge(new)
+
+        self.connection.executemany(
+            f"INSERT OR REPLACE INTO {BASELINES_TABLE} "
+            "(weekday, period, metric, n, mean, m2, max, zeros, sketch) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(weekday, period, metric, s.n, s.mean, s.m2, s.max, s.zeros, _pack_sketch(s.buckets))
+             for (weekday, period, metric), s in stats.items()],
+        )
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO {PROGRESS_TABLE} (source, version, last_rowid, samples, first_time, last_time) "
+            "VALUES ('mgstat', ?, ?, ?, ?, ?)",
+            (BASELINE_VERSION, end_rowid, samples, first_time, last_time),
+        )
+        self.connection.commit()
+        return read
+
+    def baselines(self, metrics=BASELINE_METRICS, min_samples=MIN_SAMPLES):
+        """
+        The history as _compute_baselines() returns a capture's:
+        {(weekday_name, period_name): {metric: {mean, sigma, p95, max}}}, in the same order
+        (Monday first) and without the combinations that have no metric with min_samples.
+        """
+        result = {}
+        for (weekday, period, metric), s in self.load().items():
+            if metric in metrics and s.n >= min_samples:
+                result.setdefault((weekday, period), {})[metric] = {
+                    "mean": s.mean, "sigma": s.sigma, "p95": s.quantile(0.95), "max": s.max}
+        return {key: {m: result[key][m] for m in metrics if m in result[key]}
+                for key in sorted(result, key=_pa._baseline_order)}
+
+    def summary(self):
+        """{samples, first, last} of the mgstat samples in the history, None before the first update."""
+        last_rowid, samples, first_time, last_time = self._progress()
+        if not last_rowid:
+            return None
+        return {"samples": samples, "first": first_time, "last": last_time}
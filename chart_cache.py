@@ -0,0 +1,108 @@
+# chart_cache.py
+"""
+Skip-unchanged cache for the per-column charts (simple_chart / linked_chart).
+
+A manifest (chart_manifest.json in the {prefix}_metrics folder) records, for
+each chart call, a hash of its input slice plus its rendering parameters, the
+files the call wrote and its return value (the peak window for simple_chart).
+On the next `-e` run a chart is skipped when its hash matches and all of its
+files still exist, so re-running after changing one flag only redraws what
+that flag affects.
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+
+# Bump when chart rendering changes so old manifests are ignored.
+CHART_CACHE_VERSION = 1
+
+MANIFEST_NAME = "chart_manifest.json"
+
+
+def _encode(value):
+    """Chart return values as JSON (timestamps tagged so they come back as Timestamps)."""
+    if isinstance(value, (tuple, list)):
+        return [_encode(v) for v in value]
+    if isinstance(value, pd.Timestamp):
+        return {"timestamp": value.isoformat()}
+    return value
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return tuple(_decode(v) for v in value)
+    if isinstance(value, dict) and "timestamp" in value:
+        return pd.Timestamp(value["timestamp"])
+    return value
+
+
+def _file_mtimes(directory):
+    """{path: mtime_ns} for the files directly in directory (charts write flat into their folder)."""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.path: entry.stat().st_mtime_ns for entry in entries if entry.is_file()}
+    except FileNotFoundError:
+        return {}
+
+
+class ChartCache:
+    """Chart manifest for one output folder. Call save() once charting is done."""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.entries = {}
+        self.skipped = 0
+        self.drawn = 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == CHART_CACHE_VERSION:
+                self.entries = manifest.get("charts", {})
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def fingerprint(data, params):
+        """Hash of a chart's input slice (row count, time range, values) and its rendering parameters."""
+        x_column = "datetime_parsed" if "datetime_parsed" in data.columns else "datetime"
+        if x_column not in data.columns:
+            x_column = "id_key"
+        digest = hashlib.sha1()
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        digest.update(str(len(data)).encode())
+        if len(data):
+            digest.update(f"{data[x_column].min()}|{data[x_column].max()}".encode())
+            digest.update(pd.util.hash_pandas_object(data[[x_column, "metric"]], index=False).values.tobytes())
+        return digest.hexdigest()
+
+    def render(self, key, directory, data, params, render):
+        """Return render()'s result, or the recorded result without rendering when nothing changed.
+
+        key identifies the chart (output folder + chart function + file name);
+        directory is where render() writes, used to record the files it produced.
+        """
+        fingerprint = self.fingerprint(data, params)
+        entry = self.entries.get(key)
+        if (
+            entry is not None
+            and entry["hash"] == fingerprint
+            and entry["files"]
+            and all(os.path.isfile(path) for path in entry["files"])
+        ):
+            self.skipped += 1
+            return _decode(entry["result"])
+
+        before = _file_mtimes(directory)
+        result = render()
+        files = sorted(path for path, mtime in _file_mtimes(directory).items() if before.get(path) != mtime)
+        self.entries[key] = dict(hash=fingerprint, files=files, result=_encode(result))
+        self.drawn += 1
+        return result
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(dict(version=CHART_CACHE_VERSION, charts=self.entries), f, indent=1)
@@ -0,0 +1,160 @@
+# chart_progress.py
+"""
+Progress, throughput and ETA for the chart phase, written to stderr.
+
+mainline counts the charts it is about to draw before it starts (one per
+column and device, covering all of that column's PNG and HTML files) and each
+chart function corrects its source's count once it has read the table. Every
+finished chart (drawn or skipped by the chart cache) moves the count on; a
+progress line with charts per second and the time left is printed at most
+every REPORT_SECONDS. At the end, the time spent in each chart variant (base
+PNG, HTML, peak60, business hours, day overlay, ...) shows which variants are
+worth turning off.
+
+Tracking is off until start() is called, so the chart functions can be used on
+their own (tests, other tools) without any output.
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+
+REPORT_SECONDS = 10
+
+
+def _duration(seconds):
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+
+
+class ChartProgress:
+    """Chart counts and per-variant times for one chart run."""
+
+    def __init__(self, stream=None, clock=time.perf_counter, report_seconds=REPORT_SECONDS):
+        self.stream = stream if stream is not None else sys.stderr
+        self.clock = clock
+        self.report_seconds = report_seconds
+        self.planned = {}  # source -> (charts per device, devices or None)
+        self.done = 0
+        self.variants = {}  # variant -> [charts, seconds]
+        self.started = clock()
+        self._last_report = self.started
+        self._timers = []  # seconds spent in nested timed() calls, one entry per open timer
+
+    @property
+    def total(self):
+        planned = sum(charts * len(devices or [None]) for charts, devices in self.planned.values())
+        return max(planned, self.done)
+
+    def plan(self, source, charts, devices=None):
+        """Set (or correct) the number of charts for source: charts for each of devices, if it has devices."""
+        self.planned[source] = (charts, list(devices) if devices is not None else None)
+
+    def describe_plan(self):
+        """'412 charts: mgstat 80, vmstat 36, iostat 240 (4 devices x 60)'"""
+        parts = []
+        for source, (charts, devices) in self.planned.items():
+            if devices is None:
+                parts.append(f"{source} {charts}")
+            else:
+                parts.append(f"{source} {charts * len(devices)} ({len(devices)} devices x {charts})")
+        return f"{self.total} charts: {', '.join(parts)}"
+
+    def tick(self):
+        """One chart (all the files of one column) finished, drawn or skipped."""
+        self.done += 1
+        now = self.clock()
+        if now - self._last_report >= self.report_seconds:
+            self._last_report = now
+            self.report()
+
+    @contextmanager
+    def timed(self, variant):
+        """Time a chart variant. Time in nested variants is not counted twice."""
+        start = self.clock()
+        self._timers.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = self.clock() - start
+            nested = self._timers.pop()
+            if self._timers:
+                self._timers[-1] += elapsed
+            entry = self.variants.setdefault(variant, [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed - nested
+
+    def report(self):
+        elapsed = self.clock() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        line = f"Charts: {self.done}/{self.total}"
+        if self.total:
+            line += f" ({100 * self.done // self.total}%)"
+        line += f", {rate:.1f} charts/s"
+        if rate > 0 and self.done < self.total:
+            line += f", about {_duration((self.total - self.done) / rate)} left"
+        print(line, file=self.stream, flush=True)
+
+    def summary(self):
+        """Final line and the time per chart variant, slowest first."""
+        elapsed = self.clock() - self.started
+        print(f"Charts: {self.done} in {_duration(elapsed)}", file=self.stream)
+        if not self.variants:
+            return
+        width = max(len(variant) for variant in self.variants)
+        print("Time per chart variant:", file=self.stream)
+        for variant, (charts, seconds) in sorted(self.variants.items(), key=lambda item: -item[1][1]):
+            share = 100 * seconds / elapsed if elapsed > 0 else 0
+            print(f"  {variant:<{width}}  {charts:>6} drawn  {seconds:8.1f}s  {share:3.0f}%  "
+                  f"{1000 * seconds / charts:7.0f} ms each", file=self.stream)
+        other = elapsed - sum(seconds for _, seconds in self.variants.values())
+        print(f"  {'other':<{width}}  {'':>6}        {other:8.1f}s  (reading tables, peak windows, rollups)",
+              file=self.stream)
+        self.stream.flush()
+
+
+_current = None
+
+
+def start(stream=None):
+    """Start tracking a chart run; returns the ChartProgress."""
+    global _current
+    _current = ChartProgress(stream)
+    return _current
+
+
+def finish():
+    """Print the summary and stop tracking."""
+    global _current
+    if _current is not None:
+        _current.summary()
+    _current = None
+
+
+def plan(source, charts, devices=None):
+    if _current is not None:
+        _current.plan(source, charts, devices)
+
+
+def tick():
+    if _current is not None:
+        _current.tick()
+
+
+def timed(variant):
+    """Decorator timing each call of a chart function as variant, while tracking is on."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current is None:
+                return fn(*args, **kwargs)
+            with _current.timed(variant):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
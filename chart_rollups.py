@@ -0,0 +1,394 @@
+# chart_rollups.py
+"""
+Per-day rollups behind the multi-day charts, and incremental charting after an append.
+
+The daily summary, hourly heatmap and day overlay charts only need, for each
+column and calendar day, the day's 99th percentile and maximum, the 99th
+percentile of each hour, and the day's smoothed profile (at most a point a
+minute). day_rollups works these out from the samples, the chart_rollups table
+keeps them with the data, and profiles() turns them into what the chart
+helpers draw from. Like the charts, they are only worked out for data spanning
+more than LONG_PERIOD.
+
+Every load into the database (the first -i run and each -a append) is recorded
+in the append_log table: the rows each input file added to each table and the
+time range they cover. An -e --incremental-chart run after appends then only
+charts what depends on the new rows (see ChartIncrement):
+
+  - each new input file's rows as a chart set of their own, in a folder named
+    after the file under the source's folder,
+  - the daily summary, heatmap and day overlay over all days, from the stored
+    rollups with just the days the new rows touch recomputed.
+
+Full-period charts (the base chart over all days, the N-minute average and the
+per-day business hours peaks) are left as they are, which is why a plain -e
+run redraws everything.
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+
+from datetime_resolver import parse_datetimes
+
+
+ROLLUPS_TABLE = "chart_rollups"
+APPEND_LOG_TABLE = "append_log"
+
+# Bump when the rollup contents change so stored rollups are recomputed by a full chart run.
+ROLLUP_VERSION = 1
+
+# Tables charted through the rollups; the others (nfsiostat, aix_sar_d) are always charted in full.
+ROLLUP_TABLES = ("mgstat", "vmstat", "iostat", "perfmon", "free_memory")
+
+LONG_PERIOD = pd.Timedelta(hours=25)
+
+# Samples in the rolling mean that smooths each day of the overlay
+SMOOTH_SAMPLES = 60
+
+
+class DayRollups:
+    """Per-day aggregates of a set of columns.
+
+    daily_p99, daily_max  frames indexed by day
+    hourly_p99            frame indexed by (day, hour), hours with samples only
+    overlay               the smoothed samples, at most one a minute, indexed by time
+    first, last           first and last sample time of each day
+    """
+
+    def __init__(self, daily_p99, daily_max, hourly_p99, overlay, first, last):
+        self.daily_p99 = daily_p99
+        self.daily_max = daily_max
+        self.hourly_p99 = hourly_p99
+        self.overlay = overlay
+        self.first = first
+        self.last = last
+
+    @property
+    def days(self):
+        return self.daily_p99.index
+
+    def only(self, days):
+        """These rollups restricted to days."""
+        return DayRollups(
+            self.daily_p99[self.days.isin(days)],
+            self.daily_max[self.days.isin(days)],
+            self.hourly_p99[self.hourly_p99.index.get_level_values(0).isin(days)],
+            self.overlay[self.overlay.index.normalize().isin(days)],
+            self.first[self.first.index.isin(days)],
+            self.last[self.last.index.isin(days)],
+        )
+
+    def combine(self, newer):
+        """These rollups with the days in newer replaced (or added) by newer's."""
+        older = self.only(self.days.difference(newer.days))
+        return DayRollups(*(
+            pd.concat([old, new]).sort_index()
+            for old, new in zip(older._frames(), newer._frames())
+        ))
+
+    def _frames(self):
+        return self.daily_p99, self.daily_max, self.hourly_p99, self.overlay, self.first, self.last
+
+
+def day_rollups(values):
+    """DayRollups of values (numeric columns indexed by sample time, sorted)."""
+    index = values.index
+    day = index.normalize().rename("date")
+    by_day = values.groupby(day)
+    daily_p99 = by_day.quantile(0.99)
+    hourly_p99 = values.groupby([day, pd.Index(index.hour.astype(int), name="hour")]).quantile(0.99)
+
+    # Smooth each day with a rolling mean, all columns at once
+    day_starts = index.searchsorted(daily_p99.index)
+    day_ends = list(day_starts[1:]) + [len(index)]
+    smooth = np.empty(values.shape)
+    for start, end in zip(day_starts, day_ends):
+        win = max(2, min(end - start, SMOOTH_SAMPLES))
+        smooth[start:end] = values.iloc[start:end].rolling(window=win, center=True, min_periods=1).mean().values
+
+    # Mean per minute, at the minute's first sample (unchanged for samples a minute or more apart)
+    minutes = index.floor("min").asi8
+    starts = np.flatnonzero(np.r_[True, minutes[1:] != minutes[:-1]])
+    counts = np.diff(np.r_[starts, len(index)])
+    overlay = pd.DataFrame(np.add.reduceat(smooth, starts, axis=0) / counts[:, None],
+                           index=index[starts], columns=values.columns)
+
+    times = index.to_series(index=day)
+    return DayRollups(daily_p99, by_day.max(), hourly_p99, overlay,
+                      times.groupby(level=0).min(), times.groupby(level=0).max())
+
+
+def profiles(rollups):
+    """{column: profile} for the multi-day charts, {} when the days span 25 hours or less.
+
+    Each profile has daily_p99 (Series by day), hourly_p99 (Series by (day, hour)), smooth (the
+    overlay Series) and max, and, shared by all columns, days [(day, first row, end row)] into
+    smooth, x_ref (time of day of each point on the reference day 2000-01-01), when (each point's
+    "%a %d-%b %H:%M:%S" hover label) and the start and end of the data.
+    """
+    if rollups is None or len(rollups.days) == 0:
+        return {}
+    start, end = rollups.first.min(), rollups.last.max()
+    if end - start <= LONG_PERIOD:
+        return {}
+
+    index = rollups.overlay.index
+    day_starts = index.searchsorted(rollups.days)
+    day_ends = list(day_starts[1:]) + [len(index)]
+    shared = dict(
+        days=list(zip(rollups.days, day_starts, day_ends)),
+        x_ref=pd.Timestamp("2000-01-01") + (index - index.normalize()),
+        when=index.strftime("%a %d-%b %H:%M:%S"),
+        start=start,
+        end=end,
+    )
+    return {
+        column: dict(
+            daily_p99=rollups.daily_p99[column],
+            hourly_p99=rollups.hourly_p99[column].dropna(),
+            smooth=rollups.overlay[column],
+            max=rollups.daily_max[column].max(),
+            **shared,
+        )
+        for column in rollups.daily_p99.columns
+    }
+
+
+def _pack(rollups, day):
+    """One day of rollups as an .npz blob."""
+    one = rollups.only([day])
+    hourly = one.hourly_p99.droplevel(0)
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        columns=np.array(one.daily_p99.columns, dtype=str),
+        daily_p99=one.daily_p99.values[0],
+        daily_max=one.daily_max.values[0].astype(float),
+        hours=hourly.index.values.astype(np.int8),
+        hourly_p99=hourly.values,
+        times=one.overlay.index.asi8,
+        overlay=one.overlay.values,
+        first_last=np.array([one.first.iloc[0].value, one.last.iloc[0].value]),
+    )
+    return buffer.getvalue()
+
+
+def _unpack(day, blob):
+    arrays = np.load(io.BytesIO(blob))
+    columns = list(arrays["columns"])
+    day = pd.Timestamp(day)
+    days = pd.DatetimeIndex([day], name="date")
+    hours = pd.MultiIndex.from_arrays(
+        [np.repeat(days, len(arrays["hours"])), arrays["hours"].astype(int)], names=["date", "hour"]
+    )
+    first, last = pd.to_datetime(arrays["first_last"])
+    return DayRollups(
+        pd.DataFrame([arrays["daily_p99"]], index=days, columns=columns),
+        pd.DataFrame([arrays["daily_max"]], index=days, columns=columns),
+        pd.DataFrame(arrays["hourly_p99"], index=hours, columns=columns),
+        pd.DataFrame(arrays["overlay"], index=pd.to_datetime(arrays["times"]), columns=columns),
+        pd.Series([first], index=days),
+        pd.Series([last], index=days),
+    )
+
+
+def _table_exists(connection, table_name):
+    cursor = connection.execute("SELECT count(name) FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
+    return cursor.fetchone()[0] == 1
+
+
+class RollupStore:
+    """The chart_rollups table. In an incremental run (increment is a ChartIncrement) update() merges
+    the days the new rows touch with the stored days; otherwise it replaces a source's days."""
+
+    def __init__(self, connection, increment=None):
+        self.connection = connection
+        self.increment = increment
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {ROLLUPS_TABLE} "
+            "(source TEXT, day TEXT, version INTEGER, data BLOB, PRIMARY KEY (source, day))"
+        )
+
+    def load(self, source):
+        """The stored DayRollups of source, None if there are none."""
+        rows = self.connection.execute(
+            f"SELECT day, data FROM {ROLLUPS_TABLE} WHERE source = ? AND version = ? ORDER BY day",
+            (source, ROLLUP_VERSION),
+        ).fetchall()
+        if not rows:
+            return None
+        days = [_unpack(day, blob)._frames() for day, blob in rows]
+        return DayRollups(*(pd.concat(frames) for frames in zip(*days)))
+
+    def update(self, source, rollups):
+        """Store rollups for source and return the rollups of all its days."""
+        if self.increment is not None:
+            rollups = rollups.only(self.increment.days)
+            stored = self.load(source)
+            fresh = rollups
+            if stored is not None:
+                rollups = stored.combine(fresh)
+        else:
+            self.connection.execute(f"DELETE FROM {ROLLUPS_TABLE} WHERE source = ?", (source,))
+            fresh = rollups
+        self.connection.executemany(
+            f"INSERT OR REPLACE INTO {ROLLUPS_TABLE} (source, day, version, data) VALUES (?, ?, ?, ?)",
+            [(source, day.isoformat(), ROLLUP_VERSION, _pack(fresh, day)) for day in fresh.days],
+        )
+        self.connection.commit()
+        return rollups
+
+
+def _ensure_append_log(connection):
+    connection.execute(
+        f"CREATE TABLE IF NOT EXISTS {APPEND_LOG_TABLE} ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, table_name TEXT, input_name TEXT, "
+        "first_rowid INTEGER, last_rowid INTEGER, first_time TEXT, last_time TEXT, charted INTEGER DEFAULT 0)"
+    )
+
+
+def _last_rowid(connection, table_name):
+    if not _table_exists(connection, table_name):
+        return 0
+    return connection.execute(f'SELECT max(rowid) FROM "{table_name}"').fetchone()[0] or 0
+
+
+def _time_range(times):
+    times = times.dropna()
+    if times.empty:
+        return None, None
+    return times.min().isoformat(), times.max().isoformat()
+
+
+def _frame_times(table_name, df):
+    """Sample times of a section frame (RunDate + RunTime, or perfmon's datetime).
+    None for tables that are not charted through the rollups, or without times that parse."""
+    if table_name not in ROLLUP_TABLES:
+        return None
+    try:
+        if "RunDate" in df.columns and "RunTime" in df.columns:
+            return parse_datetimes(df["RunDate"].astype(str) + " " + df["RunTime"].astype(str))
+        if "datetime" in df.columns:
+            return parse_datetimes(df["datetime"])
+    except ValueError:
+        pass
+    return None
+
+
+def append_rows(connection, table_name, df, input_name):
+    """Append df to table_name and record the rows in the append log."""
+    _ensure_append_log(connection)
+    first_rowid = _last_rowid(connection, table_name) + 1
+    df.to_sql(table_name, connection, if_exists="append", index=True, index_label="id_key")
+    times = _frame_times(table_name, df)
+    first_time, last_time = _time_range(times) if times is not None else (None, None)
+    connection.execute(
+        f"INSERT INTO {APPEND_LOG_TABLE} (table_name, input_name, first_rowid, last_rowid, first_time, last_time) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (table_name, input_name, first_rowid, _last_rowid(connection, table_name), first_time, last_time),
+    )
+    connection.commit()
+
+
+def mark_charted(connection):
+    """Record that every load so far has been charted.
+
+    Rows loaded before there was an append log are logged here (with their time range) so that a
+    later append on the same day can find them.
+    """
+    _ensure_append_log(connection)
+    for table_name in ROLLUP_TABLES:
+        if not _table_exists(connection, table_name):
+            continue
+        covered = connection.execute(
+            f"SELECT max(last_rowid) FROM {APPEND_LOG_TABLE} WHERE table_name = ?", (table_name,)
+        ).fetchone()[0] or 0
+        last_rowid = _last_rowid(connection, table_name)
+        if last_rowid > covered:
+            columns = {row[1] for row in connection.execute(f'PRAGMA table_info("{table_name}")')}
+            time_columns = [c for c in ("RunDate", "RunTime", "datetime") if c in columns]
+            df = pd.read_sql_query(
+                f'SELECT {", ".join(time_columns) or "rowid"} FROM "{table_name}" WHERE rowid > {covered}', connection
+            )
+            times = _frame_times(table_name, df)
+            first_time, last_time = _time_range(times) if times is not None else (None, None)
+            connection.execute(
+                f"INSERT INTO {APPEND_LOG_TABLE} (table_name, input_name, first_rowid, last_rowid, first_time, last_time) "
+                "VALUES (?, '', ?, ?, ?, ?)",
+                (table_name, covered + 1, last_rowid, first_time, last_time),
+            )
+    connection.execute(f"UPDATE {APPEND_LOG_TABLE} SET charted = 1")
+    connection.commit()
+
+
+class ChartIncrement:
+    """The loads not charted yet, and the rows an incremental chart run needs to read."""
+
+    def __init__(self, entries):
+        self.entries = entries  # append_log rows as dicts, times as Timestamps
+        pending = [entry for entry in entries if not entry["charted"]]
+
+        # One load per input file, its time range taken across tables
+        loads = {}
+        for entry in pending:
+            first, last = loads.get(entry["input_name"], (entry["first_time"], entry["last_time"]))
+            loads[entry["input_name"]] = (min(first, entry["first_time"]), max(last, entry["last_time"]))
+        self.loads = sorted(((name, first, last) for name, (first, last) in loads.items()), key=lambda load: load[1])
+
+        self.days = pd.DatetimeIndex(sorted({
+            day for entry in pending for day in pd.date_range(entry["first_time"].normalize(), entry["last_time"])
+        }), name="date")
+
+    @classmethod
+    def pending(cls, connection):
+        """The appends since the last chart run, or None when there are none or an incremental run is
+        not possible (no stored rollups yet, or new rows without times)."""
+        if not _table_exists(connection, APPEND_LOG_TABLE) or not _table_exists(connection, ROLLUPS_TABLE):
+            return None
+        if connection.execute(
+            f"SELECT count(*) FROM {ROLLUPS_TABLE} WHERE version = ?", (ROLLUP_VERSION,)
+        ).fetchone()[0] == 0:
+            return None
+        entries = pd.read_sql_query(
+            f"SELECT * FROM {APPEND_LOG_TABLE} WHERE table_name IN ({', '.join('?' * len(ROLLUP_TABLES))}) ORDER BY id",
+            connection, params=ROLLUP_TABLES,
+        )
+        pending = entries[entries["charted"] == 0]
+        if pending.empty or pending["first_time"].isna().any():
+            return None
+        entries = entries.dropna(subset=["first_time", "last_time"])
+        entries["first_time"] = pd.to_datetime(entries["first_time"])
+        entries["last_time"] = pd.to_datetime(entries["last_time"])
+        return cls(entries.to_dict("records"))
+
+    def _ranges(self, table_name):
+        """rowid ranges of table_name to read: the new rows and any earlier rows on the days they touch."""
+        first_day, end_day = self.days.min(), self.days.max() + pd.Timedelta(days=1)
+        return [
+            (entry["first_rowid"], entry["last_rowid"])
+            for entry in self.entries
+            if entry["table_name"] == table_name
+            and (not entry["charted"] or (entry["first_time"] < end_day and entry["last_time"] >= first_day))
+        ]
+
+    def has_rows(self, table_name):
+        """True if table_name has new rows to chart."""
+        return any(entry["table_name"] == table_name and not entry["charted"] for entry in self.entries)
+
+    def select(self, table_name):
+        """SELECT for the rows of table_name an incremental run charts."""
+        ranges = " OR ".join(f"rowid BETWEEN {first} AND {last}" for first, last in self._ranges(table_name))
+        return f"SELECT * FROM {table_name} WHERE {ranges or '0'}"
+
+    def slices(self, frame, datetime_column):
+        """(input name, rows) of frame for each new input file."""
+        for name, first, last in self.loads:
+            rows = frame[(frame[datetime_column] >= first) & (frame[datetime_column] <= last)]
+            if not rows.empty:
+                yield name or "appended", rows
+
+    def describe(self):
+        names = ", ".join(name or "appended" for name, _, _ in self.loads)
+        return f"{len(self.loads)} new input file(s) ({names}), {len(self.days)} day(s) updated"
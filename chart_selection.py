@@ -0,0 +1,132 @@
+# chart_selection.py
+"""
+Selective chart generation: which sources, columns and chart variants to draw.
+
+Built from --metrics and/or a YAML chart manifest (--chart-manifest). Without
+either, yaspe charts every column of every source as before.
+
+--metrics takes a comma separated list of columns, optionally qualified by
+source and with shell-style wildcards:
+
+    --metrics "Glorefs,PhyRds,vmstat:Total CPU,perfmon:*Processor_Time*"
+
+The manifest names sources, then columns, then variants. A column with no
+variant list (or "all") gets every variant that applies to it, and a source
+given as a list of columns or "all" works the same way:
+
+    mgstat:
+      Glorefs: [base, peak60, bh_peak, day_overlay]
+      PhyRds:
+    vmstat: [Total CPU, wa]
+    perfmon:
+      "*Processor_Time*": [base, daily_summary, heatmap]
+    iostat: all
+
+Sources and columns that are not listed are not charted at all.
+"""
+
+from fnmatch import fnmatchcase
+
+import yaml
+
+
+# Variant names as used in --chart-manifest, see simple_chart for when each applies.
+VARIANTS = (
+    "base",  # the main PNG (z_{metric}.png) and the interactive HTML chart
+    "peak60",  # peak 60-minute window (8-25 hours of data)
+    "bh_peak",  # business hours peak (8-25 hours of data)
+    "glorefs_peak",  # metric during the Glorefs peak window (8-25 hours of data)
+    "5min_avg",  # smoothed view (>25 hours of data)
+    "daily_summary",  # daily 99th percentile bars (>25 hours of data)
+    "heatmap",  # hour x day heatmap (>25 hours of data)
+    "day_overlay",  # days overlaid on one 00:00-24:00 axis, PNG and HTML (>25 hours of data)
+    "bh_days",  # business hours peak of each day, one small-multiples PNG (>25 hours of data)
+)
+
+ALL_SOURCES = "*"
+
+
+class ChartSelection:
+    """Rules {source or "*": {column pattern: frozenset of variants, or None for all}}."""
+
+    def __init__(self, rules=None):
+        self.rules = rules or {}
+
+    @classmethod
+    def from_metrics(cls, metrics):
+        """From the --metrics string."""
+        rules = {}
+        for item in metrics.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            source, _, column = item.rpartition(":")
+            rules.setdefault(source.strip() or ALL_SOURCES, {})[column.strip()] = None
+        return cls(rules)
+
+    @classmethod
+    def from_manifest(cls, path):
+        """From a YAML chart manifest. Raises ValueError for an unknown variant or bad layout."""
+        with open(path, encoding="utf-8") as f:
+            manifest = yaml.safe_load(f) or {}
+        if not isinstance(manifest, dict):
+            raise ValueError(f"{path}: expected a mapping of source: columns")
+
+        rules = {}
+        for source, columns in manifest.items():
+            if columns is None or columns == "all":
+                columns = {"*": None}
+            elif isinstance(columns, (list, str)):
+                columns = {column: None for column in ([columns] if isinstance(columns, str) else columns)}
+            elif not isinstance(columns, dict):
+                raise ValueError(f"{path}: {source}: expected a list or mapping of columns")
+
+            source_rules = rules.setdefault(str(source), {})
+            for column, variants in columns.items():
+                if variants is None or variants == "all":
+                    source_rules[str(column)] = None
+                    continue
+                if isinstance(variants, str):
+                    variants = [variants]
+                unknown = set(variants) - set(VARIANTS)
+                if unknown:
+                    raise ValueError(
+                        f"{path}: {source}: {column}: unknown chart variant(s) {sorted(unknown)}, "
+                        f"expected {', '.join(VARIANTS)}"
+                    )
+                source_rules[str(column)] = frozenset(variants)
+        return cls(rules)
+
+    def merge(self, other):
+        """Union of two selections."""
+        rules = {source: dict(columns) for source, columns in self.rules.items()}
+        for source, columns in other.rules.items():
+            for column, variants in columns.items():
+                source_rules = rules.setdefault(source, {})
+                source_rules[column] = _union(source_rules.get(column, frozenset()), variants)
+        return ChartSelection(rules)
+
+    def _matching(self, source):
+        for rule_source in (source, ALL_SOURCES):
+            yield from self.rules.get(rule_source, {}).items()
+
+    def wants_source(self, source):
+        return source in self.rules or ALL_SOURCES in self.rules
+
+    def variants(self, source, column):
+        """Variants to draw for column: a frozenset, None for all, or an empty set if not selected."""
+        selected = frozenset()
+        for pattern, variants in self._matching(source):
+            if fnmatchcase(column, pattern):
+                selected = _union(selected, variants)
+        return selected
+
+    def columns(self, source, columns, keep=()):
+        """columns that are selected for source, plus any in keep (id columns such as datetime)."""
+        return [column for column in columns if column in keep or self.variants(source, column) != frozenset()]
+
+
+def _union(a, b):
+    if a is None or b is None:
+        return None
+    return a | b
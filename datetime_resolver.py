@@ -0,0 +1,110 @@
+# datetime_resolver.py
+"""
+Parse a column of date/time strings in one vectorized call.
+
+The collected tables hold dates in whatever layout the source tool wrote
+(2026/04/27 after extraction, 04/27/26 or 27/04/2026 straight from iostat or
+perfmon, 12-hour times with AM/PM, fractional seconds). Rather than asking
+dateutil about every value, the format is detected once per column from a
+sample and the whole column is parsed with pd.to_datetime(format=...).
+
+Day/month order is ambiguous when every day in the data is 12 or less. Then
+the candidate that puts the first sample nearest the "Profile run" date wins,
+or without that date, the candidate with the shortest time span (a collection
+runs for hours or days, not months). Values that fit no known format fall back
+to dateutil, once per distinct value.
+
+Times are truncated to whole seconds, as charts and duplicate checks expect.
+"""
+
+from datetime import datetime
+
+import pandas as pd
+from dateutil.parser import parse
+
+
+DATE_FORMATS = (
+    "%Y/%m/%d",
+    "%Y-%m-%d",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%m/%d/%y",
+    "%d/%m/%y",
+    "%m-%d-%Y",
+    "%d-%m-%Y",
+    "%d-%b-%Y",
+    "%d-%b-%y",
+    "%b %d %Y",
+)
+
+TIME_FORMATS = (
+    "%H:%M:%S",
+    "%H:%M:%S.%f",
+    "%I:%M:%S %p",
+    "%I:%M:%S.%f %p",
+    "%H:%M",
+)
+
+SAMPLE_SIZE = 500
+
+
+def profile_run_date(profile_run):
+    """Date from the overview "profile run" line (... on Apr 27 2026.), or None."""
+    if not profile_run or "on " not in profile_run:
+        return None
+    try:
+        return datetime.strptime(profile_run.rsplit("on ", 1)[1].strip().rstrip("."), "%b %d %Y")
+    except ValueError:
+        return None
+
+
+def _sample(values):
+    unique = values.drop_duplicates()
+    if len(unique) <= SAMPLE_SIZE:
+        return unique
+    # Both ends and the middle: day/month order shows up at the day boundaries
+    step = len(unique) // SAMPLE_SIZE + 1
+    return pd.concat([unique.iloc[:100], unique.iloc[::step], unique.iloc[-100:]]).drop_duplicates()
+
+
+def detect_format(values, anchor=None):
+    """The strptime format that parses every value in the sample of values, or None."""
+    sample = _sample(values)
+    if sample.empty:
+        return None
+
+    candidates = []
+    for date_format in DATE_FORMATS:
+        for time_format in TIME_FORMATS:
+            fmt = f"{date_format} {time_format}"
+            parsed = pd.to_datetime(sample, format=fmt, errors="coerce")
+            if parsed.notna().all():
+                candidates.append((fmt, parsed))
+    if not candidates:
+        return None
+    if len(candidates) == 1:
+        return candidates[0][0]
+
+    if anchor is not None:
+        anchor = pd.Timestamp(anchor)
+        return min(candidates, key=lambda c: abs(c[1].iloc[0] - anchor))[0]
+    # Stable min: the earlier (month first) format wins a tie, as dateutil would
+    return min(candidates, key=lambda c: c[1].max() - c[1].min())[0]
+
+
+def parse_datetimes(values, anchor=None):
+    """values (strings) as a datetime64 Series, detecting the format once.
+
+    anchor is the Profile run date (a datetime) when known, to settle day/month order.
+    Raises ValueError, as the per-value parse did, for a value that is not a date at all.
+    """
+    values = values.astype(str).str.strip()
+    fmt = detect_format(values, anchor)
+    if fmt is not None:
+        parsed = pd.to_datetime(values, format=fmt, errors="coerce")
+        if parsed.notna().all():
+            return parsed.dt.floor("s")
+
+    # Mixed or unknown layouts: dateutil, once per distinct value
+    lookup = {value: parse(value) for value in values.unique()}
+    return pd.to_datetime(values.map(lookup)).dt.floor("s")
@@ -8,11 +8,14 @@ import json
 import os
 import re
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Optional
 
 import numpy as np
 import pandas as pd
+import baseline_store
+import chart_rollups
 import performance_analysis as _pa
 
 
@@ -46,45 +49,28 @@ _IOSTAT_COL_MAP = {
 }
 
 
-def _mark_gaps(records: list) -> list:
-    """
-    Mark the last row before a collection gap with _gap_after: true.
-    A gap is any consecutive interval that exceeds 3× the median interval.
-    All other rows get _gap_after: false.
-    Returns the same list (mutated in-place for efficiency).
-    """
-    if len(records) < 2:
-        for r in records:
-            r["_gap_after"] = "false"
-        return records
-
-    timestamps = []
-    for r in records:
-        try:
-            timestamps.append(datetime.strptime(r["timestamp"], "%Y-%m-%d %H:%M:%S"))
-        except (ValueError, TypeError):
-            timestamps.append(None)
-
-    diffs = []
-    for i in range(1, len(timestamps)):
-        if timestamps[i] is not None and timestamps[i - 1] is not None:
-            diffs.append((timestamps[i] - timestamps[i - 1]).total_seconds())
-
-    if not diffs:
-        for r in records:
-            r["_gap_after"] = "false"
-        return records
+_TS_FORMAT = "%Y-%m-%d %H:%M:%S"
 
-    median_interval = float(np.median(diffs))
-    threshold = 3.0 * median_interval if median_interval > 0 else float("inf")
 
-    for i, record in enumerate(records):
-        if i < len(records) - 1 and i < len(diffs):
-            record["_gap_after"] = "true" if diffs[i] > threshold else "false"
-        else:
-            record["_gap_after"] = "false"
-
-    return records
+def _gap_flags(index: pd.DatetimeIndex, seconds: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    _gap_after for each row of a resampled frame: "true" on the last row
+    before a collection gap, "false" elsewhere. A gap is any step that
+    exceeds 3× the median step or, with seconds (each row's interval, for
+    frames at more than one interval), 3× the coarser interval of the two
+    rows either side.
+    """
+    flags = np.full(len(index), "false", dtype=object)
+    if len(index) < 2:
+        return flags
+    steps = np.diff(index.to_numpy(dtype="datetime64[ns]").astype(np.int64)) / 1e9
+    if seconds is None:
+        median_interval = float(np.median(steps))
+        threshold = 3.0 * median_interval if median_interval > 0 else np.inf
+    else:
+        threshold = 3.0 * np.maximum(seconds[:-1], seconds[1:])
+    flags[:-1][steps > threshold] = "true"
+    return flags
 
 
 PROMPT_TEMPLATE = """\
@@ -99,7 +85,7 @@ PROMPT_TEMPLATE = """\
 ## 1. What is in the bundle
 
 - **YAML header** — `system` (vCPUs, RAM GB, IRIS global buffers GB, IRIS version, OS) and `collection` (window start/end, days, weekdays, sample interval, gaps). Gaps are collection outages: call them out, never interpolate across them.
-- **Baselines** — per IRIS Health Monitor period mean/sigma/p95/max for baseline-relative mgstat metrics. Use to judge "normal for this site".
+- **Baselines** — per IRIS Health Monitor period mean/sigma/p95/max for baseline-relative mgstat metrics. Use to judge "normal for this site". When the caption says they come from the baseline history, they span earlier captures too: the long-run norm, not just this window's.
 - **Findings (pre-computed)** — deterministic breach and correlation detections by yaspe. Hints, not conclusions: verify each against period statistics and timeseries, look for what they missed, correlate with each other. Do not simply restate them.
 - **Key metrics** — analyst scorecard (overall window and peak period). Ratios computed from sums unless basis column says otherwise. Lead your review with these numbers.
 - **Not available** — metrics this capture cannot provide. Put in your "data to request" section; do not speculate about their values.
@@ -175,6 +161,8 @@ That combination → storage/WIJ subsystem not keeping up. WDQsz merely being no
 6. **Kernel overhead** — sy growing relative to us at similar Glorefs.
 7. **Batch/backup window** — overnight PhyWrs/Jrnwrts surge; confirm it ends before morning ramp. Overlap is a finding.
 
+Findings marked **(anomaly)** come from a rolling robust z-score of every numeric mgstat, vmstat and IRIS-role iostat column against its own preceding hour and, when there are other days, the same time of day on them. They flag abrupt change, not a published threshold: check each against the KPI tables and the workload before calling it a problem, and say which ones are explained by the workload.
+
 ## 5. Required output
 
 1. **Executive summary** (≤ 5 sentences): overall verdict (Green/Yellow/Red), the one or two findings that matter, urgency.
@@ -226,63 +214,114 @@ identifiers found in the capture header.*
 """
 
 
-def _resample_mgstat(mg_df: pd.DataFrame, interval: str) -> list:
+def _resample_frame(df: pd.DataFrame, interval: str, agg: dict) -> pd.DataFrame:
+    """
+    df (with a 'dt' column) resampled to interval by agg ({column: NamedAgg}),
+    indexed by bin start, empty bins dropped. Empty DataFrame if agg is empty.
+    """
+    if not agg:
+        return pd.DataFrame()
+    return df.set_index("dt").sort_index().resample(interval).agg(**agg).dropna(how="all")
+
+
+def _resample_mgstat_frame(mg_df: pd.DataFrame, interval: str) -> pd.DataFrame:
     """
     Resample mgstat DataFrame to interval (e.g. '5min').
     mg_df must have a 'dt' column of datetime64.
-    Returns list of dicts with 'timestamp', mean cols, and _max suffixed max cols.
+    Returns a frame indexed by bin start: mean cols, _max suffixed max cols, _gap_after.
     """
-    df = mg_df.copy().set_index("dt").sort_index()
-
     agg = {}
     for col in _MG_MEAN_COLS:
-        if col in df.columns:
+        if col in mg_df.columns:
             agg[col] = pd.NamedAgg(column=col, aggfunc="mean")
     for col in _MG_MAX_COLS:
-        if col in df.columns:
+        if col in mg_df.columns:
             agg[f"{col}_max"] = pd.NamedAgg(column=col, aggfunc="max")
 
-    if not agg:
-        return []
-
-    resampled = df.resample(interval).agg(**agg).dropna(how="all").reset_index()
-    resampled.rename(columns={"dt": "timestamp"}, inplace=True)
-    resampled["timestamp"] = resampled["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S")
-
-    records = resampled.where(resampled.notna(), None).to_dict(orient="records")
-    return _mark_gaps(records)
+    resampled = _resample_frame(mg_df, interval, agg)
+    if not resampled.empty:
+        resampled["_gap_after"] = _gap_flags(resampled.index)
+    return resampled
 
 
-def _resample_vmstat(vm_df: pd.DataFrame, interval: str) -> list:
+def _resample_vmstat_frame(vm_df: pd.DataFrame, interval: str) -> pd.DataFrame:
     """
     Resample vmstat DataFrame to interval.
     vm_df must have a 'dt' column of datetime64.
-    Returns list of dicts with 'timestamp', mean cols, _max suffixed max cols,
-    and derived 'us_sy' (us + sy mean).
+    Returns a frame indexed by bin start: mean cols, _max suffixed max cols,
+    derived 'us_sy' (us + sy mean), _gap_after.
     """
-    df = vm_df.copy().set_index("dt").sort_index()
-
     agg = {}
     for col in _VM_MEAN_COLS:
-        if col in df.columns:
+        if col in vm_df.columns:
             agg[col] = pd.NamedAgg(column=col, aggfunc="mean")
     for col in _VM_MAX_COLS:
-        if col in df.columns:
+        if col in vm_df.columns:
             agg[f"{col}_max"] = pd.NamedAgg(column=col, aggfunc="max")
 
-    if not agg:
+    resampled = _resample_frame(vm_df, interval, agg)
+    if resampled.empty:
+        return resampled
+    if "us" in resampled.columns and "sy" in resampled.columns:
+        resampled["us_sy"] = resampled["us"].fillna(0) + resampled["sy"].fillna(0)
+    resampled["_gap_after"] = _gap_flags(resampled.index)
+    return resampled
+
+
+def _timeseries_records(frame: pd.DataFrame) -> list:
+    """
+    A resampled frame as JSON-style records: 'timestamp' string first,
+    missing values None. Only the JSON context needs these; the markdown is
+    rendered from the frame.
+    """
+    if frame.empty:
         return []
+    out = frame.astype(object).where(frame.notna(), None)
+    out.insert(0, "timestamp", frame.index.strftime(_TS_FORMAT))
+    return out.to_dict(orient="records")
 
-    resampled = df.resample(interval).agg(**agg).dropna(how="all").reset_index()
-    resampled.rename(columns={"dt": "timestamp"}, inplace=True)
 
-    if "us" in resampled.columns and "sy" in resampled.columns:
-        resampled["us_sy"] = resampled["us"].fillna(0) + resampled["sy"].fillna(0)
+def _records_frame(records: list) -> pd.DataFrame:
+    """Timeseries records back as a frame indexed by timestamp (each column's type inferred once)."""
+    if not records:
+        return pd.DataFrame()
+    columns = [c for c in _ordered_columns(records) if c != "timestamp"]
+    index = pd.DatetimeIndex(pd.to_datetime([r["timestamp"] for r in records], format=_TS_FORMAT))
+    return pd.DataFrame({c: pd.array([r.get(c) for r in records]) for c in columns}, index=index)
 
-    resampled["timestamp"] = resampled["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S")
 
-    records = resampled.where(resampled.notna(), None).to_dict(orient="records")
-    return _mark_gaps(records)
+def _resample_mgstat(mg_df: pd.DataFrame, interval: str) -> list:
+    """_resample_mgstat_frame as records (list of dicts with 'timestamp')."""
+    return _timeseries_records(_resample_mgstat_frame(mg_df, interval))
+
+
+def _resample_vmstat(vm_df: pd.DataFrame, interval: str) -> list:
+    """_resample_vmstat_frame as records (list of dicts with 'timestamp')."""
+    return _timeseries_records(_resample_vmstat_frame(vm_df, interval))
+
+
+def _nullable_ints(frame: pd.DataFrame) -> pd.DataFrame:
+    """Integer columns as nullable Int64, so rows added by a join keep them integers."""
+    ints = {c: "Int64" for c in frame.columns if pd.api.types.is_integer_dtype(frame[c].dtype)}
+    return frame.astype(ints) if ints else frame
+
+
+def _merge_frames(mg: pd.DataFrame, vm: pd.DataFrame) -> pd.DataFrame:
+    """
+    Outer-join resampled mgstat and vmstat frames on their index (sorted).
+    Missing values in either source stay missing; where both have a column
+    (_gap_after), vmstat's value wins.
+    """
+    if vm.empty:
+        return mg.sort_index()
+    if mg.empty:
+        return vm.sort_index()
+    mg, vm = _nullable_ints(mg), _nullable_ints(vm)
+    shared = [c for c in vm.columns if c in mg.columns]
+    merged = mg.join(vm.drop(columns=shared), how="outer")
+    for col in shared:
+        merged[col] = vm[col].combine_first(mg[col])
+    return merged
 
 
 def _merge_timeseries(mg_records: list, vm_records: list) -> list:
@@ -291,25 +330,13 @@ def _merge_timeseries(mg_records: list, vm_records: list) -> list:
     Missing values in either source become None.
     Returns records sorted by 'timestamp'.
     """
-    mg_map = {r["timestamp"]: dict(r) for r in mg_records}
-    vm_map = {r["timestamp"]: dict(r) for r in vm_records}
-
-    all_timestamps = sorted(set(mg_map) | set(vm_map))
-    merged = []
-    for ts in all_timestamps:
-        row = {"timestamp": ts}
-        if ts in mg_map:
-            row.update({k: v for k, v in mg_map[ts].items() if k != "timestamp"})
-        if ts in vm_map:
-            row.update({k: v for k, v in vm_map[ts].items() if k != "timestamp"})
-        merged.append(row)
-    return merged
+    return _timeseries_records(_merge_frames(_records_frame(mg_records), _records_frame(vm_records)))
 
 
 # Columns included in period statistics
 _PERIOD_MG_COLS = ["Glorefs", "Gloupds", "PhyRds", "PhyWrs", "Jrnwrts", "Rdratio", "WDQsz", "PPGupds"]
 _PERIOD_VM_COLS = ["r", "b", "sy", "wa", "si", "so"]
-_WEEKDAY_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+_WEEKDAY_ORDER = _pa._WEEKDAY_ORDER
 
 # IRIS Health Monitor periods that are considered business hours (Mon–Fri only).
 # Period names use en-dash (–) as in performance_analysis.IRIS_PERIODS.
@@ -336,41 +363,46 @@ def _series_stats(vals) -> Optional[dict]:
     }
 
 
-def _add_period_cols(df: pd.DataFrame) -> pd.DataFrame:
-    """Copy of df with _weekday and _period columns; rows outside all IRIS periods dropped."""
-    df = df.copy()
-    df["_weekday"] = df["dt"].dt.day_name()
-    df["_period"] = df["dt"].dt.strftime("%H:%M").apply(_pa._label_period)
-    return df.dropna(subset=["_period"])
+def _stats_by_period(stats: pd.DataFrame) -> dict:
+    """{(weekday, period): {metric: _series_stats()-shaped dict}} from a _pa._period_stats() frame."""
+    result = {}
+    if stats.empty:
+        return result
+    metrics = list(dict.fromkeys(stats.columns.get_level_values(0)))
+    for key, row in zip(stats.index, stats.to_dict("records")):
+        entry = result[key] = {}
+        for metric in metrics:
+            if row[(metric, "n_samples")] > 0:
+                entry[metric] = {stat: float(row[(metric, stat)]) for stat in _pa.PERIOD_STATS}
+                entry[metric]["n_samples"] = int(row[(metric, "n_samples")])
+    return result
 
 
-def _compute_period_stats(mg_df: pd.DataFrame, vm_df: pd.DataFrame) -> list:
+def _compute_period_stats(mg_df: pd.DataFrame, vm_df: pd.DataFrame, mg_stats: Optional[pd.DataFrame] = None) -> list:
     """
     Per weekday × IRIS Health Monitor period stats from full-resolution data.
     Returns [{"weekday", "period", "metrics": {metric: stats}}] sorted by
     weekday then period. vmstat gains a derived us_sy column.
+    mg_stats: _pa._period_stats() of mg_df covering _PERIOD_MG_COLS, if already computed.
     """
     buckets = {}
 
-    def _collect(df, cols, derive_us_sy=False):
-        if df is None or df.empty or "dt" not in df.columns:
-            return
-        df = _add_period_cols(df)
-        if df.empty:
-            return
-        if derive_us_sy and "us" in df.columns and "sy" in df.columns:
-            df["us_sy"] = (pd.to_numeric(df["us"], errors="coerce")
-                           + pd.to_numeric(df["sy"], errors="coerce"))
-            cols = cols + ["us_sy"]
-        for (weekday, period), group in df.groupby(["_weekday", "_period"]):
-            metrics = buckets.setdefault((weekday, period), {})
-            for col in cols:
-                if col in group.columns:
-                    stats = _series_stats(group[col])
-                    if stats:
-                        metrics[col] = stats
-
-    _collect(mg_df, _PERIOD_MG_COLS)
+    def _collect(df, cols, stats=None, derive_us_sy=False):
+        if stats is None:
+            if df is None or df.empty or "dt" not in df.columns:
+                return
+            df = _pa._with_periods(df)
+            if derive_us_sy and "us" in df.columns and "sy" in df.columns:
+                df = df.assign(us_sy=pd.to_numeric(df["us"], errors="coerce")
+                               + pd.to_numeric(df["sy"], errors="coerce"))
+                cols = cols + ["us_sy"]
+            stats = _pa._period_stats(df, cols)
+        else:
+            stats = stats[[c for col in cols for c in stats.columns if c[0] == col]]
+        for key, metrics in _stats_by_period(stats).items():
+            buckets.setdefault(key, {}).update(metrics)
+
+    _collect(mg_df, _PERIOD_MG_COLS, mg_stats)
     _collect(vm_df, _PERIOD_VM_COLS, derive_us_sy=True)
 
     period_order = [p["name"] for p in _pa.IRIS_PERIODS]
@@ -438,33 +470,58 @@ def _serialise_finding(f) -> dict:
     }
 
 
-def _load_mg_df(connection) -> pd.DataFrame:
-    """Load mgstat from SQLite and add a 'dt' column."""
+# Columns the export reads from each table (besides the time columns); the
+# rest of a multi-week table stays in SQLite.
+_MG_LOAD_COLS = list(dict.fromkeys(_MG_MEAN_COLS + _MG_MAX_COLS + _PERIOD_MG_COLS + ["RouLas"]))
+_VM_LOAD_COLS = list(dict.fromkeys(_VM_MEAN_COLS + _VM_MAX_COLS + _PERIOD_VM_COLS + ["buff"]))
+_IOSTAT_LOAD_COLS = ["Device"] + _IOSTAT_COLS + ["avgqu-sz"]
+
+
+def _read_table(connection, table: str, columns: Optional[list] = None,
+                rowids: Optional[tuple] = None) -> pd.DataFrame:
+    """
+    SELECT the time columns (datetime, RunDate, RunTime) and those of columns
+    the table has (columns may include "rowid"), or every column when columns
+    is None; only the rows with rowid in the (first, last) range rowids, if given.
+    """
+    where, params = ("", ()) if rowids is None else (" WHERE rowid BETWEEN ? AND ?", tuple(rowids))
+    if columns is not None:
+        have = [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+        if have:
+            wanted = dict.fromkeys(c for c in ["datetime", "RunDate", "RunTime"] + list(columns)
+                                   if c in have or c == "rowid")
+            select = ", ".join('"' + c.replace('"', '""') + '"' for c in wanted)
+            return pd.read_sql_query(f"SELECT {select} FROM {table}{where}", connection, params=params)
+    return pd.read_sql_query(f"SELECT * FROM {table}{where}", connection, params=params)
+
+
+def _add_dt(df: pd.DataFrame) -> None:
+    """Parse the 'dt' column from datetime, or RunDate + RunTime."""
+    if "datetime" in df.columns:
+        df["dt"] = _parse_datetime_series(df["datetime"])
+    else:
+        df["dt"] = _parse_datetime_series(
+            df["RunDate"].str.strip() + " " + df["RunTime"].str.strip()
+        )
+
+
+def _load_mg_df(connection, columns: Optional[list] = None, rowids: Optional[tuple] = None) -> pd.DataFrame:
+    """Load mgstat (every column, or columns; rowids as _read_table) from SQLite and add a 'dt' column."""
     try:
-        df = pd.read_sql_query("SELECT * FROM mgstat", connection)
+        df = _read_table(connection, "mgstat", columns, rowids)
         df.dropna(subset=["RunDate", "RunTime"], inplace=True)
-        if "datetime" in df.columns:
-            df["dt"] = _parse_datetime_series(df["datetime"])
-        else:
-            df["dt"] = _parse_datetime_series(
-                df["RunDate"].str.strip() + " " + df["RunTime"].str.strip()
-            )
+        _add_dt(df)
         return df.dropna(subset=["dt"]).sort_values("dt").reset_index(drop=True)
     except Exception:
         return pd.DataFrame()
 
 
-def _load_vm_df(connection) -> pd.DataFrame:
-    """Load vmstat from SQLite and add a 'dt' column."""
+def _load_vm_df(connection, columns: Optional[list] = None, rowids: Optional[tuple] = None) -> pd.DataFrame:
+    """Load vmstat (every column, or columns; rowids as _read_table) from SQLite and add a 'dt' column."""
     try:
-        df = pd.read_sql_query("SELECT * FROM vmstat", connection)
+        df = _read_table(connection, "vmstat", columns, rowids)
         df.dropna(subset=["RunDate", "RunTime"], inplace=True)
-        if "datetime" in df.columns:
-            df["dt"] = _parse_datetime_series(df["datetime"])
-        else:
-            df["dt"] = _parse_datetime_series(
-                df["RunDate"].str.strip() + " " + df["RunTime"].str.strip()
-            )
+        _add_dt(df)
         return df.dropna(subset=["dt"]).sort_values("dt").reset_index(drop=True)
     except Exception:
         return pd.DataFrame()
@@ -614,18 +671,22 @@ def _key_metrics_slice(mg_df, vm_df, iostat_df, role_map, facts) -> dict:
 def _slice_by_period(df, weekday: str, period: str):
     if df is None or df.empty or "dt" not in getattr(df, "columns", []):
         return pd.DataFrame()
-    d = _add_period_cols(df)
+    d = _pa._with_periods(df)
     return d[(d["_weekday"] == weekday) & (d["_period"] == period)]
 
 
-def _compute_key_metrics(mg_df, vm_df, iostat_df, role_map, facts) -> dict:
-    """Analyst scorecard: overall window plus the peak (highest mean Glorefs) weekday×period."""
+def _compute_key_metrics(mg_df, vm_df, iostat_df, role_map, facts, mg_stats=None) -> dict:
+    """
+    Analyst scorecard: overall window plus the peak (highest mean Glorefs) weekday×period.
+    mg_stats: _pa._period_stats() of mg_df covering Glorefs, if already computed.
+    """
     overall = _key_metrics_slice(mg_df, vm_df, iostat_df, role_map, facts)
     peak = None
     if mg_df is not None and not mg_df.empty and "Glorefs" in mg_df.columns:
-        dfp = _add_period_cols(mg_df)
-        if not dfp.empty:
-            means = dfp.groupby(["_weekday", "_period"])["Glorefs"].mean()
+        if mg_stats is None:
+            mg_stats = _pa._period_stats(mg_df, ["Glorefs"])
+        if not mg_stats.empty:
+            means = mg_stats[("Glorefs", "mean")].dropna()
             if not means.empty:
                 weekday, period = means.idxmax()
                 peak = {
@@ -701,27 +762,26 @@ def _load_iostat_role_map(connection) -> dict:
     return result
 
 
-def _resample_iostat(iostat_df: pd.DataFrame, device: str, interval: str) -> list:
+def _resample_iostat_frame(iostat_df: pd.DataFrame, device: str, interval: str) -> pd.DataFrame:
     """
     Resample iostat DataFrame for one device to interval.
-    All 8 metrics aggregated as max. Returns [] if device not present.
+    All 8 metrics aggregated as max, keyed by their JSON-safe names, plus
+    _gap_after. Empty DataFrame if device not present.
 
     aqu-sz / avgqu-sz alias: if both columns are present, aqu-sz is preferred
     and avgqu-sz is dropped.  If only avgqu-sz is present, it is used and maps
     to the aqu_sz key.
     """
-    df = iostat_df[iostat_df["Device"] == device].copy()
+    df = iostat_df[iostat_df["Device"] == device]
     if df.empty:
-        return []
+        return pd.DataFrame()
 
     # Resolve the aqu-sz / avgqu-sz alias before indexing.
     if "aqu-sz" in df.columns and "avgqu-sz" in df.columns:
-        df.drop(columns=["avgqu-sz"], inplace=True)
+        df = df.drop(columns=["avgqu-sz"])
     elif "avgqu-sz" in df.columns:
         # rename so the generic loop below finds it via _IOSTAT_COL_MAP
-        df.rename(columns={"avgqu-sz": "aqu-sz"}, inplace=True)
-
-    df = df.set_index("dt").sort_index()
+        df = df.rename(columns={"avgqu-sz": "aqu-sz"})
 
     agg = {}
     for src_col in _IOSTAT_COLS:
@@ -729,72 +789,219 @@ def _resample_iostat(iostat_df: pd.DataFrame, device: str, interval: str) -> lis
             json_key = _IOSTAT_COL_MAP[src_col]
             agg[json_key] = pd.NamedAgg(column=src_col, aggfunc="max")
 
-    if not agg:
-        return []
+    resampled = _resample_frame(df, interval, agg)
+    if not resampled.empty:
+        resampled["_gap_after"] = _gap_flags(resampled.index)
+    return resampled
 
-    resampled = df.resample(interval).agg(**agg).dropna(how="all").reset_index()
-    resampled.rename(columns={"dt": "timestamp"}, inplace=True)
-    resampled["timestamp"] = resampled["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S")
 
-    records = resampled.where(resampled.notna(), None).to_dict(orient="records")
-    return _mark_gaps(records)
+def _resample_iostat(iostat_df: pd.DataFrame, device: str, interval: str) -> list:
+    """_resample_iostat_frame as records. Returns [] if device not present."""
+    return _timeseries_records(_resample_iostat_frame(iostat_df, device, interval))
 
 
-def _load_iostat_df(connection) -> pd.DataFrame:
-    """Load iostat from SQLite with a 'dt' column. Empty DataFrame on any error."""
+def _load_iostat_df(connection, columns: Optional[list] = None, rowids: Optional[tuple] = None) -> pd.DataFrame:
+    """
+    Load iostat (every column, or columns; rowids as _read_table) from SQLite
+    with a 'dt' column. Empty DataFrame on any error.
+    """
     try:
-        df = pd.read_sql_query("SELECT * FROM iostat", connection)
+        df = _read_table(connection, "iostat", columns, rowids)
         if df.empty:
             return pd.DataFrame()
-        if "datetime" in df.columns:
-            df["dt"] = _parse_datetime_series(df["datetime"])
-        else:
-            df["dt"] = _parse_datetime_series(
-                df["RunDate"].str.strip() + " " + df["RunTime"].str.strip()
-            )
+        _add_dt(df)
         return df.dropna(subset=["dt"]).reset_index(drop=True)
     except Exception:
         return pd.DataFrame()
 
 
-def _build_iostat_timeseries(connection, interval: str) -> list:
+# Rows per query when the anomaly detectors read a whole table
+_ANOMALY_CHUNK_ROWS = 50_000
+
+# Columns of mgstat, vmstat and iostat that are not metrics
+_NOT_METRICS = {"id_key", "datetime", "RunDate", "RunTime", "Device", "html name"}
+
+
+def _table_chunks(connection, table: str, data: "_RunData", devices: Optional[list] = None):
     """
-    Build iostat timeseries for IRIS-role devices only.
-    Returns list of {role, device, records} dicts. Returns [] if no roles or no iostat table.
+    Yield the rows of table that data (the run's _RunData) holds (only those
+    of devices, for iostat) _ANOMALY_CHUNK_ROWS at a time in rowid order,
+    each chunk with 'dt', Device (iostat) and every metric column as numbers.
+    'dt' and the columns data already has are joined from it by rowid; only
+    the other columns are read. Stops on any error.
     """
-    role_map = _load_iostat_role_map(connection)
-    if not role_map:
-        return []
-    iostat_df = _load_iostat_df(connection)
-    if iostat_df.empty:
+    try:
+        frame = getattr(data, table)
+        if frame.empty or table not in data.row_keys:
+            return
+        have = [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+        metrics = [c for c in have if c not in _NOT_METRICS]
+        if not metrics:
+            return
+        known = [c for c in metrics if c in frame.columns]
+        loaded = pd.concat([frame[["dt"]], frame[known].apply(pd.to_numeric, errors="coerce")], axis=1)
+        loaded.index = data.row_keys[table]
+        keys = ["Device"] if devices is not None else []
+        extra = [c for c in metrics if c not in frame.columns]
+        select = ", ".join(["rowid"] + ['"' + c.replace('"', '""') + '"' for c in keys + extra])
+        where, params = [], []
+        if data.rowids(table) is not None:
+            where.append("rowid BETWEEN ? AND ?")
+            params.extend(data.rowids(table))
+        if devices is not None:
+            where.append(f"Device IN ({', '.join('?' * len(devices))})")
+            params.extend(devices)
+        where = f" WHERE {' AND '.join(where)}" if where else ""
+        for chunk in pd.read_sql_query(f"SELECT {select} FROM {table}{where} ORDER BY rowid", connection,
+                                       params=params, chunksize=_ANOMALY_CHUNK_ROWS):
+            chunk.index = chunk.pop("rowid").to_numpy()
+            chunk = pd.concat([loaded.reindex(chunk.index), chunk[keys],
+                               chunk[extra].apply(pd.to_numeric, errors="coerce")], axis=1)
+            yield chunk.dropna(subset=["dt"])[["dt"] + keys + metrics].reset_index(drop=True)
+    except Exception:
+        return
+
+
+def _latest_load(connection) -> Optional[dict]:
+    """
+    {table: (first_rowid, last_rowid)} of the last input file loaded into the
+    database, from the append log; None without one.
+    """
+    try:
+        rows = connection.execute(
+            f"SELECT input_name, table_name, first_rowid, last_rowid FROM {chart_rollups.APPEND_LOG_TABLE} ORDER BY id"
+        ).fetchall()
+    except Exception:
+        return None
+    if not rows:
+        return None
+    latest = rows[-1][0]
+    return {table: (first, last) for name, table, first, last in rows if name == latest}
+
+
+class _RunData:
+    """
+    The tables one LLM export reads, each loaded once with only the columns the
+    analysis uses and 'dt' parsed once; every stage takes its frames from here.
+    load: {table: (first_rowid, last_rowid)} to read only those rows (tables
+    missing from it are empty), as _latest_load() returns.
+    row_keys: {table: the SQLite rowid of each row of its frame}, so the rest
+    of a row can be read later without parsing its time again.
+    """
+
+    def __init__(self, connection, load: Optional[dict] = None):
+        self.load = load
+        self.row_keys = {}
+        self.mgstat = self._keyed("mgstat", _load_mg_df(connection, _MG_LOAD_COLS + ["rowid"], self.rowids("mgstat")))
+        self.vmstat = self._keyed("vmstat", _load_vm_df(connection, _VM_LOAD_COLS + ["rowid"], self.rowids("vmstat")))
+        self.iostat = self._keyed("iostat", _load_iostat_df(connection, _IOSTAT_LOAD_COLS + ["rowid"],
+                                                            self.rowids("iostat")))
+        self.role_map = _load_iostat_role_map(connection)
+
+    def rowids(self, table: str) -> Optional[tuple]:
+        """The rowid range of table this run reads, None for all of it."""
+        return None if self.load is None else self.load.get(table, (0, 0))
+
+    def _keyed(self, table: str, df: pd.DataFrame) -> pd.DataFrame:
+        if "rowid" in df.columns:
+            self.row_keys[table] = df.pop("rowid").to_numpy()
+        return df
+
+
+def _iostat_frames(iostat_df: pd.DataFrame, role_map: dict, interval: str) -> list:
+    """[{role, device, records}] with each IRIS-role device's resampled frame as records."""
+    if not role_map or iostat_df.empty:
         return []
     result = []
     for role, device in role_map.items():
-        records = _resample_iostat(iostat_df, device, interval)
-        if records:
-            result.append({"role": role, "device": device, "records": records})
+        frame = _resample_iostat_frame(iostat_df, device, interval)
+        if not frame.empty:
+            result.append({"role": role, "device": device, "records": frame})
     return result
 
 
-def _run_correlation_tests(joined: pd.DataFrame) -> list:
-    """Run all 7 cross-signal correlation tests; return list of Finding."""
-    results = []
-    for test_fn in (
-        _pa._test_user_stall,
-        _pa._test_buffer_pressure,
-        _pa._test_write_daemon_strain,
-        _pa._test_memory_danger,
-        _pa._test_contention_vs_throughput,
-        _pa._test_kernel_overhead,
-        _pa._test_batch_window,
-    ):
+def _build_iostat_timeseries(connection, interval: str, data: Optional[_RunData] = None) -> list:
+    """
+    Build iostat timeseries for IRIS-role devices only.
+    Returns list of {role, device, records} dicts. Returns [] if no roles or no iostat table.
+    data: the run's _RunData, if already loaded.
+    """
+    role_map = data.role_map if data is not None else _load_iostat_role_map(connection)
+    if not role_map:
+        return []
+    iostat_df = data.iostat if data is not None else _load_iostat_df(connection)
+    return [dict(series, records=_timeseries_records(series["records"]))
+            for series in _iostat_frames(iostat_df, role_map, interval)]
+
+
+def _detect_anomalies(connection, data: _RunData) -> list:
+    """
+    Anomaly findings (performance_analysis.AnomalyDetector) over every numeric
+    mgstat and vmstat column and those of each IRIS-role iostat device. The
+    tables are streamed a chunk at a time: data holds only the columns the
+    KPI checks use, and the times already parsed.
+    """
+    detectors = []
+    for table in ("mgstat", "vmstat"):
+        detector = _pa.AnomalyDetector(table)
+        for chunk in _table_chunks(connection, table, data):
+            detector.feed(chunk)
+        detectors.append(detector)
+
+    roles = {}
+    for role, device in data.role_map.items():
+        roles.setdefault(device, []).append(role)
+    by_device = {device: _pa.AnomalyDetector(f"iostat {device} ({', '.join(names)})")
+                 for device, names in roles.items()}
+    if by_device:
+        for chunk in _table_chunks(connection, "iostat", data, list(by_device)):
+            for device, detector in by_device.items():
+                detector.feed(chunk[chunk["Device"] == device].drop(columns="Device"))
+        detectors.extend(by_device.values())
+    return _pa._anomaly_findings(detectors)
+
+
+# The cross-signal correlation tests, in the order their findings are listed
+_CORRELATION_TESTS = (
+    _pa._test_user_stall,
+    _pa._test_buffer_pressure,
+    _pa._test_write_daemon_strain,
+    _pa._test_memory_danger,
+    _pa._test_contention_vs_throughput,
+    _pa._test_kernel_overhead,
+    _pa._test_batch_window,
+)
+
+# Those that need only mgstat, for a run without vmstat
+_MGSTAT_CORRELATION_TESTS = (
+    _pa._test_buffer_pressure,
+    _pa._test_write_daemon_strain,
+    _pa._test_contention_vs_throughput,
+    _pa._test_batch_window,
+)
+
+
+def _run_correlation_tests(joined: pd.DataFrame, tests: tuple = _CORRELATION_TESTS, workers: int = 1) -> list:
+    """
+    Run the cross-signal correlation tests; return list of Finding.
+    joined is prepared once (sorted, numeric columns, hour masks) and shared
+    by every test. With workers > 1 the tests run on a thread pool; the
+    findings are in the order of tests either way.
+    """
+    frame = _pa.CorrelationFrame(joined)
+
+    def run(test_fn):
         try:
-            r = test_fn(joined)
-            if r is not None:
-                results.append(r)
+            return test_fn(frame)
         except Exception:
-            pass
-    return results
+            return None
+
+    if workers > 1 and len(tests) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(tests))) as pool:
+            results = list(pool.map(run, tests))
+    else:
+        results = [run(test_fn) for test_fn in tests]
+    return [r for r in results if r is not None]
 
 
 _SCRUB_ALLOWLIST = {"IRIS", "LINUX", "TEST", "PROD", "DEV", "LIVE"}
@@ -828,31 +1035,67 @@ def _gather_secrets(sp_dict: dict) -> list:
     return sorted(keep, key=len, reverse=True)
 
 
+def _secrets_pattern(secrets: list):
+    """
+    All secrets as one compiled alternation: case-insensitive, word-boundary
+    matched, longest first so an FQDN is redacted before its short hostname.
+    """
+    alternation = "|".join(re.escape(secret) for secret in sorted(secrets, key=len, reverse=True))
+    return re.compile(r"(?<![A-Za-z0-9])(?:" + alternation + r")(?![A-Za-z0-9])", re.IGNORECASE)
+
+
 def _scrub(obj, secrets: list):
     """
     Recursively redact secrets in all strings of a dict/list structure.
     Case-insensitive, word-boundary matched. Best-effort: never raises.
+    Non-string leaves are passed through untouched; dict keys (the same
+    handful repeated across every timeseries record) are scrubbed once each.
     """
     if not secrets:
         return obj
     try:
-        if isinstance(obj, str):
-            for secret in secrets:
-                pattern = re.compile(
-                    r"(?<![A-Za-z0-9])" + re.escape(secret) + r"(?![A-Za-z0-9])",
-                    re.IGNORECASE,
-                )
-                obj = pattern.sub(_REDACTED, obj)
-            return obj
-        if isinstance(obj, dict):
-            return {_scrub(k, secrets): _scrub(v, secrets) for k, v in obj.items()}
-        if isinstance(obj, list):
-            return [_scrub(v, secrets) for v in obj]
+        sub = _secrets_pattern(secrets).sub
+    except re.error:
         return obj
+    keys = {}
+    numbers = (int, float)
+
+    def _key(k):
+        keys[k] = sub(_REDACTED, k) if isinstance(k, str) else k
+        return keys[k]
+
+    def _walk(o):
+        if isinstance(o, str):
+            return sub(_REDACTED, o)
+        if isinstance(o, dict):
+            # Numbers and None (most of a timeseries record) are not visited
+            return {keys[k] if k in keys else _key(k): v if v is None or type(v) in numbers else _walk(v)
+                    for k, v in o.items()}
+        if isinstance(o, list):
+            return [_walk(v) for v in o]
+        return o
+
+    try:
+        return _walk(obj)
     except Exception:
         return obj
 
 
+def _scrub_text(text: str, secrets: list) -> str:
+    """
+    Redact secrets in rendered text in one pass, then check none survived
+    (e.g. a secret that is a substring of the replacement). Raises ValueError
+    rather than return text that still identifies the site.
+    """
+    if not secrets:
+        return text
+    pattern = _secrets_pattern(secrets)
+    text = pattern.sub(_REDACTED, text)
+    if pattern.search(text):
+        raise ValueError("Anonymization incomplete: an identifier survived redaction; bundle not written.")
+    return text
+
+
 def _auto_resample_interval(n_days) -> str:
     """Timeseries interval scaled to window length so bundles stay chat-sized."""
     if not n_days or n_days <= 2:
@@ -862,33 +1105,283 @@ def _auto_resample_interval(n_days) -> str:
     return "30min"
 
 
+# ---- Token budget ----
+
+# Characters of rendered markdown/CSV per token, a conservative average for numeric tables
+_CHARS_PER_TOKEN = 4
+# Timeseries intervals a token budget chooses from, finest first; each divides a day
+_BUDGET_INTERVALS = ["1min", "2min", "5min", "10min", "15min", "30min",
+                     "60min", "120min", "240min", "480min", "1440min"]
+# Inside finding windows, the interval is this many steps finer than elsewhere
+_FOCUS_STEPS = 2
+# Context kept either side of the time range a finding names
+_FOCUS_MARGIN = pd.Timedelta("30min")
+# Longer ranges ("first sample – last sample") describe the whole window, not an event
+_FOCUS_MAX = pd.Timedelta("6h")
+# Share of the budget the estimate aims for; rendered sizes vary a little around it
+_BUDGET_FILL = 0.97
+# A time range in a finding's 'when'
+_WHEN_RANGE = re.compile(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) – (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})")
+
+
+def _focus_windows(findings: list) -> list:
+    """
+    Time ranges (up to _FOCUS_MAX long) named in the serialised findings,
+    widened by _FOCUS_MARGIN and merged.
+    """
+    ranges = [(pd.Timestamp(start), pd.Timestamp(end))
+              for f in findings for start, end in _WHEN_RANGE.findall(f.get("when") or "")]
+    spans = sorted((start - _FOCUS_MARGIN, end + _FOCUS_MARGIN)
+                   for start, end in ranges if end - start <= _FOCUS_MAX)
+    windows = []
+    for start, end in spans:
+        if windows and start <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], end)
+        else:
+            windows.append([start, end])
+    return [(start, end) for start, end in windows]
+
+
+def _in_windows(dts: pd.Series, windows: list, interval: str) -> np.ndarray:
+    """Mask of dts inside windows, each window widened to whole interval bins."""
+    inside = np.zeros(len(dts), dtype=bool)
+    for start, end in windows:
+        inside |= ((dts >= start.floor(interval)) & (dts < end.ceil(interval))).to_numpy()
+    return inside
+
+
+def _cell_width(vals) -> float:
+    """Mean rendered width of a numeric column, from a sample of its values."""
+    vals = pd.to_numeric(vals, errors="coerce").dropna()
+    if vals.empty:
+        return 0.0
+    sample = vals.sample(min(len(vals), 200), random_state=0).astype(float)
+    return float(np.mean([len(_fmt_num(v)) for v in sample]))
+
+
+class _Section:
+    """
+    One timeseries CSV block as the budget sees it: its samples' times and
+    the width of a rendered row, so its size at any interval is a bin count.
+    """
+
+    def __init__(self, name: str, dts: pd.Series, widths: list):
+        self.name = name
+        self.dts = dts.reset_index(drop=True)
+        self._ns = self.dts.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        # timestamp, _gap_after and the metric cells, plus a separator each
+        self.row_chars = 19 + 5 + sum(widths) + len(widths) + 2
+
+    def rows(self, interval: str, focus_interval: str, windows: list) -> int:
+        inside = _in_windows(self.dts, windows, interval) if windows else np.zeros(len(self._ns), dtype=bool)
+        return (len(np.unique(self._ns[~inside] // pd.Timedelta(interval).value))
+                + len(np.unique(self._ns[inside] // pd.Timedelta(focus_interval).value)))
+
+    def tokens(self, interval: str, focus_interval: str, windows: list) -> int:
+        rows = self.rows(interval, focus_interval, windows) + 1  # header
+        return (rows * self.row_chars + 80) // _CHARS_PER_TOKEN  # + heading and fence
+
+
+def _budget_sections(mg_df, vm_df, iostat_df, role_map) -> list:
+    """_Section for the merged mgstat + vmstat block and for each IRIS-role iostat device."""
+    sections = []
+    widths = []
+    for df, cols in ((mg_df, _MG_MEAN_COLS + _MG_MAX_COLS), (vm_df, _VM_MEAN_COLS + _VM_MAX_COLS)):
+        if not df.empty:
+            widths += [_cell_width(df[c]) for c in cols if c in df.columns]
+    if "us" in vm_df.columns and "sy" in vm_df.columns:
+        widths.append(_cell_width(pd.to_numeric(vm_df["us"], errors="coerce")
+                                  + pd.to_numeric(vm_df["sy"], errors="coerce")))
+    dts = pd.concat([df["dt"] for df in (mg_df, vm_df) if not df.empty] or [pd.Series(dtype="datetime64[ns]")])
+    if not dts.empty:
+        sections.append(_Section("mgstat + vmstat", dts, widths))
+    if not iostat_df.empty and "Device" in iostat_df.columns:
+        for role, device in role_map.items():
+            rows = iostat_df[iostat_df["Device"] == device]
+            if not rows.empty:
+                cols = [c for c in _IOSTAT_COLS + ["avgqu-sz"] if c in rows.columns]
+                sections.append(_Section(f"iostat {role}", rows["dt"], [_cell_width(rows[c]) for c in cols]))
+    return sections
+
+
+def _choose_intervals(sections: list, budget: int, fixed_tokens: int, windows: list,
+                      sample_seconds: Optional[float]) -> tuple:
+    """
+    Per-section (interval, focus_interval) that fit the bundle in budget tokens.
+    Every section starts at the finest interval above the sample interval; the
+    largest section is coarsened a step at a time until the estimate fits
+    (_BUDGET_FILL of the budget) or everything is at the coarsest interval,
+    then any section that can be a step finer within the budget is. Returns ({name: (interval,
+    focus_interval)}, estimated_tokens).
+    """
+    finest = 0
+    if sample_seconds:
+        while (finest < len(_BUDGET_INTERVALS) - 1
+               and pd.Timedelta(_BUDGET_INTERVALS[finest]).total_seconds() < sample_seconds):
+            finest += 1
+
+    def _pair(level):
+        return _BUDGET_INTERVALS[level], _BUDGET_INTERVALS[max(finest, level - _FOCUS_STEPS)]
+
+    levels = {s.name: finest for s in sections}
+    estimates = {s.name: s.tokens(*_pair(finest), windows) for s in sections}
+    while fixed_tokens + sum(estimates.values()) > budget * _BUDGET_FILL:
+        coarsenable = [s for s in sections if levels[s.name] < len(_BUDGET_INTERVALS) - 1]
+        if not coarsenable:
+            break
+        section = max(coarsenable, key=lambda s: estimates[s.name])
+        levels[section.name] += 1
+        estimates[section.name] = section.tokens(*_pair(levels[section.name]), windows)
+    # Coarsening the largest block can overshoot: spend what is left on finer steps that still fit
+    while True:
+        spare = budget * _BUDGET_FILL - fixed_tokens - sum(estimates.values())
+        finer = [(s.tokens(*_pair(levels[s.name] - 1), windows), s) for s in sections if levels[s.name] > finest]
+        finer = [(tokens, s) for tokens, s in finer if tokens - estimates[s.name] <= spare]
+        if not finer:
+            break
+        tokens, section = min(finer, key=lambda pair: pair[0] - estimates[pair[1].name])
+        levels[section.name] -= 1
+        estimates[section.name] = tokens
+    return ({name: _pair(level) for name, level in levels.items()},
+            fixed_tokens + sum(estimates.values()))
+
+
+def _resample_focused(resample, df: pd.DataFrame, interval: str, focus_interval: str, windows: list) -> pd.DataFrame:
+    """
+    resample(df, interval) frame, at focus_interval inside windows; gaps are
+    re-marked against each row's own interval.
+    """
+    if df.empty:
+        return pd.DataFrame()
+    if not windows or focus_interval == interval:
+        return resample(df, interval)
+    inside = _in_windows(df["dt"], windows, interval)
+    frames, seconds = [], []
+    for part, step in ((df[~inside], interval), (df[inside], focus_interval)):
+        if not part.empty:
+            frame = resample(part, step)
+            frames.append(_nullable_ints(frame))
+            seconds.append(np.full(len(frame), pd.Timedelta(step).total_seconds()))
+    frame = pd.concat(frames)
+    order = np.argsort(frame.index.to_numpy(), kind="stable")
+    frame = frame.iloc[order]
+    frame["_gap_after"] = _gap_flags(frame.index, np.concatenate(seconds)[order])
+    return frame
+
+
+def _budget_timeseries(ctx: dict, budget: int, mg_df, vm_df, iostat_df, role_map, sample_seconds) -> dict:
+    """
+    The 'timeseries' entry of ctx sized to fit the whole bundle in budget tokens.
+    The rest of the bundle is rendered once to measure it; each timeseries
+    block is sized from its bin counts at each interval, without rendering.
+    """
+    windows = _focus_windows(ctx["findings"])
+    fixed = dict(ctx, timeseries=dict(ctx["timeseries"], records=[], iostat=[], token_budget=budget,
+                                      focus_windows=[[str(start), str(end)] for start, end in windows]))
+    fixed_tokens = len(_render_markdown(fixed)) // _CHARS_PER_TOKEN
+    sections = _budget_sections(mg_df, vm_df, iostat_df, role_map)
+    chosen, estimate = _choose_intervals(sections, budget, fixed_tokens, windows, sample_seconds)
+    if estimate > budget:
+        # Everything else is rendered as is; say so rather than hand over a bundle that does not fit
+        warnings.warn(f"LLM context bundle is about {int(estimate)} tokens, over the budget of {budget}: "
+                      f"the sections besides the timeseries take about {fixed_tokens} on their own.")
+
+    timeseries = dict(ctx["timeseries"], token_budget=budget, estimated_tokens=int(estimate),
+                      fixed_tokens=fixed_tokens)
+    interval, focus_interval = chosen.get("mgstat + vmstat", (_BUDGET_INTERVALS[-1],) * 2)
+    timeseries["resample_interval"] = interval
+    if windows:
+        timeseries["focus_interval"] = focus_interval
+        timeseries["focus_windows"] = [[start.strftime("%Y-%m-%d %H:%M:%S"), end.strftime("%Y-%m-%d %H:%M:%S")]
+                                       for start, end in windows]
+    timeseries["records"] = _merge_frames(
+        _resample_focused(_resample_mgstat_frame, mg_df, interval, focus_interval, windows),
+        _resample_focused(_resample_vmstat_frame, vm_df, interval, focus_interval, windows))
+    iostat = []
+    for role, device in role_map.items():
+        if f"iostat {role}" not in chosen:
+            continue
+        interval, focus_interval = chosen[f"iostat {role}"]
+        records = _resample_focused(lambda df, step: _resample_iostat_frame(df, device, step),
+                                    iostat_df, interval, focus_interval, windows)
+        if not records.empty:
+            series = {"role": role, "device": device, "resample_interval": interval}
+            if windows:
+                series["focus_interval"] = focus_interval
+            iostat.append(dict(series, records=records))
+    timeseries.pop("iostat", None)
+    if iostat:
+        timeseries["iostat"] = iostat
+    return timeseries
+
+
 def build_llm_context(
     connection,
     sp_dict: dict,
     resample_interval: Optional[str] = None,
     context: Optional[str] = None,
+    token_budget: Optional[int] = None,
+    history_baselines: bool = False,
+    workers: int = 1,
 ) -> dict:
     """
     Build a JSON-serialisable dict for LLM-based performance analysis.
+    With token_budget, the timeseries intervals are chosen per block (finer
+    inside finding windows) so the rendered bundle fits about that many tokens,
+    and resample_interval is ignored.
+    With history_baselines, the bundle covers the last capture loaded into the
+    database (per its append log; the whole database without one) and its
+    baselines, and the mgstat findings judged against them, come from the
+    baseline_store history of every capture loaded, brought up to date
+    first; 'baseline_history' then describes it. Neither reads the earlier
+    captures' samples.
+    workers > 1 runs the cross-signal correlation tests on that many threads.
 
     Returns dict with keys:
       schema_version, generated_by, context, system, collection,
       baselines, findings, period_stats, key_metrics, not_available,
       timeseries
     """
-    meta  = _pa._get_collection_meta(connection)
+    ctx = _build_context(connection, sp_dict, resample_interval, context, token_budget, history_baselines, workers)
+    timeseries = ctx["timeseries"]
+    timeseries["records"] = _timeseries_records(timeseries["records"])
+    for series in timeseries.get("iostat") or []:
+        series["records"] = _timeseries_records(series["records"])
+    return _scrub(ctx, _gather_secrets(sp_dict or {}))
+
+
+def _build_context(connection, sp_dict: dict, resample_interval: Optional[str], context: Optional[str],
+                   token_budget: Optional[int], history_baselines: bool = False, workers: int = 1) -> dict:
+    """
+    build_llm_context before scrubbing, with each timeseries' records still
+    a resampled frame (indexed by bin start) for the renderer.
+    """
+    data = _RunData(connection, _latest_load(connection) if history_baselines else None)
+    mg_df = data.mgstat
+    vm_df = data.vmstat
+
+    meta  = _pa._get_collection_meta(connection, mg_df)
     if resample_interval is None:
         resample_interval = _auto_resample_interval(meta.get("n_days"))
     facts = _pa._get_system_facts(sp_dict)
     facts.pop("customer", None)
 
-    mg_df = _load_mg_df(connection)
-    vm_df = _load_vm_df(connection)
-
     # Baselines (per IRIS period)
     mgstat_metrics = [m for m in ("Glorefs", "PhyRds", "PhyWrs", "Gloupds", "Jrnwrts", "Rdratio")
                       if not mg_df.empty and m in mg_df.columns]
-    baselines = _pa._compute_baselines(mg_df, mgstat_metrics) if not mg_df.empty else {}
+    # One weekday × period aggregation of mgstat serves baselines, period stats and the peak period
+    mg_periods = _pa._with_periods(mg_df)
+    mg_stats = _pa._period_stats(mg_periods, list(dict.fromkeys(_PERIOD_MG_COLS + mgstat_metrics)))
+    baselines = _pa._baselines_from_stats(mg_stats, mgstat_metrics)
+    baseline_history = None
+    if history_baselines and mgstat_metrics:
+        # Every capture loaded into this database, at the cost of the samples not folded in yet
+        store = baseline_store.BaselineStore(connection)
+        store.update()
+        history = store.baselines(mgstat_metrics)
+        if history:
+            baselines = history
+            baseline_history = store.summary()
 
     # Findings
     vcpus = facts.get("vcpus")
@@ -896,27 +1389,23 @@ def build_llm_context(
     if not vm_df.empty:
         all_findings.extend(_pa._analyse_vmstat(vm_df, vcpus=vcpus))
     if not mg_df.empty:
-        all_findings.extend(_pa._analyse_mgstat(mg_df, baselines))
+        all_findings.extend(_pa._analyse_mgstat(mg_periods, baselines))
     if not mg_df.empty and not vm_df.empty:
         interval = meta.get("interval_seconds") or 30.0
         joined = _pa._nearest_join(mg_df, vm_df, interval)
-        all_findings.extend(_run_correlation_tests(joined))
+        all_findings.extend(_run_correlation_tests(joined, workers=workers))
     elif not mg_df.empty:
-        for test_fn in (_pa._test_buffer_pressure, _pa._test_write_daemon_strain,
-                        _pa._test_contention_vs_throughput, _pa._test_batch_window):
-            try:
-                r = test_fn(mg_df)
-                if r is not None:
-                    all_findings.append(r)
-            except Exception:
-                pass
+        all_findings.extend(_run_correlation_tests(mg_df, _MGSTAT_CORRELATION_TESTS, workers))
+    all_findings.extend(_detect_anomalies(connection, data))
 
-    # Timeseries
-    mg_records = _resample_mgstat(mg_df, resample_interval) if not mg_df.empty else []
-    vm_records = _resample_vmstat(vm_df, resample_interval) if not vm_df.empty else []
-    merged_records = _merge_timeseries(mg_records, vm_records)
+    # Timeseries (sized by _budget_timeseries below instead, with a token budget)
+    merged_records, iostat_series = pd.DataFrame(), []
+    if token_budget is None:
+        mg_frame = _resample_mgstat_frame(mg_df, resample_interval) if not mg_df.empty else pd.DataFrame()
+        vm_frame = _resample_vmstat_frame(vm_df, resample_interval) if not vm_df.empty else pd.DataFrame()
+        merged_records = _merge_frames(mg_frame, vm_frame)
 
-    iostat_series = _build_iostat_timeseries(connection, resample_interval)
+        iostat_series = _iostat_frames(data.iostat, data.role_map, resample_interval)
 
     timeseries = {
         "resample_interval": resample_interval,
@@ -948,11 +1437,12 @@ def build_llm_context(
         "gaps":              gaps_serialised,
     }
 
-    role_map = _load_iostat_role_map(connection)
-    iostat_df = _load_iostat_df(connection)
+    role_map = data.role_map
+    iostat_df = _pa._with_periods(data.iostat)
+    vm_periods = _pa._with_periods(vm_df)
 
-    period_stats = _compute_period_stats(mg_df, vm_df)
-    key_metrics = _compute_key_metrics(mg_df, vm_df, iostat_df, role_map, facts)
+    period_stats = _compute_period_stats(mg_periods, vm_periods, mg_stats)
+    key_metrics = _compute_key_metrics(mg_periods, vm_periods, iostat_df, role_map, facts, mg_stats)
     not_available = _build_not_available(mg_df, role_map)
 
     ctx = {
@@ -968,7 +1458,12 @@ def build_llm_context(
         "not_available":  not_available,
         "timeseries":     timeseries,
     }
-    return _scrub(ctx, _gather_secrets(sp_dict or {}))
+    if baseline_history:
+        ctx["baseline_history"] = baseline_history
+    if token_budget is not None:
+        ctx["timeseries"] = _budget_timeseries(ctx, token_budget, mg_df, vm_df, data.iostat, role_map,
+                                               meta.get("interval_seconds"))
+    return ctx
 
 
 def export_llm_context(
@@ -977,10 +1472,18 @@ def export_llm_context(
     filepath: str,
     resample_interval: Optional[str] = None,
     context: Optional[str] = None,
+    token_budget: Optional[int] = None,
+    history_baselines: bool = False,
+    workers: int = 1,
 ) -> tuple:
     """
     Build and write the LLM context bundle and companion prompt.
     resample_interval None = auto (scaled to window length).
+    token_budget: size the timeseries to fit the bundle in about this many
+    tokens instead (see build_llm_context).
+    history_baselines: the last capture loaded, against baselines from every
+    capture loaded into the database (see build_llm_context).
+    workers: threads for the correlation tests (see build_llm_context).
 
     Filenames deliberately carry no output_prefix: yaspe's default prefix
     is derived from the input HTML filename, which typically embeds
@@ -1000,7 +1503,15 @@ def export_llm_context(
                 "Examples: '5min', '10min', '1min'."
             )
 
-    ctx = build_llm_context(connection, sp_dict, resample_interval, context)
+    if token_budget is not None and token_budget <= 0:
+        raise ValueError(f"Invalid token budget: {token_budget!r}. Example: 100000.")
+
+    # Rendered straight from the resampled frames; no per-row dicts
+    secrets = _gather_secrets(sp_dict or {})
+    ctx = _scrub(_build_context(connection, sp_dict, resample_interval, context, token_budget, history_baselines,
+                                workers),
+                 secrets)
+    bundle = _scrub_text(_render_markdown(ctx), secrets)
 
     start_str = (ctx["collection"].get("start") or "unknown")[:10]
     end_str   = (ctx["collection"].get("end")   or "unknown")[:10]
@@ -1009,7 +1520,7 @@ def export_llm_context(
 
     bundle_path = os.path.join(filepath, f"performance_context_{start_str}_{end_str}.md")
     with open(bundle_path, "w", encoding="utf-8") as fh:
-        fh.write(_render_markdown(ctx))
+        fh.write(bundle)
 
     prompt_path = os.path.join(filepath, "llm_analysis_prompt.md")
     with open(prompt_path, "w", encoding="utf-8") as fh:
@@ -1040,21 +1551,57 @@ def _md_cell(text) -> str:
     return str(text).replace("|", "\\|") if text else ""
 
 
+def _fmt_column(values) -> np.ndarray:
+    """
+    _fmt_num over a whole column (array or Series), one pass per dtype
+    instead of a call per cell. Missing -> empty.
+    """
+    values = pd.Series(values, copy=False)
+    missing = values.isna().to_numpy()
+    if pd.api.types.is_float_dtype(values.dtype):
+        v = values.to_numpy(dtype=float, na_value=np.nan)
+        out = np.full(len(v), "", dtype=object)
+        whole = np.abs(v) >= 100
+        # rint rounds the exact binary value half-to-even, as "%.0f" does
+        exact = whole & (np.abs(v) < 2.0 ** 53)
+        out[exact] = np.rint(v[exact]).astype(np.int64).astype(str)
+        out[whole & ~exact] = list(map("{:.0f}".format, v[whole & ~exact].tolist()))
+        out[~whole & ~missing] = list(map("{:.1f}".format, v[~whole & ~missing].tolist()))
+        return out
+    if pd.api.types.is_integer_dtype(values.dtype):
+        out = values.astype(str).to_numpy(dtype=object)
+    else:
+        out = np.array([_fmt_num(v) for v in values], dtype=object)
+    out[missing] = ""
+    return out
+
+
+def _csv_fence(header: list, cells: list) -> str:
+    """Fenced csv block from a header and one array of formatted cells per column, written in one go."""
+    return "```csv\n" + "\n".join([",".join(header), *map(",".join, zip(*cells))]) + "\n```"
+
+
 def _csv_block(records: list, columns: list) -> str:
     """Fenced csv block; header once, None -> empty cell, floats rounded."""
-    lines = [",".join(columns)]
-    for rec in records:
-        lines.append(",".join(_fmt_num(rec.get(col)) for col in columns))
-    return "```csv\n" + "\n".join(lines) + "\n```"
+    return _csv_fence(columns, [_fmt_column(pd.array([rec.get(col) for rec in records])) for col in columns])
+
+
+def _csv_frame(frame: pd.DataFrame) -> str:
+    """_csv_block of a resampled frame: timestamp from the index, then its columns."""
+    cells = [frame.index.strftime(_TS_FORMAT).to_numpy(dtype=object)]
+    cells += [_fmt_column(frame[col]) for col in frame.columns]
+    return _csv_fence(["timestamp", *frame.columns], cells)
+
+
+def _timeseries_csv(records) -> str:
+    """csv block of timeseries records: a resampled frame (export) or a list of dicts (a built context)."""
+    if isinstance(records, pd.DataFrame):
+        return _csv_frame(records)
+    return _csv_block(records, _ordered_columns(records))
 
 
 def _ordered_columns(records: list) -> list:
-    cols = ["timestamp"]
-    for rec in records:
-        for key in rec:
-            if key not in cols:
-                cols.append(key)
-    return cols
+    return list(dict.fromkeys(["timestamp", *(key for rec in records for key in rec)]))
 
 
 def _yaml_header(ctx: dict) -> str:
@@ -1125,8 +1672,13 @@ def _render_markdown(ctx: dict) -> str:
     # Baselines
     baselines = ctx.get("baselines") or {}
     if baselines:
+        source = "from full-resolution mgstat"
+        history = ctx.get("baseline_history")
+        if history:
+            source = (f"from the baseline history of every capture loaded: {history['samples']} mgstat samples, "
+                      f"{history['first']} – {history['last']} (p95 from a sketch, within about 1%)")
         rows = ["## Baselines", "",
-                "Per IRIS Health Monitor period, from full-resolution mgstat.", "",
+                f"Per IRIS Health Monitor period, {source}.", "",
                 "| Period | Metric | Mean | Sigma | p95 | Max |", "|---|---|---|---|---|---|"]
         for period, metrics in baselines.items():
             for metric, stats in metrics.items():
@@ -1138,7 +1690,7 @@ def _render_markdown(ctx: dict) -> str:
     # Findings
     findings = ctx.get("findings") or []
     fparts = ["## Findings (pre-computed)", "",
-              "Deterministic breach/correlation detections. Verify against the data; extend, do not parrot."]
+              "Deterministic breach, correlation and anomaly detections. Verify against the data; extend, do not parrot."]
     if findings:
         for f in findings:
             fparts.append(f"- **{f['severity']} — {f['metric']}**: {f['observation']}")
@@ -1202,19 +1754,35 @@ def _render_markdown(ctx: dict) -> str:
 
     # Timeseries
     ts = ctx.get("timeseries") or {}
+    caption = f"Resampled to {ts.get('resample_interval')}"
+    if ts.get("focus_windows"):
+        caption += (f" ({ts.get('focus_interval')} inside the finding windows "
+                    + ", ".join(f"{start} – {end}" for start, end in ts["focus_windows"]) + ")")
+    if ts.get("token_budget") and ts.get("estimated_tokens", 0) > ts["token_budget"]:
+        caption += (f", at the coarsest intervals: the bundle is about {ts['estimated_tokens']} tokens, "
+                    f"over the budget of {ts['token_budget']}, as the other sections alone take about "
+                    f"{ts.get('fixed_tokens')}")
+    elif ts.get("token_budget"):
+        caption += f", sized to a budget of {ts['token_budget']} tokens"
     tparts = ["## Timeseries", "",
-              f"Resampled to {ts.get('resample_interval')}. {ts.get('aggregation_notes', '')}"]
-    records = ts.get("records") or []
-    if records:
+              f"{caption}. {ts.get('aggregation_notes', '')}"]
+    records = ts.get("records")
+    if records is not None and len(records):
         tparts.append("")
         tparts.append("### mgstat + vmstat (merged)")
         tparts.append("")
-        tparts.append(_csv_block(records, _ordered_columns(records)))
+        tparts.append(_timeseries_csv(records))
     for series in ts.get("iostat") or []:
         tparts.append("")
-        tparts.append(f"### iostat — {series['role']} ({series['device']}), max per interval")
+        interval = ""
+        if series.get("resample_interval"):
+            interval = f" ({series['resample_interval']}"
+            if series.get("focus_interval"):
+                interval += f", {series['focus_interval']} inside finding windows"
+            interval += ")"
+        tparts.append(f"### iostat — {series['role']} ({series['device']}), max per interval{interval}")
         tparts.append("")
-        tparts.append(_csv_block(series["records"], _ordered_columns(series["records"])))
+        tparts.append(_timeseries_csv(series["records"]))
     parts.append("\n".join(tparts))
 
     return "\n\n".join(parts) + "\n"
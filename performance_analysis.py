@@ -1,11 +1,13 @@
 """
 Performance analysis engine for yaspe.
 Baselines, KPI breach detection, and cross-signal correlation tests
-following docs/Performance analysis/PERFORMANCE_ANALYSIS.md.
+following docs/Performance analysis/PERFORMANCE_ANALYSIS.md, plus rolling
+anomaly detection over every numeric column.
 Consumed by llm_context.py. Linux only.
 """
 from __future__ import annotations
 
+import warnings
 from dataclasses import dataclass, field
 from datetime import time as dtime
 from datetime import timedelta
@@ -69,6 +71,11 @@ def _fmt_n(value) -> str:
         return str(value)
 
 
+def _fmt_ts(dt) -> str:
+    """Format a timestamp as YYYY-MM-DD HH:MM:SS."""
+    return pd.Timestamp(dt).strftime("%Y-%m-%d %H:%M:%S")
+
+
 @dataclass
 class Finding:
     metric: str
@@ -80,34 +87,39 @@ class Finding:
     next_step: str = ""
 
 
-def _get_collection_meta(connection) -> dict:
+def _get_collection_meta(connection, mg_df: Optional[pd.DataFrame] = None) -> dict:
     """
     Establish collection window, median interval, and gaps > 3× interval.
     Returns dict with keys: start, end, n_days, weekdays, interval_seconds, gaps.
     gaps is a list of (gap_start, gap_end) datetime tuples.
+    mg_df: mgstat already loaded with a parsed 'dt' column; mgstat is only
+    read from connection when it is None.
     """
-    try:
-        df = pd.read_sql_query(
-            "SELECT RunDate, RunTime FROM mgstat ORDER BY RunDate, RunTime",
-            connection,
-        )
-    except Exception:
-        return {"start": None, "end": None, "n_days": 0, "weekdays": [],
-                "interval_seconds": None, "gaps": []}
+    if mg_df is not None:
+        df = mg_df[["dt"]].dropna() if "dt" in mg_df.columns else pd.DataFrame()
+    else:
+        try:
+            df = pd.read_sql_query(
+                "SELECT RunDate, RunTime FROM mgstat ORDER BY RunDate, RunTime",
+                connection,
+            )
+        except Exception:
+            return {"start": None, "end": None, "n_days": 0, "weekdays": [],
+                    "interval_seconds": None, "gaps": []}
+        # Use the pre-computed 'datetime' column when available (yaspe stores it);
+        # fall back to combining RunDate + RunTime with flexible parsing.
+        if "datetime" in df.columns:
+            df["dt"] = pd.to_datetime(df["datetime"].str.strip(), errors="coerce")
+        elif not df.empty:
+            df["dt"] = pd.to_datetime(
+                df["RunDate"].str.strip() + " " + df["RunTime"].str.strip(),
+                errors="coerce",
+            )
 
     if df.empty:
         return {"start": None, "end": None, "n_days": 0, "weekdays": [],
                 "interval_seconds": None, "gaps": []}
 
-    # Use the pre-computed 'datetime' column when available (yaspe stores it);
-    # fall back to combining RunDate + RunTime with flexible parsing.
-    if "datetime" in df.columns:
-        df["dt"] = pd.to_datetime(df["datetime"].str.strip(), errors="coerce")
-    else:
-        df["dt"] = pd.to_datetime(
-            df["RunDate"].str.strip() + " " + df["RunTime"].str.strip(),
-            errors="coerce",
-        )
     df = df.dropna(subset=["dt"]).sort_values("dt").reset_index(drop=True)
 
     diffs = df["dt"].diff()
@@ -116,9 +128,9 @@ def _get_collection_meta(connection) -> dict:
 
     gaps = []
     if gap_threshold:
-        for i in range(1, len(df)):
-            if diffs.iloc[i] > gap_threshold:
-                gaps.append((df["dt"].iloc[i - 1], df["dt"].iloc[i]))
+        after = np.flatnonzero((diffs > gap_threshold).to_numpy())
+        dts = pd.DatetimeIndex(df["dt"])
+        gaps = list(zip(dts[after - 1], dts[after]))
 
     start = df["dt"].min()
     end = df["dt"].max()
@@ -194,36 +206,120 @@ def _label_period(time_str: str) -> Optional[str]:
     return None
 
 
-def _compute_baselines(df: pd.DataFrame, metrics: list) -> dict:
+def _minute_of_day(hhmm: str) -> int:
+    return int(hhmm[:2]) * 60 + int(hhmm[3:5])
+
+
+# Period edges in minutes of the day, for _label_periods()
+_PERIOD_STARTS = np.array([_minute_of_day(p["start"]) for p in IRIS_PERIODS])
+_PERIOD_ENDS = np.array([_minute_of_day(p["end"]) for p in IRIS_PERIODS])
+_PERIOD_NAMES = [p["name"] for p in IRIS_PERIODS]
+
+_WEEKDAY_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def _baseline_order(key) -> tuple:
+    """Sort key of a (weekday_name, period_name) baseline: Monday first, periods in IRIS_PERIODS order."""
+    weekday, period = key
+    return (_WEEKDAY_ORDER.index(weekday) if weekday in _WEEKDAY_ORDER else 99,
+            _PERIOD_NAMES.index(period) if period in _PERIOD_NAMES else 99)
+
+
+def _label_periods(dts: pd.Series) -> pd.Series:
     """
-    Compute per-(weekday, period) mean/σ/p95/max for each metric column in df.
-    df must have a 'dt' column of datetime64.
-    Returns: {(weekday_name, period_name): {metric: {mean, sigma, p95, max}}}
-    weekday_name is the full English name (e.g. "Monday").
-    Combinations with fewer than 3 samples are skipped.
+    _label_period() for a whole datetime64 Series at once: the minute of the
+    day is binned against the period starts. Returns a categorical Series on
+    the same index (categories in IRIS_PERIODS order), NaN outside all periods.
+    Group on it with observed=True to skip empty periods.
     """
+    minutes = (dts.dt.hour * 60 + dts.dt.minute).to_numpy(dtype=float)
+    idx = np.searchsorted(_PERIOD_STARTS, minutes, side="right") - 1
+    inside = (idx >= 0) & (minutes <= _PERIOD_ENDS[idx.clip(0)])
+    codes = np.where(inside, idx, -1)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=_PERIOD_NAMES), index=dts.index)
+
+
+def _with_periods(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    df with _weekday (full English day name) and _period (_label_periods())
+    columns, for grouping by weekday and IRIS period. Rows outside all periods
+    are kept with a NaN _period; groupby drops them. A frame that already has
+    the columns is returned as is, so a source is only labelled once.
+    """
+    if df is None or df.empty or "dt" not in df.columns or "_period" in df.columns:
+        return df
     df = df.copy()
-    df["_period"]  = df["dt"].dt.strftime("%H:%M").apply(_label_period)
-    df["_weekday"] = df["dt"].dt.strftime("%A")
-    df = df.dropna(subset=["_period"])
+    df["_weekday"] = df["dt"].dt.day_name()
+    df["_period"] = _label_periods(df["dt"])
+    return df
+
+
+# Columns of each metric in _period_stats(), in order
+PERIOD_STATS = ["mean", "sigma", "p90", "p95", "max", "n_samples"]
 
+
+def _period_stats(df: pd.DataFrame, metrics: list) -> pd.DataFrame:
+    """
+    mean/sigma/p90/p95/max/n_samples of each metric column in df, per
+    (weekday, period), from one groupby over all the columns.
+    Returns a frame indexed by (_weekday, _period) with (metric, stat) columns;
+    metrics missing from df are left out. Non-numeric values are ignored, and
+    sigma is 0 for a single sample. Percentiles interpolate like np.percentile.
+    """
+    df = _with_periods(df)
+    if df is None or "_period" not in df.columns:
+        return pd.DataFrame()
+    columns = [m for m in metrics if m in df.columns]
+    if not columns:
+        return pd.DataFrame()
+    values = df[columns].apply(pd.to_numeric, errors="coerce")
+    grouped = values.groupby([df["_weekday"], df["_period"]], observed=True)
+    agg = grouped.agg(["mean", "std", "max", "count"])
+    stats = {
+        "mean":      agg.xs("mean", axis=1, level=1),
+        "sigma":     agg.xs("std", axis=1, level=1).where(agg.xs("count", axis=1, level=1) != 1, 0.0),
+        "p90":       grouped.quantile(0.90),
+        "p95":       grouped.quantile(0.95),
+        "max":       agg.xs("max", axis=1, level=1),
+        "n_samples": agg.xs("count", axis=1, level=1),
+    }
+    result = pd.concat(stats, axis=1).swaplevel(axis=1)
+    return result[[(m, stat) for m in columns for stat in PERIOD_STATS]]
+
+
+def _baselines_from_stats(stats: pd.DataFrame, metrics: list) -> dict:
+    """_compute_baselines() result from a _period_stats() frame."""
     result = {}
-    for (weekday_name, period_name), group in df.groupby(["_weekday", "_period"]):
-        key = (weekday_name, period_name)
-        result[key] = {}
+    if stats.empty:
+        return result
+    metrics = [m for m in metrics if m in stats.columns.get_level_values(0)]
+    for key, row in zip(stats.index, stats.to_dict("records")):
+        entry = {}
         for metric in metrics:
-            if metric not in group.columns:
-                continue
-            vals = pd.to_numeric(group[metric], errors="coerce").dropna()
-            if len(vals) < 3:
+            if row[(metric, "n_samples")] < 3:
                 continue
-            result[key][metric] = {
-                "mean":  float(vals.mean()),
-                "sigma": float(vals.std(ddof=1)) if len(vals) > 1 else 0.0,
-                "p95":   float(np.percentile(vals, 95)),
-                "max":   float(vals.max()),
+            entry[metric] = {
+                "mean":  float(row[(metric, "mean")]),
+                "sigma": float(row[(metric, "sigma")]),
+                "p95":   float(row[(metric, "p95")]),
+                "max":   float(row[(metric, "max")]),
             }
-    return result
+        if entry:
+            result[key] = entry
+    return dict(sorted(result.items(), key=lambda item: _baseline_order(item[0])))
+
+
+def _compute_baselines(df: pd.DataFrame, metrics: list) -> dict:
+    """
+    Compute per-(weekday, period) mean/σ/p95/max for each metric column in df.
+    df must have a 'dt' column of datetime64.
+    Returns: {(weekday_name, period_name): {metric: {mean, sigma, p95, max}}}
+    weekday_name is the full English name (e.g. "Monday"); keys run Monday
+    to Sunday, periods in IRIS_PERIODS order.
+    Metrics with fewer than 3 samples are skipped, and so are combinations
+    left with none.
+    """
+    return _baselines_from_stats(_period_stats(df, metrics), metrics)
 
 
 def _find_breaches(
@@ -237,21 +333,40 @@ def _find_breaches(
     Returns list of (run_start, run_end, count) tuples.
     Only returns runs with length >= min_consecutive.
     """
-    above = (values > threshold).values
-    runs = []
-    i = 0
-    while i < len(above):
-        if above[i]:
-            j = i
-            while j < len(above) and above[j]:
-                j += 1
-            run_len = j - i
-            if run_len >= min_consecutive:
-                runs.append((datetimes[i], datetimes[j - 1], run_len))
-            i = j
-        else:
-            i += 1
-    return runs
+    return _find_breach_levels(values, datetimes, [(threshold, min_consecutive)])[0]
+
+
+def _find_breach_levels(
+    values: pd.Series,
+    datetimes: pd.Series,
+    levels: list,
+) -> list:
+    """
+    _find_breaches for several (threshold, min_consecutive) levels at once,
+    e.g. [(alert, ALERT_CONSECUTIVE), (warn, WARN_CONSECUTIVE)].
+    Returns one list of (run_start, run_end, count) tuples per level.
+    Runs are found by run-length encoding the above-threshold mask of every
+    level in one numpy pass; samples are matched to datetimes by position.
+    """
+    vals = np.asarray(pd.to_numeric(values, errors="coerce"), dtype=float)
+    if len(vals) == 0:
+        return [[] for _ in levels]
+    dts = pd.Index(datetimes)
+    thresholds = np.array([threshold for threshold, _ in levels], dtype=float)
+
+    # One row per level, padded with False so every run has a rising and a falling edge
+    above = np.zeros((len(levels), len(vals) + 2), dtype=np.int8)
+    above[:, 1:-1] = vals[np.newaxis, :] > thresholds[:, np.newaxis]
+    edges = np.diff(above, axis=1)
+    start_rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)  # exclusive; row-major order keeps them paired with starts
+    lengths = ends - starts
+
+    result = []
+    for level, (_, min_consecutive) in enumerate(levels):
+        keep = (start_rows == level) & (lengths >= min_consecutive)
+        result.append(list(zip(dts[starts[keep]], dts[ends[keep] - 1], lengths[keep].tolist())))
+    return result
 
 
 def _fmt_breach_when(runs, fmt_ts):
@@ -285,14 +400,11 @@ def _analyse_vmstat(df: pd.DataFrame, vcpus: Optional[int]) -> list:
     findings = []
     df = df.copy().sort_values("dt").reset_index(drop=True)
 
-    def _fmt_ts(dt):
-        return pd.Timestamp(dt).strftime("%Y-%m-%d %H:%M:%S")
-
     # --- wa (I/O wait) ---
     if "wa" in df.columns:
         vals = pd.to_numeric(df["wa"], errors="coerce").fillna(0)
-        red_runs  = _find_breaches(vals, df["dt"], 20.0, ALERT_CONSECUTIVE)
-        warn_runs = _find_breaches(vals, df["dt"], 10.0, WARN_CONSECUTIVE)
+        red_runs, warn_runs = _find_breach_levels(
+            vals, df["dt"], [(20.0, ALERT_CONSECUTIVE), (10.0, WARN_CONSECUTIVE)])
         interval_secs_wa = df["dt"].diff().median().total_seconds()
         if red_runs:
             when, n_events, primary = _fmt_breach_when(red_runs, _fmt_ts)
@@ -336,8 +448,8 @@ def _analyse_vmstat(df: pd.DataFrame, vcpus: Optional[int]) -> list:
     if "us" in df.columns and "sy" in df.columns:
         us_sy = pd.to_numeric(df["us"], errors="coerce").fillna(0) + \
                 pd.to_numeric(df["sy"], errors="coerce").fillna(0)
-        red_runs  = _find_breaches(us_sy, df["dt"], 85.0, ALERT_CONSECUTIVE)
-        warn_runs = _find_breaches(us_sy, df["dt"], 75.0, WARN_CONSECUTIVE)
+        red_runs, warn_runs = _find_breach_levels(
+            us_sy, df["dt"], [(85.0, ALERT_CONSECUTIVE), (75.0, WARN_CONSECUTIVE)])
         interval_secs = df["dt"].diff().median().total_seconds()
         if red_runs:
             when, n_events, primary = _fmt_breach_when(red_runs, _fmt_ts)
@@ -381,8 +493,8 @@ def _analyse_vmstat(df: pd.DataFrame, vcpus: Optional[int]) -> list:
         sy_vals = pd.to_numeric(df["sy"], errors="coerce").fillna(0)
         total = us_vals + sy_vals
         sy_pct = sy_vals.where(total > 0, 0) / total.where(total > 0, 1) * 100
-        red_runs  = _find_breaches(sy_pct, df["dt"], 50.0, ALERT_CONSECUTIVE)
-        warn_runs = _find_breaches(sy_pct, df["dt"], 30.0, WARN_CONSECUTIVE)
+        red_runs, warn_runs = _find_breach_levels(
+            sy_pct, df["dt"], [(50.0, ALERT_CONSECUTIVE), (30.0, WARN_CONSECUTIVE)])
         if red_runs:
             when, n_events, primary = _fmt_breach_when(red_runs, _fmt_ts)
             start, end, count = primary
@@ -416,8 +528,8 @@ def _analyse_vmstat(df: pd.DataFrame, vcpus: Optional[int]) -> list:
         r_vals = pd.to_numeric(df["r"], errors="coerce").fillna(0)
         alert_thr = vcpus * 2.0
         warn_thr  = vcpus * 1.0
-        red_runs  = _find_breaches(r_vals, df["dt"], alert_thr, ALERT_CONSECUTIVE)
-        warn_runs = _find_breaches(r_vals, df["dt"], warn_thr,  WARN_CONSECUTIVE)
+        red_runs, warn_runs = _find_breach_levels(
+            r_vals, df["dt"], [(alert_thr, ALERT_CONSECUTIVE), (warn_thr, WARN_CONSECUTIVE)])
         if red_runs:
             when, n_events, primary = _fmt_breach_when(red_runs, _fmt_ts)
             start, end, count = primary
@@ -469,8 +581,8 @@ def _analyse_vmstat(df: pd.DataFrame, vcpus: Optional[int]) -> list:
         b_vals = pd.to_numeric(df["b"], errors="coerce").fillna(0)
         alert_thr_b = max(10.0, vcpus * 0.25)
         warn_thr_b  = max(2.0,  vcpus * 0.10)
-        red_runs  = _find_breaches(b_vals, df["dt"], alert_thr_b, ALERT_CONSECUTIVE)
-        warn_runs = _find_breaches(b_vals, df["dt"], warn_thr_b,  WARN_CONSECUTIVE)
+        red_runs, warn_runs = _find_breach_levels(
+            b_vals, df["dt"], [(alert_thr_b, ALERT_CONSECUTIVE), (warn_thr_b, WARN_CONSECUTIVE)])
         if red_runs:
             when, n_events, primary = _fmt_breach_when(red_runs, _fmt_ts)
             start, end, count = primary
@@ -505,8 +617,8 @@ def _analyse_vmstat(df: pd.DataFrame, vcpus: Optional[int]) -> list:
     # --- st (steal time) — virtualised hosts only ---
     if "st" in df.columns:
         st_vals = pd.to_numeric(df["st"], errors="coerce").fillna(0)
-        red_runs  = _find_breaches(st_vals, df["dt"], 15.0, ALERT_CONSECUTIVE)
-        warn_runs = _find_breaches(st_vals, df["dt"],  5.0, WARN_CONSECUTIVE)
+        red_runs, warn_runs = _find_breach_levels(
+            st_vals, df["dt"], [(15.0, ALERT_CONSECUTIVE), (5.0, WARN_CONSECUTIVE)])
         if red_runs:
             when, n_events, primary = _fmt_breach_when(red_runs, _fmt_ts)
             start, end, count = primary
@@ -557,13 +669,19 @@ def _analyse_mgstat(df: pd.DataFrame, baselines: dict) -> list:
     Evaluate mgstat KPIs. Returns list[Finding].
     df must have columns: dt, Glorefs, PhyRds, PhyWrs, Gloupds, Jrnwrts, WDQsz, Rdratio, RouLaS.
     Seize and ASeize are optional (not present in all pButtons files).
-    baselines: output of _compute_baselines() for mgstat metrics.
+    baselines: output of _compute_baselines() for mgstat metrics, or
+    baseline_store.BaselineStore.baselines() for those of every capture
+    loaded into the database.
     """
     findings = []
     df = df.copy().sort_values("dt").reset_index(drop=True)
 
-    def _fmt_ts(dt):
-        return pd.Timestamp(dt).strftime("%Y-%m-%d %H:%M:%S")
+    # Fallback for _dynamic_thresholds: the first baseline of each (period, metric), any weekday
+    period_baselines = {}
+    for k, v in baselines.items():
+        if isinstance(k, tuple):
+            for metric, b in v.items():
+                period_baselines.setdefault((k[1], metric), b)
 
     def _dynamic_thresholds(metric, wd, per):
         """Return (warn_level, alert_level) for a baseline-relative metric.
@@ -574,15 +692,9 @@ def _analyse_mgstat(df: pd.DataFrame, baselines: dict) -> list:
         if key in baselines and metric in baselines[key]:
             b = baselines[key][metric]
         else:
-            # Fallback: find any key whose period matches (ignores weekday)
-            b = None
-            for k, v in baselines.items():
-                if isinstance(k, tuple) and k[1] == per and metric in v:
-                    b = v[metric]
-                    break
+            b = period_baselines.get((per, metric))
             if b is None:
                 return None, None
-        assert b is not None
         mean, sigma, highest = b["mean"], b["sigma"], b["max"]
         cfg = METRIC_THRESHOLDS.get(metric, {})
         warn_mult = float(cfg.get("warn_mult", 1.6) or 1.6)
@@ -657,22 +769,22 @@ def _analyse_mgstat(df: pd.DataFrame, baselines: dict) -> list:
             ))
 
     # --- Baseline-relative metrics: Glorefs, PhyRds, PhyWrs, Gloupds, Jrnwrts ---
+    df = _with_periods(df)
+    period_groups = df.groupby(["_weekday", "_period"], observed=True).groups
     for metric in ("Glorefs", "PhyRds", "PhyWrs", "Gloupds", "Jrnwrts"):
         if metric not in df.columns:
             continue
         vals = pd.to_numeric(df[metric], errors="coerce").fillna(0)
-        df["_period_tmp"]  = df["dt"].dt.strftime("%H:%M").apply(_label_period)
-        df["_weekday_tmp"] = df["dt"].dt.strftime("%A")
 
         period_findings = []
-        for (weekday_name, period_name), group_idx in df.groupby(["_weekday_tmp", "_period_tmp"]).groups.items():
+        for (weekday_name, period_name), group_idx in period_groups.items():
             group_vals = vals.iloc[group_idx]
             group_dts  = df["dt"].iloc[group_idx]
             warn_level, alert_level = _dynamic_thresholds(metric, weekday_name, period_name)
             if warn_level is None:
                 continue
-            red_runs  = _find_breaches(group_vals, group_dts, alert_level, ALERT_CONSECUTIVE)
-            warn_runs = _find_breaches(group_vals, group_dts, warn_level,  WARN_CONSECUTIVE)
+            red_runs, warn_runs = _find_breach_levels(
+                group_vals, group_dts, [(alert_level, ALERT_CONSECUTIVE), (warn_level, WARN_CONSECUTIVE)])
             if red_runs:
                 when, n_events, primary = _fmt_breach_when(red_runs, _fmt_ts)
                 start, end, count = primary
@@ -757,18 +869,86 @@ def _nearest_join(mgstat_df: pd.DataFrame, vmstat_df: pd.DataFrame,
     return merged
 
 
-def _test_user_stall(df: pd.DataFrame) -> Optional[Finding]:
+# Columns the correlation tests read, converted to numbers once by CorrelationFrame
+CORRELATION_COLUMNS = ("Glorefs", "PhyRds", "PhyWrs", "Jrnwrts", "Rdratio", "WDQsz", "Seize", "ASeize",
+                       "us", "sy", "wa", "free", "cache", "si", "so")
+
+
+class CorrelationFrame:
+    """
+    A merged vmstat+mgstat DataFrame prepared once for all the correlation
+    tests: sorted by 'dt', each of CORRELATION_COLUMNS it has as a float array
+    (NaN where not numeric), and the hour-of-day masks the tests filter on.
+    Nothing changes it after __init__, so the tests can share it across threads.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        if not df["dt"].is_monotonic_increasing:
+            df = df.sort_values("dt", kind="stable")
+        self.n = len(df)
+        self.dt = df["dt"].reset_index(drop=True)
+        self.times = self.dt.to_numpy()
+        self.values = {
+            column: pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            for column in CORRELATION_COLUMNS if column in df.columns
+        }
+        hours = self.dt.dt.hour.to_numpy()
+        self.business = (hours >= 8) & (hours <= 17)       # 08:00–18:00
+        self.overnight = hours <= 6                        # 00:00–07:00
+        self.morning_ramp = (hours >= 8) & (hours <= 9)    # 08:00–10:00
+
+    def __contains__(self, column) -> bool:
+        return column in self.values
+
+    def filled(self, column: str, value: float = 0.0) -> np.ndarray:
+        """The column with NaN as value; all value if the frame has no such column."""
+        values = self.values.get(column)
+        if values is None:
+            return np.full(self.n, value)
+        return np.where(np.isnan(values), value, values)
+
+    def window(self, start, end) -> slice:
+        """The rows with start <= dt <= end."""
+        return slice(np.searchsorted(self.times, pd.Timestamp(start).to_datetime64(), side="left"),
+                     np.searchsorted(self.times, pd.Timestamp(end).to_datetime64(), side="right"))
+
+    def span(self) -> str:
+        """'first – last' dt of the frame."""
+        return (f"{self.dt.iloc[0].strftime('%Y-%m-%d %H:%M:%S')} – "
+                f"{self.dt.iloc[-1].strftime('%Y-%m-%d %H:%M:%S')}")
+
+
+def _correlation_frame(df) -> CorrelationFrame:
+    """df as a CorrelationFrame; one already prepared is returned as is."""
+    return df if isinstance(df, CorrelationFrame) else CorrelationFrame(df)
+
+
+def _nanmean(values: np.ndarray) -> float:
+    """Mean of the non-NaN values, NaN if there are none (as pandas' mean)."""
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if len(values) else float("nan")
+
+
+def _thirds(values: np.ndarray) -> tuple:
+    """Means of the first and last third of values (the last takes the remainder)."""
+    third = len(values) // 3
+    return values[:third].mean(), values[2 * third:].mean()
+
+
+def _test_user_stall(df) -> Optional[Finding]:
     """
     Test 1: Glorefs drops sharply in business hours.
-    df is a merged vmstat+mgstat DataFrame with 'dt', 'Glorefs', 'WDQsz', 'b', 'wa'.
+    df is a merged vmstat+mgstat DataFrame (or CorrelationFrame) with 'dt', 'Glorefs', 'WDQsz', 'b', 'wa'.
     Business hours = 08:00–18:00.
     """
-    bh = df[df["dt"].dt.hour.between(8, 17)].copy()
-    if bh.empty or "Glorefs" not in bh.columns:
+    cf = _correlation_frame(df)
+    if not cf.business.any() or "Glorefs" not in cf:
         return None
 
-    glorefs = pd.to_numeric(bh["Glorefs"], errors="coerce").dropna()
-    if glorefs.empty:
+    glorefs = cf.values["Glorefs"][cf.business]
+    numeric = ~np.isnan(glorefs)
+    glorefs, dts = glorefs[numeric], cf.times[cf.business][numeric]
+    if not len(glorefs):
         return None
 
     mean_g = glorefs.mean()
@@ -777,21 +957,22 @@ def _test_user_stall(df: pd.DataFrame) -> Optional[Finding]:
     if stall_threshold < 1:
         return None
 
-    stall_runs = _find_breaches(-glorefs, bh["dt"].reset_index(drop=True),
-                                threshold=-stall_threshold, min_consecutive=ALERT_CONSECUTIVE)
+    stall_runs = _find_breaches(-glorefs, dts, threshold=-stall_threshold, min_consecutive=ALERT_CONSECUTIVE)
 
     if not stall_runs:
         return None
 
     start, end, count = stall_runs[0]
     # Check corroborating evidence
-    window = bh[(bh["dt"] >= start) & (bh["dt"] <= end)]
-    wa_elevated = "wa" in window.columns and pd.to_numeric(window["wa"], errors="coerce").mean() > 10
-    wdqsz_elevated = "WDQsz" in window.columns and pd.to_numeric(window["WDQsz"], errors="coerce").max() > 0
+    rows = cf.window(start, end)
+    in_business = cf.business[rows]
+    wa_mean = _nanmean(cf.values["wa"][rows][in_business]) if "wa" in cf else float("nan")
+    wa_elevated = wa_mean > 10
+    wdqsz_elevated = "WDQsz" in cf and bool((cf.values["WDQsz"][rows][in_business] > 0).any())
 
     corroborating = []
     if wa_elevated:
-        corroborating.append(f"wa elevated ({pd.to_numeric(window['wa'], errors='coerce').mean():.1f}%) during stall — storage-side cause likely")
+        corroborating.append(f"wa elevated ({wa_mean:.1f}%) during stall — storage-side cause likely")
     if wdqsz_elevated:
         corroborating.append(f"WDQsz non-zero during stall — write daemon queue backing up")
     if not corroborating:
@@ -813,27 +994,19 @@ def _test_user_stall(df: pd.DataFrame) -> Optional[Finding]:
     )
 
 
-def _test_buffer_pressure(df: pd.DataFrame) -> Optional[Finding]:
+def _test_buffer_pressure(df) -> Optional[Finding]:
     """
     Test 2: Rdratio trending down while PhyRds trends up.
     Quantify first-third vs last-third of window.
     """
-    if "Rdratio" not in df.columns or "PhyRds" not in df.columns:
+    cf = _correlation_frame(df)
+    if "Rdratio" not in cf or "PhyRds" not in cf:
         return None
-
-    df = df.sort_values("dt").reset_index(drop=True)
-    n = len(df)
-    if n < 9:
+    if cf.n < 9:
         return None
 
-    third = n // 3
-    rdratio = pd.to_numeric(df["Rdratio"], errors="coerce").fillna(0)
-    phyrds  = pd.to_numeric(df["PhyRds"],  errors="coerce").fillna(0)
-
-    rd_first = rdratio.iloc[:third].mean()
-    rd_last  = rdratio.iloc[2*third:].mean()
-    ph_first = phyrds.iloc[:third].mean()
-    ph_last  = phyrds.iloc[2*third:].mean()
+    rd_first, rd_last = _thirds(cf.filled("Rdratio"))
+    ph_first, ph_last = _thirds(cf.filled("PhyRds"))
 
     rdratio_declined = rd_last < rd_first * 0.85   # > 15% decline
     phyrds_increased = ph_last > ph_first * 1.20   # > 20% increase
@@ -841,16 +1014,13 @@ def _test_buffer_pressure(df: pd.DataFrame) -> Optional[Finding]:
     if not (rdratio_declined and phyrds_increased):
         return None
 
-    start_ts = df["dt"].iloc[0].strftime("%Y-%m-%d %H:%M:%S")
-    end_ts   = df["dt"].iloc[-1].strftime("%Y-%m-%d %H:%M:%S")
-
     return Finding(
         metric="Rdratio / PhyRds (buffer pool pressure)",
         severity="Yellow",
         observation=f"Rdratio declined from {rd_first:.1f}% to {rd_last:.1f}% "
                     f"({(rd_last - rd_first) / rd_first * 100:.1f}% change) while PhyRds "
                     f"increased from {ph_first:.1f} to {ph_last:.1f} over the collection window.",
-        when=f"{start_ts} – {end_ts}",
+        when=cf.span(),
         corroborating=["Rdratio decline and PhyRds increase are anti-correlated, consistent with buffer pressure"],
         hypotheses=["hypothesis: global buffer working set is growing beyond allocated size — "
                     "buffers are undersized for current workload"],
@@ -859,36 +1029,36 @@ def _test_buffer_pressure(df: pd.DataFrame) -> Optional[Finding]:
     )
 
 
-def _test_write_daemon_strain(df: pd.DataFrame) -> Optional[Finding]:
+def _test_write_daemon_strain(df) -> Optional[Finding]:
     """
     Test 3: WDQsz growing cycle-over-cycle (not merely non-zero — that is
     normal on a busy system, since the write daemon copies a subset into
     WDSECQ each cycle while new dirty buffers keep landing in WDQ) with
     concurrent elevated wa: write-path (storage/WIJ/journal) latency.
     """
-    if "WDQsz" not in df.columns:
+    cf = _correlation_frame(df)
+    if "WDQsz" not in cf:
         return None
 
-    df = df.sort_values("dt").reset_index(drop=True)
-    wdqsz = pd.to_numeric(df["WDQsz"], errors="coerce").fillna(0)
-    nonzero_runs = _find_breaches(wdqsz, df["dt"], 0.0, WARN_CONSECUTIVE)
+    wdqsz = cf.filled("WDQsz")
+    nonzero_runs = _find_breaches(wdqsz, cf.times, 0.0, WARN_CONSECUTIVE)
     if not nonzero_runs:
         return None
 
     wa_warn = float(METRIC_THRESHOLDS.get("wa", {}).get("fixed_warn", 10.0) or 10.0)
+    wa = cf.values["wa"] if "wa" in cf else np.zeros(cf.n)
 
     for start, end, count in nonzero_runs:
-        window = df[(df["dt"] >= start) & (df["dt"] <= end)]
-        run_vals = pd.to_numeric(window["WDQsz"], errors="coerce").fillna(0)
+        rows = cf.window(start, end)
+        run_vals = wdqsz[rows]
         third = max(1, len(run_vals) // 3)
-        first_mean = run_vals.iloc[:third].mean()
-        last_mean = run_vals.iloc[-third:].mean()
+        first_mean = run_vals[:third].mean()
+        last_mean = run_vals[-third:].mean()
         growing = last_mean > first_mean * 1.5 and last_mean > first_mean + 100
         if not growing:
             continue
 
-        wa_col = window["wa"] if "wa" in window.columns else pd.Series([0.0] * len(window))
-        wa_mean = float(pd.to_numeric(wa_col, errors="coerce").mean() or 0.0)
+        wa_mean = _nanmean(wa[rows])
         if wa_mean < wa_warn:
             continue
 
@@ -909,32 +1079,26 @@ def _test_write_daemon_strain(df: pd.DataFrame) -> Optional[Finding]:
     return None
 
 
-def _test_memory_danger(df: pd.DataFrame) -> Optional[Finding]:
+def _test_memory_danger(df) -> Optional[Finding]:
     """Test 4: free trending down + cache shrinking + any si/so."""
-    if "free" not in df.columns:
+    cf = _correlation_frame(df)
+    if "free" not in cf:
         return None
-
-    df = df.sort_values("dt").reset_index(drop=True)
-    n = len(df)
-    if n < 6:
+    if cf.n < 6:
         return None
 
-    free  = pd.to_numeric(df["free"],  errors="coerce").fillna(0)
-    cache = pd.to_numeric(df.get("cache", pd.Series([float("nan")] * n)), errors="coerce")
-    si    = pd.to_numeric(df.get("si",    pd.Series([0.0] * n)),           errors="coerce").fillna(0)
-    so    = pd.to_numeric(df.get("so",    pd.Series([0.0] * n)),           errors="coerce").fillna(0)
-
-    third = n // 3
-    free_declining  = free.iloc[2*third:].mean() < free.iloc[:third].mean() * 0.80
-    cache_shrinking = (not cache.isna().all()) and cache.iloc[2*third:].mean() < cache.iloc[:third].mean() * 0.85
-    any_swap = (si > 0).any() or (so > 0).any()
+    free_first, free_last = _thirds(cf.filled("free"))
+    cache = cf.values.get("cache", np.full(cf.n, np.nan))
+    third = cf.n // 3
+    free_declining  = free_last < free_first * 0.80
+    cache_shrinking = (not np.isnan(cache).all()) and \
+        _nanmean(cache[2*third:]) < _nanmean(cache[:third]) * 0.85
+    any_swap = bool((cf.filled("si") > 0).any() or (cf.filled("so") > 0).any())
 
     if not (free_declining and any_swap):
         return None
 
     severity = "Red" if any_swap else "Yellow"
-    start_ts = df["dt"].iloc[0].strftime("%Y-%m-%d %H:%M:%S")
-    end_ts   = df["dt"].iloc[-1].strftime("%Y-%m-%d %H:%M:%S")
 
     corroborating = []
     if cache_shrinking:
@@ -945,10 +1109,10 @@ def _test_memory_danger(df: pd.DataFrame) -> Optional[Finding]:
     return Finding(
         metric="free / cache / swap (memory danger)",
         severity=severity,
-        observation=f"Free memory declined {_fmt_n(free.iloc[:third].mean())} → {_fmt_n(free.iloc[2*third:].mean())} KB "
+        observation=f"Free memory declined {_fmt_n(free_first)} → {_fmt_n(free_last)} KB "
                     f"over the collection window" +
                     (" with concurrent swap activity." if any_swap else "."),
-        when=f"{start_ts} – {end_ts}",
+        when=cf.span(),
         corroborating=corroborating,
         hypotheses=["hypothesis: memory leak or growing resident set in IRIS or companion processes",
                     "hypothesis: insufficient RAM for configured IRIS global buffers + OS overhead"],
@@ -957,36 +1121,30 @@ def _test_memory_danger(df: pd.DataFrame) -> Optional[Finding]:
     )
 
 
-def _test_contention_vs_throughput(df: pd.DataFrame) -> Optional[Finding]:
+def _test_contention_vs_throughput(df) -> Optional[Finding]:
     """Test 5: ASeize fraction rising relative to Seizes."""
-    if "Seize" not in df.columns or "ASeize" not in df.columns:
+    cf = _correlation_frame(df)
+    if "Seize" not in cf or "ASeize" not in cf:
         return None
-
-    df = df.sort_values("dt").reset_index(drop=True)
-    n = len(df)
-    if n < 9:
+    if cf.n < 9:
         return None
 
-    seize  = pd.to_numeric(df["Seize"],  errors="coerce").fillna(0)
-    aseize = pd.to_numeric(df["ASeize"], errors="coerce").fillna(0)
+    seize  = cf.filled("Seize")
+    aseize = cf.filled("ASeize")
 
-    fraction = aseize.where(seize > 0, 0) / seize.where(seize > 0, 1) * 100
-    third = n // 3
-    frac_first = fraction.iloc[:third].mean()
-    frac_last  = fraction.iloc[2*third:].mean()
+    busy = seize > 0
+    fraction = np.where(busy, aseize, 0) / np.where(busy, seize, 1) * 100
+    frac_first, frac_last = _thirds(fraction)
 
     if frac_last < 5.0 or frac_last < frac_first * 1.5:
         return None
 
-    start_ts = df["dt"].iloc[0].strftime("%Y-%m-%d %H:%M:%S")
-    end_ts   = df["dt"].iloc[-1].strftime("%Y-%m-%d %H:%M:%S")
-
     return Finding(
         metric="ASeize/Seize (lock contention)",
         severity="Yellow",
         observation=f"ASeize fraction rose from {frac_first:.1f}% to {frac_last:.1f}% of Seizes — "
                     f"genuine lock contention increasing, not just throughput scaling.",
-        when=f"{start_ts} – {end_ts}",
+        when=cf.span(),
         corroborating=["Seize is rising in proportion but ASeize fraction is also rising — contention, not scaling"],
         hypotheses=["hypothesis: lock table pressure — review locksiz in CPF",
                     "hypothesis: application-level contention on a shared resource"],
@@ -994,43 +1152,32 @@ def _test_contention_vs_throughput(df: pd.DataFrame) -> Optional[Finding]:
     )
 
 
-def _test_kernel_overhead(df: pd.DataFrame) -> Optional[Finding]:
+def _test_kernel_overhead(df) -> Optional[Finding]:
     """Test 6: sy growing relative to us at similar Glorefs."""
-    if "us" not in df.columns or "sy" not in df.columns:
+    cf = _correlation_frame(df)
+    if "us" not in cf or "sy" not in cf:
         return None
-
-    df = df.sort_values("dt").reset_index(drop=True)
-    n = len(df)
-    if n < 9:
+    if cf.n < 9:
         return None
 
-    us = pd.to_numeric(df["us"], errors="coerce").fillna(0)
-    sy = pd.to_numeric(df["sy"], errors="coerce").fillna(0)
-    total = us + sy
-    sy_frac = sy.where(total > 0, 0) / total.where(total > 0, 1)
-
-    third = n // 3
-    sf_first = sy_frac.iloc[:third].mean()
-    sf_last  = sy_frac.iloc[2*third:].mean()
+    sy = cf.filled("sy")
+    total = cf.filled("us") + sy
+    busy = total > 0
+    sf_first, sf_last = _thirds(np.where(busy, sy, 0) / np.where(busy, total, 1))
 
-    glorefs = pd.to_numeric(df.get("Glorefs", pd.Series([1.0] * n)), errors="coerce").fillna(1)
-    gl_first = glorefs.iloc[:third].mean()
-    gl_last  = glorefs.iloc[2*third:].mean()
+    gl_first, gl_last = _thirds(cf.filled("Glorefs", 1.0))
     glorefs_stable = abs(gl_last - gl_first) / (gl_first + 1) < 0.20
 
     if not (glorefs_stable and sf_last > sf_first * 1.5 and sf_last > 0.30):
         return None
 
-    start_ts = df["dt"].iloc[0].strftime("%Y-%m-%d %H:%M:%S")
-    end_ts   = df["dt"].iloc[-1].strftime("%Y-%m-%d %H:%M:%S")
-
     return Finding(
         metric="sy/us ratio (kernel overhead)",
         severity="Yellow",
         observation=f"Kernel CPU fraction grew from {sf_first*100:.1f}% to {sf_last*100:.1f}% of total CPU "
                     f"while Glorefs remained stable ({_fmt_n(gl_first)} → {_fmt_n(gl_last)}) — "
                     f"increasing kernel overhead not explained by workload growth.",
-        when=f"{start_ts} – {end_ts}",
+        when=cf.span(),
         corroborating=["Glorefs stable — workload not increasing, so sy growth is not proportional"],
         hypotheses=["hypothesis: HugePages not configured — IRIS managing its own TLB misses",
                     "hypothesis: NUMA cross-socket memory traffic",
@@ -1039,27 +1186,24 @@ def _test_kernel_overhead(df: pd.DataFrame) -> Optional[Finding]:
     )
 
 
-def _test_batch_window(df: pd.DataFrame) -> Optional[Finding]:
+def _test_batch_window(df) -> Optional[Finding]:
     """
     Test 7: Identify overnight PhyWrs/Jrnwrts surge.
     Alert if it overlaps with business hours (08:00+).
     """
-    if "PhyWrs" not in df.columns and "Jrnwrts" not in df.columns:
+    cf = _correlation_frame(df)
+    if "PhyWrs" not in cf and "Jrnwrts" not in cf:
         return None
-
-    df = df.sort_values("dt").reset_index(drop=True)
-
-    overnight = df[df["dt"].dt.hour.between(0, 6)].copy()
-    business  = df[df["dt"].dt.hour.between(8, 9)].copy()
-
-    if overnight.empty:
+    if not cf.overnight.any():
         return None
 
-    phywrs  = pd.to_numeric(df.get("PhyWrs",  pd.Series([0.0]*len(df))), errors="coerce").fillna(0)
-
-    overnight_pw  = pd.to_numeric(overnight.get("PhyWrs",  pd.Series([0.0])), errors="coerce").mean()
-    business_pw   = pd.to_numeric(business.get("PhyWrs",   pd.Series([0.0])), errors="coerce").mean() if not business.empty else 0
-    overall_pw    = phywrs.mean()
+    phywrs = cf.filled("PhyWrs")
+    if "PhyWrs" in cf:
+        overnight_pw = _nanmean(cf.values["PhyWrs"][cf.overnight])
+        business_pw  = _nanmean(cf.values["PhyWrs"][cf.morning_ramp]) if cf.morning_ramp.any() else 0
+    else:
+        overnight_pw = business_pw = 0.0
+    overall_pw = phywrs.mean()
 
     # Batch window exists if overnight writes are >2× overall mean
     if overnight_pw < overall_pw * 2.0:
@@ -1085,3 +1229,288 @@ def _test_batch_window(df: pd.DataFrame) -> Optional[Finding]:
         next_step=("Review backup schedule; aim to complete before 07:00." if overlap
                    else "No action required."),
     )
+
+
+# ---------------------------------------------------------------------------
+# Task 8: anomaly detection over every numeric column
+# ---------------------------------------------------------------------------
+
+# Samples are binned by ANOMALY_BIN; each bin is scored against the median and
+# spread of the bins in the ANOMALY_WINDOW before it, and a run found that way
+# against the bins within ANOMALY_DAILY_SLACK of its time of day on other days.
+ANOMALY_BIN = pd.Timedelta(minutes=5)
+ANOMALY_WINDOW = pd.Timedelta(hours=1)
+ANOMALY_DAILY_SLACK = pd.Timedelta(minutes=15)
+ANOMALY_MIN_BINS = 3        # bins of history before a sample is scored
+ANOMALY_WARN_Z = 5.0        # robust z of a Yellow run of WARN_CONSECUTIVE samples
+ANOMALY_ALERT_Z = 8.0       # robust z of a Red run of ALERT_CONSECUTIVE samples
+# Floor of the spread, relative to the median: a near-constant metric must move
+# by ANOMALY_WARN_Z × 5% = 25% before it is an anomaly, not by a rounding step.
+ANOMALY_MIN_SPREAD = 0.05
+ANOMALY_MAX_FINDINGS = 8
+
+_NORMAL_MEAN_AD = np.sqrt(np.pi / 2)   # σ per mean absolute deviation of a normal distribution
+
+
+def _fmt_value(value) -> str:
+    """_fmt_n for large values, one decimal for small ones (await ms, b, si...)."""
+    return _fmt_n(value) if abs(value) >= 100 else f"{value:.1f}"
+
+
+class AnomalyDetector:
+    """
+    Rolling robust z-scores of every numeric column of one source (mgstat,
+    vmstat, one iostat device), fed chunk by chunk in time order.
+
+    Each ANOMALY_BIN of samples is summarised by its median and its mean
+    absolute deviation from that median. A sample's robust z is its distance
+    from the median of the bin medians in the ANOMALY_WINDOW before its bin,
+    over σ estimated from those bins (each bin's distance from that median plus
+    its own deviation, median over the bins), floored at ANOMALY_MIN_SPREAD of
+    the median. The baseline is the recent past of the same metric, so
+    anything that changes abruptly is caught whatever its absolute level; a
+    single outlier moves one bin, not the median of twelve.
+
+    Runs beyond ±ANOMALY_ALERT_Z for ALERT_CONSECUTIVE samples are Red,
+    beyond ±ANOMALY_WARN_Z for WARN_CONSECUTIVE samples Yellow, as the KPI
+    checks. All columns are scored with array operations on the whole chunk;
+    runs are then found among the (few) samples beyond a level.
+
+    What happens every day (the 08:00 ramp, the overnight batch) is abrupt
+    too, so once everything is fed a run only counts if its largest deviation
+    is beyond the same level against the same time of day on the other days
+    (see _daily_deviation). With a single day there is nothing to compare
+    with and the trailing hour decides alone.
+
+    Only the last (possibly incomplete) bin, the bin statistics (a few
+    hundred rows a day) and the runs are kept between chunks, so memory stays
+    flat on multi-week data and the result does not depend on the chunk size.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.columns = None
+        self._levels = [(ANOMALY_ALERT_Z, ALERT_CONSECUTIVE), (ANOMALY_WARN_Z, WARN_CONSECUTIVE)]
+        self._pending = None        # rows of the last bin, scored with the next chunk
+        self._done_until = None     # start of the first bin not scored yet
+        self._bin_times = np.array([], dtype="datetime64[ns]")
+        self._bin_medians = None    # statistics of the bins of the last window
+        self._bin_deviations = None
+        self._history = []          # (times, medians, deviations) of every bin, per chunk
+        self._last_time = None
+        # Per level: {key: [length, start, end, peak]} of the runs open at the end of the last chunk
+        self._open = [{} for _ in self._levels]
+        # (level, key) -> [(start, end, samples, peak)] with a peak (z, value, norm, time).
+        # Key k is column k above its norm, column k - len(columns) below.
+        self._runs = {}
+
+    def feed(self, chunk: pd.DataFrame) -> None:
+        """Score the rows of chunk ('dt' and numeric columns), later in time than those fed before."""
+        if chunk is None or chunk.empty:
+            return
+        if self.columns is None:
+            self.columns = [c for c in chunk.columns if c != "dt" and pd.api.types.is_numeric_dtype(chunk[c])]
+            self._bin_medians = np.empty((0, len(self.columns)))
+            self._bin_deviations = np.empty((0, len(self.columns)))
+        rows = chunk.reindex(columns=["dt"] + self.columns)
+        if self._pending is not None:
+            rows = pd.concat([self._pending, rows], ignore_index=True)
+        if not rows["dt"].is_monotonic_increasing:
+            rows = rows.sort_values("dt", kind="stable")
+        if self._done_until is not None:
+            rows = rows[rows["dt"] >= self._done_until]
+        if rows.empty:
+            return
+        bins = rows["dt"].dt.floor(ANOMALY_BIN)
+        last = bins.iloc[-1]
+        self._pending = rows[bins == last]
+        self._score(rows[bins != last], final=False)
+
+    def _score(self, rows: pd.DataFrame, final: bool) -> None:
+        if not rows.empty:
+            times = rows["dt"].to_numpy(dtype="datetime64[ns]")
+            codes, bin_times = pd.factorize(rows["dt"].dt.floor(ANOMALY_BIN), sort=True)
+            values = rows[self.columns].to_numpy(dtype=float, na_value=np.nan)
+            norm, sigma = self._baselines(values, codes, bin_times.to_numpy(dtype="datetime64[ns]"))
+            sample_norm = norm[codes]
+            distance = values - sample_norm
+            with np.errstate(divide="ignore", invalid="ignore"):
+                z = distance / sigma[codes]
+            z[distance == 0] = 0.0    # after a flat window, only a change is infinitely unusual
+            for level in range(len(self._levels)):
+                self._track_runs(level, z, values, sample_norm, times, final)
+            self._last_time = times[-1]
+        elif final:
+            for level in range(len(self._levels)):
+                for key, run in self._open[level].items():
+                    self._record(level, key, run)
+                self._open[level] = {}
+
+    def _baselines(self, values, codes, bin_times) -> tuple:
+        """(norm, sigma) of each bin of values, from the bins of the window before it."""
+        # Median and mean absolute deviation of each bin, for all columns at once
+        medians = pd.DataFrame(values).groupby(codes).median().to_numpy()
+        deviations = pd.DataFrame(np.abs(values - medians[codes])).groupby(codes).mean().to_numpy()
+
+        # The window of each new bin, over the bins kept from the last chunk and these
+        all_times = np.concatenate([self._bin_times, bin_times])
+        all_medians = np.vstack([self._bin_medians, medians])
+        all_deviations = np.vstack([self._bin_deviations, deviations])
+        new = np.arange(len(self._bin_times), len(all_times))
+        first = np.searchsorted(all_times, all_times[new] - ANOMALY_WINDOW.to_timedelta64(), side="left")
+        window = first[:, np.newaxis] + np.arange(int(ANOMALY_WINDOW / ANOMALY_BIN))
+        outside = window >= new[:, np.newaxis]
+        window = np.where(outside, 0, window)
+        past_medians = np.where(outside[:, :, np.newaxis], np.nan, all_medians[window])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)   # all-NaN windows: no baseline yet
+            norm = np.nanmedian(past_medians, axis=1)
+            spread = np.nanmedian(np.abs(past_medians - norm[:, np.newaxis, :]) + all_deviations[window], axis=1)
+        norm[(~np.isnan(past_medians)).sum(axis=1) < ANOMALY_MIN_BINS] = np.nan
+
+        self._history.append((bin_times, medians, deviations))
+        keep = all_times >= all_times[-1] - ANOMALY_WINDOW.to_timedelta64()
+        self._bin_times = all_times[keep]
+        self._bin_medians, self._bin_deviations = all_medians[keep], all_deviations[keep]
+        self._done_until = pd.Timestamp(bin_times[-1]) + ANOMALY_BIN
+        return norm, np.maximum(spread * _NORMAL_MEAN_AD, np.abs(norm) * ANOMALY_MIN_SPREAD)
+
+    def _track_runs(self, level, z, values, norms, times, final) -> None:
+        """Runs of samples beyond the level's z, continuing those left open by the last chunk."""
+        threshold, min_consecutive = self._levels[level]
+        n_columns = z.shape[1]
+        above = np.hstack([z > threshold, z < -threshold])
+        open_runs, self._open[level] = self._open[level], {}
+        for key, run in open_runs.items():
+            if not above[0, key]:             # it stopped at the end of the last chunk
+                self._record(level, key, run)
+
+        keys, rows = np.nonzero(above.T)      # by key, then time
+        if not len(rows):
+            return
+        columns = keys % n_columns
+        signed = np.where(keys < n_columns, z[rows, columns], -z[rows, columns])
+        starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]) | (rows[1:] != rows[:-1] + 1)])
+        ends = np.r_[starts[1:], len(rows)] - 1
+        lengths = rows[ends] - rows[starts] + 1
+        continued = rows[starts] == 0
+        still_open = (rows[ends] == len(times) - 1) & (not final)
+        # Every run long enough, plus those that continue or stay open: one Python step each
+        for i in np.flatnonzero((lengths >= min_consecutive) | continued | still_open):
+            key, start, end = int(keys[starts[i]]), starts[i], ends[i]
+            at = start + int(np.argmax(signed[start:end + 1]))
+            peak = (signed[at], values[rows[at], columns[at]], norms[rows[at], columns[at]], times[rows[at]])
+            run = [int(lengths[i]), times[rows[start]], times[rows[end]], peak]
+            if continued[i] and key in open_runs:
+                length, run_start, _, open_peak = open_runs[key]
+                run = [length + run[0], run_start, run[2], max(open_peak, peak, key=lambda p: p[0])]
+            if still_open[i]:
+                self._open[level][key] = run
+            else:
+                self._record(level, key, run)
+
+    def _record(self, level, key, run) -> None:
+        length, start, end, peak = run
+        if length >= self._levels[level][1]:
+            self._runs.setdefault((level, key), []).append((pd.Timestamp(start), pd.Timestamp(end), length, peak))
+
+    def _daily_deviation(self, history, key, value, at) -> Optional[tuple]:
+        """
+        (robust z, norm) of value against the same time of day on the other
+        days, None without any. Each other day contributes the bin within
+        ANOMALY_DAILY_SLACK of at that value is closest to, in that bin's σ,
+        so a daily ramp a few minutes early or late still matches; the result
+        is the median over the days.
+        """
+        times, medians, deviations = history
+        column, sign = key % len(self.columns), 1 if key < len(self.columns) else -1
+        at = np.datetime64(pd.Timestamp(at).floor(ANOMALY_BIN), "ns")
+        day = pd.Timedelta(days=1).to_timedelta64()
+        days = np.round((times - at) / day).astype(np.int64)
+        near = ((np.abs(times - at - days * day) <= ANOMALY_DAILY_SLACK.to_timedelta64()) & (days != 0)
+                & ~np.isnan(medians[:, column]))
+        if not near.any():
+            return None
+        days, norms = days[near], medians[near, column]
+        sigmas = np.maximum(deviations[near, column] * _NORMAL_MEAN_AD, np.abs(norms) * ANOMALY_MIN_SPREAD)
+        distance = sign * (value - norms)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = np.where(distance == 0, 0.0, distance / sigmas)
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        closest = [start + int(np.argmin(part)) for start, part in zip(starts, np.split(z, starts[1:]))]
+        return float(np.median(z[closest])), float(np.median(norms[closest]))
+
+    def candidates(self) -> list:
+        """Score the last bin and return [(rank, Finding, longest run)], one per column and direction."""
+        if self.columns is None:
+            return []
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            self._score(pending, final=True)
+        if not self._runs:
+            return []
+        history = (np.concatenate([times for times, _, _ in self._history]),
+                   np.vstack([medians for _, medians, _ in self._history]),
+                   np.vstack([deviations for _, _, deviations in self._history]))
+        # Only runs beyond the level against the other days as well: [(run, daily norm or None)]
+        runs = {}
+        for (level, key), level_runs in self._runs.items():
+            kept = []
+            for run in level_runs:
+                daily = self._daily_deviation(history, key, run[3][1], run[3][3])
+                if daily is None or daily[0] > self._levels[level][0]:
+                    kept.append((run, None if daily is None else daily[1]))
+            if kept:
+                runs[(level, key)] = kept
+        result = []
+        for key in sorted({key for _, key in runs}):
+            level = 0 if (0, key) in runs else 1
+            key_runs = [run[:3] for run, _ in runs[(level, key)]]
+            n, first_runs, longest = len(key_runs), key_runs[:3], max(key_runs, key=lambda run: run[2])
+            (_, _, _, (z, value, norm, at)), daily = max(runs[(level, key)], key=lambda pair: pair[0][3][0])
+            column = self.columns[key % len(self.columns)]
+            if n <= 3:
+                when = _fmt_breach_when(first_runs, _fmt_ts)[0]
+            else:
+                first = first_runs[0]
+                when = (f"{n} breach events; first {_fmt_ts(first[0])} – {_fmt_ts(first[1])} (×{first[2]} samples), "
+                        f"worst {_fmt_ts(longest[0])} – {_fmt_ts(longest[1])} (×{longest[2]} samples)")
+            recurrence = f" Occurred {n} time(s) across the collection window." if n > 1 else ""
+            deviation = f"{z:.1f} robust σ" if np.isfinite(z) else "after an hour without any variation"
+            if daily is not None:
+                deviation += f"; {_fmt_value(daily)} at this time on the other days"
+            finding = Finding(
+                metric=f"{self.source} {column} (anomaly)",
+                severity="Red" if level == 0 else "Yellow",
+                observation=f"{column} was {'above' if key < len(self.columns) else 'below'} its trailing-hour "
+                            f"norm by more than {self._levels[level][0]:.0f} robust σ for {longest[2]} consecutive "
+                            f"samples.{recurrence} Largest deviation: {_fmt_value(value)} against a norm of "
+                            f"{_fmt_value(norm)} ({deviation}) at {_fmt_ts(at)}.",
+                when=when,
+                hypotheses=[f"hypothesis: {column} changed abruptly against its own recent past"
+                            + (" and is unlike the same time on other days" if daily is not None else "")
+                            + " — a regression, configuration change or new workload, not necessarily a "
+                              "threshold breach"],
+                next_step=f"Check what started at {_fmt_ts(longest[0])} (deployments, batch jobs, configuration) "
+                          f"and compare {column} with the same period on other days.",
+            )
+            result.append(((level, -z, -longest[2]), finding, longest))
+        return result
+
+
+def _anomaly_findings(detectors: list, limit: int = ANOMALY_MAX_FINDINGS) -> list:
+    """
+    The Findings of detectors (AnomalyDetector, all fed), Red before Yellow
+    and by largest deviation, at most limit of them. Each lists the other
+    anomalies whose longest run overlaps its own as corroborating.
+    """
+    candidates = sorted((c for detector in detectors for c in detector.candidates()), key=lambda c: c[0])
+    findings = []
+    for rank, finding, (start, end, _) in candidates[:limit]:
+        finding.corroborating = [
+            f"{other.metric} also anomalous {_fmt_ts(other_start)} – {_fmt_ts(other_end)}"
+            for _, other, (other_start, other_end, _) in candidates
+            if other is not finding and other_start <= end and other_end >= start
+        ][:3]
+        findings.append(finding)
+    return findings
@@ -0,0 +1,94 @@
+# tests/test_baseline_store.py
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import baseline_store
+import chart_rollups
+import performance_analysis as pa
+from llm_context import build_llm_context
+
+
+def _week(start, seed):
+    times = pd.date_range(start, periods=7 * 288, freq="5min")
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"RunDate": times.strftime("%m/%d/%Y"), "RunTime": times.strftime("%H:%M:%S")})
+    for column in baseline_store.BASELINE_METRICS:
+        df[column] = rng.gamma(2.0, 500.0, len(times))
+    df.loc[rng.random(len(times)) < 0.1, "PhyRds"] = 0.0  # the sketch's zero bucket
+    return df
+
+
+def _database(weeks, update_each=True):
+    conn = sqlite3.connect(":memory:")
+    store = baseline_store.BaselineStore(conn)
+    for i, week in enumerate(weeks):
+        chart_rollups.append_rows(conn, "mgstat", week, f"week{i + 1}")
+        if update_each:
+            assert store.update() == len(week)
+    if not update_each:
+        store.update()
+    assert store.update() == 0  # nothing new
+    return conn, store
+
+
+def test_incremental_history_matches_one_pass_and_compute_baselines():
+    weeks = [_week("2026-03-02", 1), _week("2026-03-09", 2)]
+    conn, store = _database(weeks)
+    other, one_pass = _database(weeks, update_each=False)
+
+    stored, reference = store.load(), one_pass.load()
+    assert stored.keys() == reference.keys()
+    for key, stats in stored.items():
+        assert stats.n == reference[key].n and stats.zeros == reference[key].zeros
+        assert stats.buckets == reference[key].buckets
+        assert stats.mean == pytest.approx(reference[key].mean)
+        assert stats.m2 == pytest.approx(reference[key].m2)
+
+    samples = pd.concat(weeks, ignore_index=True)
+    samples["dt"] = pd.to_datetime(samples["RunDate"] + " " + samples["RunTime"], format="%m/%d/%Y %H:%M:%S")
+    expected = pa._compute_baselines(samples, list(baseline_store.BASELINE_METRICS))
+    history = store.baselines()
+    assert list(history) == list(expected)
+    assert list(dict.fromkeys(weekday for weekday, _ in history)) == pa._WEEKDAY_ORDER
+    for key, metrics in expected.items():
+        assert list(history[key]) == list(metrics)
+        for metric, b in metrics.items():
+            for stat in ("mean", "sigma", "max"):
+                assert history[key][metric][stat] == pytest.approx(b[stat])
+            assert history[key][metric]["p95"] == pytest.approx(b["p95"], rel=0.011)
+    assert store.summary() == {"samples": len(samples), "first": "2026-03-02 00:00:00",
+                               "last": "2026-03-15 23:55:00"}
+    conn.close()
+    other.close()
+
+
+def test_history_baselines_bundle_covers_the_last_capture_only():
+    conn, store = _database([_week("2026-03-02", 1), _week("2026-03-09", 2)])
+    ctx = build_llm_context(conn, {}, history_baselines=True)
+    assert ctx["collection"]["start"] == "2026-03-09 00:00:00"
+    assert ctx["baseline_history"]["samples"] == 2 * 7 * 288
+    assert ctx["baselines"] == store.baselines(list(ctx["baselines"][("Monday", "09:00–11:30")]))
+
+    ctx = build_llm_context(conn, {})
+    assert ctx["collection"]["start"] == "2026-03-02 00:00:00"
+    assert "baseline_history" not in ctx
+    conn.close()
+
+
+def test_baselines_leave_out_combinations_below_min_samples():
+    week = _week("2026-03-02", 3).iloc[:39]  # Monday 00:00-03:10: 3 samples at 03:00-03:10
+    conn, store = _database([week])
+    samples = week.assign(dt=pd.to_datetime(week["RunDate"] + " " + week["RunTime"], format="%m/%d/%Y %H:%M:%S"))
+    expected = pa._compute_baselines(samples, list(baseline_store.BASELINE_METRICS))
+    assert list(expected) == [("Monday", "00:15–02:45"), ("Monday", "03:00–06:00")]
+    assert list(store.baselines()) == list(expected)
+    assert list(store.baselines(min_samples=4)) == [("Monday", "00:15–02:45")]
+    assert store.baselines(metrics=("Missing",)) == {}
+    conn.close()
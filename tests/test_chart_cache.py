@@ -0,0 +1,75 @@
+# tests/test_chart_cache.py
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from chart_cache import ChartCache, MANIFEST_NAME
+
+
+def _frame(values):
+    times = pd.date_range("2026-04-30 10:00", periods=len(values), freq="min")
+    return pd.DataFrame({"datetime_parsed": times, "metric": np.asarray(values, dtype="float64")})
+
+
+class _Renderer:
+    """Writes one file per call and counts calls."""
+
+    def __init__(self, path, result=None):
+        self.path = path
+        self.result = result
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        with open(self.path, "w") as f:
+            f.write(str(self.calls))
+        return self.result
+
+
+def test_unchanged_chart_is_skipped_across_runs():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        peak = (pd.Timestamp("2026-04-30 10:01"), pd.Timestamp("2026-04-30 11:01"))
+        render = _Renderer(os.path.join(tmpdir, "Glorefs.png"), peak)
+
+        cache = ChartCache(tmpdir)
+        assert cache.render("k", tmpdir, _frame([1, 2, 3]), {"min_max": True}, render) == peak
+        cache.save()
+        assert os.path.isfile(os.path.join(tmpdir, MANIFEST_NAME))
+
+        cache = ChartCache(tmpdir)
+        assert cache.render("k", tmpdir, _frame([1, 2, 3]), {"min_max": True}, render) == peak
+        assert render.calls == 1
+        assert (cache.drawn, cache.skipped) == (0, 1)
+
+
+def test_changed_data_params_or_missing_output_redraws():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        render = _Renderer(os.path.join(tmpdir, "Glorefs.png"))
+        cache = ChartCache(tmpdir)
+        cache.render("k", tmpdir, _frame([1, 2, 3]), {"day_overlay": False}, render)
+
+        cache.render("k", tmpdir, _frame([1, 2, 4]), {"day_overlay": False}, render)
+        assert render.calls == 2
+        cache.render("k", tmpdir, _frame([1, 2, 4]), {"day_overlay": True}, render)
+        assert render.calls == 3
+        os.remove(render.path)
+        cache.render("k", tmpdir, _frame([1, 2, 4]), {"day_overlay": True}, render)
+        assert render.calls == 4
+
+
+def test_linked_chart_through_cache_records_its_files():
+    import yaspe
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filepath = tmpdir + "/"
+        cache = ChartCache(tmpdir)
+        yaspe._cached_chart(cache, yaspe.linked_chart, _frame([1, 2, 3]), "Glorefs", "Glorefs", 0, filepath, "")
+        entry = next(iter(cache.entries.values()))
+        assert entry["files"] == [os.path.join(tmpdir, "Glorefs.html")]
+        yaspe._cached_chart(cache, yaspe.linked_chart, _frame([1, 2, 3]), "Glorefs", "Glorefs", 0, filepath, "")
+        assert (cache.drawn, cache.skipped) == (1, 1)
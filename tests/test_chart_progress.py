@@ -0,0 +1,65 @@
+# tests/test_chart_progress.py
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chart_progress
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_progress_eta_and_variant_breakdown():
+    clock = _Clock()
+    out = io.StringIO()
+    progress = chart_progress.ChartProgress(out, clock=clock, report_seconds=10)
+    progress.plan("mgstat", 10)
+    progress.plan("iostat", 5, ["sda", "sdb"])
+    progress.plan("iostat", 4, ["sda", "sdb"])  # corrected once the table is read
+    assert progress.total == 18
+    assert progress.describe_plan() == "18 charts: mgstat 10, iostat 8 (2 devices x 4)"
+
+    for _ in range(6):
+        with progress.timed("HTML"):
+            clock.now += 2.0
+            with progress.timed("day_overlay HTML"):
+                clock.now += 1.0
+        progress.tick()
+    assert out.getvalue() == "Charts: 4/18 (22%), 0.3 charts/s, about 42s left\n"  # after 10 seconds
+
+    progress.summary()
+    lines = out.getvalue().splitlines()
+    assert lines[1] == "Charts: 6 in 18s"
+    assert lines[3].split()[:4] == ["HTML", "6", "drawn", "12.0s"]  # nested time not counted twice
+    assert lines[4].split()[:2] == ["day_overlay", "HTML"]
+
+
+def test_tracking_is_off_until_started():
+    calls = []
+
+    @chart_progress.timed("base PNG")
+    def draw(value):
+        calls.append(value)
+        return value * 2
+
+    assert draw(2) == 4
+    chart_progress.tick()  # no-op
+
+    out = io.StringIO()
+    progress = chart_progress.start(out)
+    try:
+        assert draw(3) == 6
+        chart_progress.tick()
+        assert progress.variants["base PNG"][0] == 1 and progress.done == 1
+        assert draw.__name__ == "draw"
+    finally:
+        chart_progress.finish()
+    assert calls == [2, 3]
+    assert "Time per chart variant:" in out.getvalue()
@@ -0,0 +1,111 @@
+# tests/test_chart_rollups.py
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+import chart_rollups
+import yaspe
+from chart_cache import ChartCache
+
+
+def _values(start, periods, freq="min"):
+    index = pd.date_range(start, periods=periods, freq=freq)
+    rng = np.random.default_rng(7)
+    return pd.DataFrame({"Glorefs": rng.integers(1000, 5000, periods).astype(float),
+                         "PhyRds": rng.integers(0, 50, periods).astype(float)}, index=index)
+
+
+def _mgstat(start, periods):
+    values = _values(start, periods, freq="5min")
+    df = values.reset_index(drop=True)
+    df.insert(0, "RunDate", values.index.strftime("%m/%d/%Y"))
+    df.insert(1, "RunTime", values.index.strftime("%H:%M:%S"))
+    return df
+
+
+def test_day_rollups_stored_and_combined_match_a_full_computation():
+    values = _values("2026-05-01 00:00", 3 * 24 * 120 + 90, freq="30s")
+    full = chart_rollups.day_rollups(values)
+
+    # The overlay has at most a point a minute
+    assert len(full.overlay) == values.index.floor("min").nunique()
+
+    conn = sqlite3.connect(":memory:")
+    store = chart_rollups.RollupStore(conn)
+    store.update("mgstat", full)
+    loaded = store.load("mgstat")
+    for stored, computed in zip(loaded._frames(), full._frames()):
+        pd.testing.assert_frame_equal(pd.DataFrame(stored), pd.DataFrame(computed), check_names=False,
+                                      check_dtype=False, check_freq=False, check_column_type=False)
+
+    # Recomputing only the last two days and combining gives the same rollups
+    later = values[values.index >= "2026-05-03"]
+    combined = loaded.combine(chart_rollups.day_rollups(later))
+    pd.testing.assert_frame_equal(combined.daily_p99, full.daily_p99, check_names=False, check_column_type=False)
+    pd.testing.assert_frame_equal(combined.hourly_p99, full.hourly_p99, check_names=False, check_column_type=False)
+
+    profile = chart_rollups.profiles(combined)["Glorefs"]
+    assert profile["max"] == values["Glorefs"].max()
+    assert [day for day, _, _ in profile["days"]] == list(full.days)
+    assert chart_rollups.profiles(chart_rollups.day_rollups(values.iloc[:600])) == {}
+
+
+def test_chart_run_after_append_charts_only_the_new_file():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = sqlite3.connect(os.path.join(tmpdir, "test_SystemPerformance.sqlite"))
+        conn.execute("CREATE TABLE overview (id_key INTEGER, field TEXT, value TEXT)")
+        conn.execute("INSERT INTO overview VALUES (0, 'customer', 'ACME')")
+        chart_rollups.append_rows(conn, "mgstat", _mgstat("2026-05-01 00:00", 24 * 12), "day1")
+        chart_rollups.append_rows(conn, "mgstat", _mgstat("2026-05-02 00:00", 24 * 12), "day2")
+
+        metrics = os.path.join(tmpdir, "metrics")
+        os.mkdir(metrics)
+        folder = yaspe._make_chart_dir(metrics, "mgstat")
+        summary = os.path.join(folder, "z_Glorefs_daily_summary.png")
+
+        def chart(increment):
+            cache = ChartCache(metrics)
+            rollups = chart_rollups.RollupStore(conn, increment)
+            yaspe.chart_mgstat(conn, folder, "", True, False, False, chart_cache=cache, rollups=rollups)
+            chart_rollups.mark_charted(conn)
+            cache.save()
+
+        assert chart_rollups.ChartIncrement.pending(conn) is None  # nothing stored yet: a full run
+        chart(None)
+        assert os.path.exists(summary)
+        assert chart_rollups.ChartIncrement.pending(conn) is None  # everything charted
+        base_mtime = os.path.getmtime(os.path.join(folder, "z_Glorefs.png"))
+
+        chart_rollups.append_rows(conn, "mgstat", _mgstat("2026-05-03 00:00", 24 * 12), "day3")
+        increment = chart_rollups.ChartIncrement.pending(conn)
+        assert [name for name, _, _ in increment.loads] == ["day3"]
+        assert list(increment.days) == [pd.Timestamp("2026-05-03")]
+        os.remove(summary)
+
+        chart(increment)
+        assert os.path.exists(os.path.join(folder, "day3", "z_Glorefs.png"))
+        assert os.path.exists(summary)  # redrawn over all three days
+        assert os.path.getmtime(os.path.join(folder, "z_Glorefs.png")) == base_mtime
+        days = conn.execute("SELECT day FROM chart_rollups WHERE source = 'mgstat' ORDER BY day").fetchall()
+        assert [day[:10] for (day,) in days] == ["2026-05-01", "2026-05-02", "2026-05-03"]
+        conn.close()
+
+
+def test_short_data_is_not_rolled_up():
+    conn = sqlite3.connect(":memory:")
+    store = chart_rollups.RollupStore(conn)
+    wide = _values("2026-05-01 00:00", 20 * 60).rename_axis("datetime_parsed").reset_index()
+    assert yaspe._find_day_profiles(wide, "datetime_parsed", ["Glorefs", "PhyRds"], store, "mgstat") == {}
+    assert conn.execute("SELECT count(*) FROM chart_rollups").fetchone()[0] == 0
+
+    wide = _values("2026-05-01 00:00", 2 * 24 * 60).rename_axis("datetime_parsed").reset_index()
+    assert set(yaspe._find_day_profiles(wide, "datetime_parsed", ["Glorefs", "PhyRds"], store, "mgstat")) == {
+        "Glorefs", "PhyRds"}
+    assert conn.execute("SELECT count(*) FROM chart_rollups").fetchone()[0] == 2
+    conn.close()
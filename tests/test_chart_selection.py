@@ -0,0 +1,64 @@
+# tests/test_chart_selection.py
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from chart_selection import ChartSelection
+
+
+def _frame(hours):
+    times = pd.date_range("2026-04-27 00:00", periods=hours * 12, freq="5min")
+    metric = 1000 + 500 * np.sin(np.arange(len(times)) / 20.0)
+    return pd.DataFrame({"datetime": times.strftime("%m/%d/%Y %H:%M:%S"), "datetime_parsed": times, "metric": metric})
+
+
+def test_metrics_match_bare_qualified_and_wildcard_columns():
+    selection = ChartSelection.from_metrics("Glorefs, vmstat:Total CPU, perfmon:*Processor_Time*")
+
+    assert selection.wants_source("mgstat") and selection.wants_source("iostat")
+    assert selection.variants("mgstat", "Glorefs") is None
+    assert selection.variants("vmstat", "Total CPU") is None
+    assert selection.variants("mgstat", "Total CPU") == frozenset()
+    assert selection.columns("perfmon", ["datetime", "ProcessorTotal_Processor_Time", "SystemProcesses"],
+                             keep=("datetime",)) == ["datetime", "ProcessorTotal_Processor_Time"]
+
+
+def test_manifest_sources_columns_and_variants():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "manifest.yml")
+        with open(path, "w") as f:
+            f.write("mgstat:\n  Glorefs: [base, peak60]\n  PhyRds:\nvmstat: [Total CPU, wa]\niostat: all\n")
+        selection = ChartSelection.from_manifest(path)
+
+        assert not selection.wants_source("perfmon")
+        assert selection.variants("mgstat", "Glorefs") == {"base", "peak60"}
+        assert selection.variants("mgstat", "PhyRds") is None
+        assert selection.variants("mgstat", "Gloupds") == frozenset()
+        assert selection.columns("vmstat", ["datetime", "us", "wa"], keep=("datetime",)) == ["datetime", "wa"]
+        assert selection.variants("iostat", "r_await") is None
+
+        merged = selection.merge(ChartSelection.from_metrics("mgstat:Glorefs"))
+        assert merged.variants("mgstat", "Glorefs") is None
+
+        with open(path, "w") as f:
+            f.write("mgstat:\n  Glorefs: [base, peak_60]\n")
+        with pytest.raises(ValueError, match="peak_60"):
+            ChartSelection.from_manifest(path)
+
+
+def test_simple_and_linked_chart_draw_only_selected_variants():
+    import yaspe
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filepath = tmpdir + "/"
+        data = _frame(30)
+        yaspe.simple_chart(data, "Glorefs", "Glorefs", 0, filepath, "", min_max=True, variants=("heatmap",))
+        yaspe.linked_chart(data, "Glorefs", "Glorefs", 0, filepath, "", min_max=True, variants=("day_overlay",))
+
+        assert sorted(os.listdir(tmpdir)) == ["Glorefs_day_overlay.html", "z_Glorefs_heatmap.png"]
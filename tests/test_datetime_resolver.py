@@ -0,0 +1,49 @@
+# tests/test_datetime_resolver.py
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import pytest
+
+from datetime_resolver import detect_format, parse_datetimes, profile_run_date
+
+
+def _strings(start, periods, fmt, freq="s"):
+    return pd.Series(pd.date_range(start, periods=periods, freq=freq).strftime(fmt))
+
+
+def test_formats_are_detected_once_and_parsed_to_whole_seconds():
+    times = pd.date_range("2026-04-27 11:59:58", periods=5, freq="s")
+    for fmt, values in [
+        ("%Y/%m/%d %H:%M:%S", _strings("2026-04-27 11:59:58", 5, "%Y/%m/%d %H:%M:%S")),
+        ("%m/%d/%y %I:%M:%S %p", _strings("2026-04-27 11:59:58", 5, "%m/%d/%y %I:%M:%S %p")),
+        ("%m/%d/%Y %H:%M:%S.%f", pd.Series([f"{t:%m/%d/%Y %H:%M:%S}.347" for t in times])),
+    ]:
+        assert detect_format(values) == fmt
+        assert list(parse_datetimes(values)) == list(times)
+
+
+def test_day_month_order_from_the_data_or_the_profile_run_date():
+    # 27 can only be a day
+    assert detect_format(_strings("2026-04-27", 3, "%d/%m/%Y %H:%M:%S")) == "%d/%m/%Y %H:%M:%S"
+
+    # 01/05 to 02/05 either way round: a two hour run, not a month long one
+    ambiguous = _strings("2026-05-01 23:00", 7200, "%d/%m/%Y %H:%M:%S")
+    assert parse_datetimes(ambiguous).iloc[-1] == pd.Timestamp("2026-05-02 00:59:59")
+
+    # The Profile run date decides when it is known
+    anchor = profile_run_date('Profile run "24hours" started by user "u" at 23:00:00 on Jan 05 2026.')
+    assert anchor == datetime(2026, 1, 5)
+    assert parse_datetimes(ambiguous, anchor).iloc[0] == pd.Timestamp("2026-01-05 23:00")
+    assert profile_run_date(None) is None
+
+
+def test_unknown_layouts_fall_back_to_dateutil_and_bad_values_raise():
+    mixed = pd.Series(["2026-04-27T10:00:00", "April 27 2026 10:00:01"])
+    assert list(parse_datetimes(mixed)) == [pd.Timestamp("2026-04-27 10:00:00"), pd.Timestamp("2026-04-27 10:00:01")]
+
+    with pytest.raises(ValueError):
+        parse_datetimes(pd.Series(["04/27/2026 10:00:00", "not a date"]))
@@ -0,0 +1,37 @@
+# tests/test_device_frames.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from yaspe import _device_frames, _metric_frame
+
+
+def _iostat(devices, periods):
+    times = pd.date_range("2026-05-01 10:00", periods=periods, freq="5s")
+    rows = pd.DataFrame({
+        "datetime": np.repeat(times.strftime("%m/%d/%Y %H:%M:%S"), len(devices)),
+        "datetime_parsed": np.repeat(times, len(devices)),
+        "Device": np.tile(devices, periods),
+    })
+    rng = np.random.default_rng(3)
+    rows["r/s"] = rng.random(len(rows)) * 100
+    rows["w/s"] = rng.random(len(rows)) * 100
+    return rows
+
+
+def test_device_split_and_metric_frames_match_the_melt():
+    df = _iostat(["sda", "sdb", "dm-0"], 50)
+
+    frames = _device_frames(df, "Device", ["dm-0", "sda", "nvme0n1"])
+    assert list(frames) == ["dm-0", "sda"]  # disk list order, unknown devices dropped
+
+    ids = ["datetime", "datetime_parsed", "Device"]
+    melted = frames["sda"].melt(id_vars=ids, var_name="Type", value_name="metric")
+    for column in ("r/s", "w/s"):
+        expected = melted.loc[melted["Type"] == column].reset_index(drop=True)
+        actual = _metric_frame(frames["sda"], column, ids).reset_index(drop=True)
+        pd.testing.assert_frame_equal(actual, expected)
@@ -0,0 +1,48 @@
+# tests/test_linked_chart_png.py
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+import yaspe
+
+
+def _frame(periods=120):
+    times = pd.date_range("2026-04-30 10:00", periods=periods, freq="min")
+    metric = np.linspace(0, 100, periods)
+    return pd.DataFrame({"datetime_parsed": times, "id_key": np.arange(periods), "metric": metric})
+
+
+def test_ref_lines_min_max_with_outliers():
+    lines = yaspe._ref_lines(_frame(), min_max=True, threshold=(80, "80% CPU"))
+    labels = [line[4] for line in lines]
+    assert labels[0].startswith("Abs Min")
+    assert labels[-1] == "80% CPU"
+    # metric exceeds the threshold, so it is drawn red
+    assert lines[-1][1] == "red"
+
+
+def test_linked_chart_png_only_uses_matplotlib(monkeypatch):
+    def _no_kaleido(*args, **kwargs):
+        raise AssertionError("kaleido used for a linked_chart PNG")
+
+    monkeypatch.setattr(yaspe.go.Figure, "write_image", _no_kaleido)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yaspe.linked_chart(_frame(), "Total CPU", "Total CPU - test", 100, tmpdir + "/", "",
+                           min_max=True, threshold=(80, "80% CPU"), write_png=True, write_html=False)
+        yaspe.linked_chart_no_time(_frame(), "r/s", "r/s - test", 0, tmpdir + "/", "",
+                                   write_png=True, write_html=False)
+        files = sorted(os.listdir(tmpdir))
+        with open(os.path.join(tmpdir, "Total CPU.png"), "rb") as f:
+            assert f.read(8) == b"\x89PNG\r\n\x1a\n"
+    assert files == ["Total CPU.png", "r_per_s.png"]
+
+
+def test_linked_chart_png_and_html():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yaspe.linked_chart(_frame(), "Glorefs", "Glorefs - test", 0, tmpdir + "/", "", write_png=True)
+        assert sorted(os.listdir(tmpdir)) == ["Glorefs.html", "Glorefs.png"]
@@ -125,6 +125,38 @@ def test_merge_timeseries_sorted():
     assert merged[0]["timestamp"] < merged[1]["timestamp"]
 
 
+def test_merged_frame_renders_like_its_records():
+    from llm_context import (_resample_mgstat_frame, _resample_vmstat_frame, _merge_frames,
+                             _timeseries_records, _csv_frame, _csv_block, _ordered_columns)
+    mg_df = _make_mg_df(n=40)
+    vm_df = _make_vm_df(n=20)  # vmstat stops half way: outer-join rows without it
+    frame = _merge_frames(_resample_mgstat_frame(mg_df, "1min"), _resample_vmstat_frame(vm_df, "1min"))
+    records = _timeseries_records(frame)
+    assert records == _merge_timeseries(_resample_mgstat(mg_df, "1min"), _resample_vmstat(vm_df, "1min"))
+
+    block = _csv_frame(frame)
+    assert block == _csv_block(records, _ordered_columns(records))
+    lines = block.splitlines()
+    header = lines[1].split(",")
+    first, last = dict(zip(header, lines[2].split(","))), dict(zip(header, lines[-2].split(",")))
+    assert first["r_max"] == "1" and first["Glorefs"] == "10050" and first["us"] == "30.0"
+    assert last["r_max"] == "" and last["us"] == ""  # integers stay integers across the join
+
+
+def test_correlation_tests_on_a_thread_pool_keep_their_order():
+    from llm_context import _run_correlation_tests, _MGSTAT_CORRELATION_TESTS
+    mg_df = _make_mg_df(n=40)
+    mg_df["Rdratio"] = [95.0 - i for i in range(40)]
+    mg_df["PhyRds"] = [50 + i * 5 for i in range(40)]
+    mg_df["WDQsz"] = [i * 200 for i in range(40)]
+    joined = pd.merge_asof(mg_df, _make_vm_df(n=40).assign(wa=15), on="dt", direction="nearest")
+    findings = _run_correlation_tests(joined)
+    assert [f.metric for f in findings] == ["Rdratio / PhyRds (buffer pool pressure)",
+                                            "WDQsz + wa (write daemon strain)"]
+    assert _run_correlation_tests(joined, workers=4) == findings
+    assert _run_correlation_tests(mg_df, _MGSTAT_CORRELATION_TESTS, workers=4) == findings[:1]
+
+
 # ---- Task 2 additions ----
 import sqlite3
 import tempfile
@@ -652,6 +684,16 @@ def test_period_stats_ppgupds_when_present():
     assert result[0]["metrics"]["PPGupds"]["mean"] == pytest.approx(250.0)
 
 
+def test_period_stats_precomputed_keep_metric_order():
+    import performance_analysis as pa
+    mg = _make_mg_df_business_hours()
+    stats = pa._period_stats(pa._with_periods(mg), ["Glorefs", "PhyRds", "PhyWrs", "Gloupds", "Jrnwrts",
+                                                    "Rdratio", "WDQsz"])
+    result = _compute_period_stats(mg, pd.DataFrame(), mg_stats=stats)
+    assert list(result[0]["metrics"]) == ["Glorefs", "Gloupds", "PhyRds", "PhyWrs", "Jrnwrts", "Rdratio", "WDQsz"]
+    assert result == _compute_period_stats(mg, pd.DataFrame())
+
+
 # ---- Key metrics + not_available ----
 from llm_context import _compute_key_metrics, _build_not_available
 
@@ -814,6 +856,19 @@ def test_scrub_redacts_dict_keys():
     assert out == {"[redacted]": {"nested": "on [redacted]"}}
 
 
+def test_scrub_fqdn_before_short_hostname_in_one_pass():
+    out = _scrub(["acmedb01.acme.local up", "ACMEDB01 down", 7.5], ["acmedb01", "acmedb01.acme.local"])
+    assert out == ["[redacted] up", "[redacted] down", 7.5]
+
+
+def test_scrub_text_redacts_and_refuses_survivors():
+    import pytest
+    from llm_context import _scrub_text
+    assert _scrub_text("| Acme Hospital | acmedb011 |", ["Acme Hospital"]) == "| [redacted] | acmedb011 |"
+    with pytest.raises(ValueError):
+        _scrub_text("host redacted", ["redacted"])  # the replacement itself would still match
+
+
 # ---- Schema 2.0 integration ----
 
 def test_build_llm_context_no_customer_even_when_present():
@@ -1035,3 +1090,99 @@ def test_load_iostat_df_ampm_no_warning():
     assert len(df) == 5
     assert df["dt"].iloc[0] == pd.Timestamp("2026-04-30 00:00:00")
     conn.close()
+
+
+def test_run_data_loads_only_the_analysed_columns():
+    from llm_context import _RunData
+    conn = _make_sqlite_with_data()
+    conn.execute("CREATE TABLE iostat (RunDate TEXT, RunTime TEXT, Device TEXT, \"r/s\" REAL, \"rrqm/s\" REAL)")
+    conn.execute("INSERT INTO iostat VALUES ('2024/01/15', '09:00:00', 'sda', 1.0, 2.0)")
+    data = _RunData(conn)
+    assert "Glorefs" in data.mgstat.columns and "dt" in data.mgstat.columns
+    assert "cs" not in data.vmstat.columns and "buff" in data.vmstat.columns
+    assert list(data.iostat.columns) == ["RunDate", "RunTime", "Device", "r/s", "dt"]
+    assert data.role_map == {}
+    conn.close()
+
+
+def test_focus_windows_merge_and_skip_whole_window_ranges():
+    from llm_context import _focus_windows
+    windows = _focus_windows([
+        {"when": "2 breach events; first 2026-03-02 10:00:00 – 2026-03-02 10:05:00 (×3 samples), "
+                 "worst 2026-03-02 10:40:00 – 2026-03-02 10:45:00 (×9 samples)"},
+        {"when": "2026-03-01 00:00:00 – 2026-03-04 23:59:55"},  # the whole capture
+        {"when": "entire window"},
+    ])
+    assert windows == [(pd.Timestamp("2026-03-02 09:30:00"), pd.Timestamp("2026-03-02 11:15:00"))]
+
+
+def test_token_budget_sizes_the_rendered_bundle():
+    import numpy as np
+    from llm_context import _render_markdown
+    conn = sqlite3.connect(":memory:")
+    dts = pd.date_range("2026-03-02", periods=3 * 24 * 360, freq="10s")
+    rng = np.random.default_rng(5)
+    mg = pd.DataFrame({"RunDate": dts.strftime("%Y/%m/%d"), "RunTime": dts.strftime("%H:%M:%S")})
+    for col in ("Glorefs", "PhyRds", "PhyWrs", "Gloupds", "Jrnwrts", "WDQsz", "Rdratio"):
+        mg[col] = rng.random(len(dts)) * 1000
+    mg.to_sql("mgstat", conn, index=False)
+
+    sizes = {}
+    for budget in (9000, 40000):
+        ctx = build_llm_context(conn, {}, token_budget=budget)
+        sizes[budget] = len(_render_markdown(ctx)) / 4
+        assert sizes[budget] <= budget
+        assert ctx["timeseries"]["estimated_tokens"] == pytest.approx(sizes[budget], rel=0.05)
+    assert sizes[9000] < sizes[40000]
+    conn.close()
+
+
+def test_build_llm_context_workers_give_the_same_findings():
+    conn = _make_sqlite_with_data()
+    assert build_llm_context(conn, {}, workers=4)["findings"] == build_llm_context(conn, {})["findings"]
+    conn.close()
+
+
+def test_token_budget_overshoot_is_reported():
+    from llm_context import _render_markdown
+    conn = _make_sqlite_with_data()
+    with pytest.warns(UserWarning, match="over the budget of 300"):
+        ctx = build_llm_context(conn, {}, token_budget=300)
+    assert ctx["timeseries"]["estimated_tokens"] > 300
+    assert ctx["timeseries"]["fixed_tokens"] > 300
+    assert "over the budget of 300" in _render_markdown(ctx)
+    conn.close()
+
+
+def test_anomaly_findings_cover_every_column_and_iostat_role_devices(monkeypatch):
+    import numpy as np
+    import llm_context
+    monkeypatch.setattr(llm_context, "_ANOMALY_CHUNK_ROWS", 1000)  # several chunks per table
+    n = 2880  # 4 hours at 5s
+    times = pd.date_range("2024-01-15 08:00", periods=n, freq="5s")
+    stamps = {"RunDate": times.strftime("%m/%d/%Y"), "RunTime": times.strftime("%H:%M:%S")}
+    rng = np.random.default_rng(1)
+    conn = sqlite3.connect(":memory:")
+    mg = pd.DataFrame(dict(stamps, Glorefs=rng.gamma(20, 1000, n), RouLaS=0.0))
+    mg.loc[2000:2100, "RouLaS"] = 30.0
+    mg.to_sql("mgstat", conn, index=False)
+    vm = pd.DataFrame(dict(stamps, us=rng.normal(30, 2, n), cs=rng.normal(5000, 200, n)))
+    vm.loc[2200:2300, "cs"] += 20000
+    vm.to_sql("vmstat", conn, index=False)
+    devices = []
+    for device in ("sdb", "sda"):
+        io = pd.DataFrame(dict(stamps, Device=device, **{"%util": rng.normal(20, 2, n)}))
+        io.loc[2500:2600, "%util"] = 95.0  # on both; only sdb has an IRIS role
+        devices.append(io)
+    pd.concat(devices).sort_values("RunTime", kind="stable").to_sql("iostat", conn, index=False)
+    conn.execute("CREATE TABLE overview (field TEXT, value TEXT)")
+    conn.execute("INSERT INTO overview VALUES ('iris disk role Database 0', 'sdb')")
+
+    ctx = build_llm_context(conn, {})
+    anomalies = [f for f in ctx["findings"] if f["metric"].endswith("(anomaly)")]
+    assert [f["metric"] for f in anomalies] == ["mgstat RouLaS (anomaly)", "vmstat cs (anomaly)",
+                                                "iostat sdb (Database 0) %util (anomaly)"]
+    assert all(f["severity"] == "Red" for f in anomalies)
+    assert anomalies[1]["when"] == "2024-01-15 11:03:20 – 2024-01-15 11:11:40"
+    assert anomalies[0]["corroborating"] == []  # nothing else changed at the same time
+    conn.close()
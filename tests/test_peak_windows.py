@@ -0,0 +1,80 @@
+# tests/test_peak_windows.py
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+import yaspe
+
+
+def _wide(start, hours, spikes):
+    """One sample a minute; each column is 10 with a 60-minute block of 100 starting at its spike times."""
+    times = pd.date_range(start, periods=hours * 60, freq="min")
+    wide = pd.DataFrame({"datetime": times.strftime("%m/%d/%Y %H:%M:%S"), "datetime_parsed": times})
+    for column, column_spikes in spikes.items():
+        values = np.full(len(times), 10.0)
+        for spike, height in column_spikes:
+            values[(times >= pd.Timestamp(spike)) & (times < pd.Timestamp(spike) + pd.Timedelta(minutes=60))] = height
+        wide[column] = values
+    return wide
+
+
+def test_peak_windows_for_all_columns_in_one_pass():
+    wide = _wide("2026-04-27 00:00", 72, {
+        "Glorefs": [("2026-04-27 03:00", 500), ("2026-04-28 10:00", 200), ("2026-04-29 14:30", 300)],
+        "PhyRds": [("2026-04-28 12:00", 100)],
+    })
+    peaks = yaspe._find_peak_windows(wide, "datetime_parsed", ["datetime", "Glorefs", "PhyRds"])
+
+    assert set(peaks) == {"Glorefs", "PhyRds"}
+    # Whole run: the 03:00 spike wins even though it is outside business hours
+    assert peaks["Glorefs"]["peak60"] == (pd.Timestamp("2026-04-27 02:59"), pd.Timestamp("2026-04-27 03:59"))
+    # Business hours only: the 300 block on the 29th
+    assert peaks["Glorefs"]["bh_peak"] == (pd.Timestamp("2026-04-29 14:29"), pd.Timestamp("2026-04-29 15:29"))
+    assert sorted(peaks["Glorefs"]["bh_days"]) == [pd.Timestamp(f"2026-04-{d}") for d in (27, 28, 29)]
+    assert peaks["Glorefs"]["bh_days"][pd.Timestamp("2026-04-28")][1] == pd.Timestamp("2026-04-28 10:59")
+    assert peaks["PhyRds"]["bh_peak"][1] == pd.Timestamp("2026-04-28 12:59")
+
+
+def test_simple_chart_uses_precomputed_peaks():
+    wide = _wide("2026-04-27 06:00", 12, {"Glorefs": [("2026-04-27 09:00", 500)]})
+    data = wide.melt(id_vars=["datetime", "datetime_parsed"], var_name="Type", value_name="metric")
+    peaks = yaspe._find_peak_windows(wide, "datetime_parsed", ["Glorefs"])
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        found = yaspe.simple_chart(data, "Glorefs", "Glorefs", 0, tmpdir + "/", "", min_max=True)
+        looked_up = yaspe.simple_chart(data, "Glorefs", "Glorefs", 0, tmpdir + "/", "", min_max=True,
+                                       peaks=peaks["Glorefs"])
+
+        assert found == looked_up == peaks["Glorefs"]["peak60"]
+        assert os.path.isfile(os.path.join(tmpdir, "z_Glorefs_peak60.png"))
+
+
+def test_per_day_bh_peaks_are_one_small_multiples_png():
+    wide = _wide("2026-04-27 00:00", 72, {"Glorefs": [("2026-04-27 10:00", 200), ("2026-04-28 11:00", 300)]})
+    data = wide.melt(id_vars=["datetime", "datetime_parsed"], var_name="Type", value_name="metric")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yaspe.simple_chart(data, "Glorefs", "Glorefs", 0, tmpdir + "/", "", min_max=True, variants=("bh_days",))
+
+        assert os.listdir(tmpdir) == ["z_Glorefs_bh_days.png"]
+
+
+def test_day_profiles_for_all_columns_in_one_pass():
+    wide = _wide("2026-04-27 00:00", 48, {"Glorefs": [("2026-04-28 14:00", 300)], "PhyRds": []})
+    profiles = yaspe._find_day_profiles(wide, "datetime_parsed", ["datetime", "Glorefs", "PhyRds"])
+
+    assert set(profiles) == {"Glorefs", "PhyRds"}
+    glorefs = profiles["Glorefs"]
+    assert list(glorefs["daily_p99"].round(6)) == [10.0, 300.0]
+    assert glorefs["hourly_p99"].loc[(pd.Timestamp("2026-04-28"), 14)] == 300
+    assert [(start, end) for _, start, end in glorefs["days"]] == [(0, 1440), (1440, 2880)]
+    assert glorefs["x_ref"][1440 + 61] == pd.Timestamp("2000-01-01 01:01")
+    assert glorefs["when"][0] == "Mon 27-Apr 00:00:00"
+    assert len(glorefs["smooth"]) == len(wide)
+    # Up to 25 hours there are no long-period charts to feed
+    assert yaspe._find_day_profiles(wide.iloc[:1440], "datetime_parsed", ["Glorefs"]) == {}
@@ -4,19 +4,21 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import sqlite3
 import tempfile
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
 from performance_analysis import IRIS_PERIODS, METRIC_THRESHOLDS, Finding
 from performance_analysis import _get_collection_meta, _get_system_facts
-from performance_analysis import _label_period, _compute_baselines, _find_breaches
+from performance_analysis import _label_period, _label_periods, _period_stats, _compute_baselines, _find_breaches, _find_breach_levels
 from performance_analysis import _analyse_vmstat
 from performance_analysis import _analyse_mgstat
 from performance_analysis import (
     _test_user_stall, _test_buffer_pressure, _test_write_daemon_strain,
     _test_memory_danger, _test_contention_vs_throughput,
-    _test_kernel_overhead, _test_batch_window,
+    _test_kernel_overhead, _test_batch_window, CorrelationFrame,
 )
+from performance_analysis import AnomalyDetector, _anomaly_findings
 
 def test_iris_periods_count():
     assert len(IRIS_PERIODS) == 9
@@ -146,6 +148,14 @@ def test_label_period_outside_all():
     assert _label_period("00:05") is None
 
 
+def test_label_periods_matches_label_period_every_minute():
+    dts = pd.Series(pd.date_range("2026-01-01 00:00:30", periods=24 * 60, freq="min"))
+    labels = _label_periods(dts)
+    assert list(labels.cat.categories) == [p["name"] for p in IRIS_PERIODS]
+    expected = [_label_period(ts.strftime("%H:%M")) for ts in dts]
+    assert [None if pd.isna(label) else label for label in labels] == expected
+
+
 def _make_mgstat_df():
     """Three rows in 09:00–11:30 period on same day."""
     return pd.DataFrame({
@@ -179,6 +189,21 @@ def test_compute_baselines_values():
     assert g["max"] == 1200.0
 
 
+def test_period_stats_match_per_group_numpy():
+    import numpy as np
+    dts = pd.date_range("2026-01-05 08:00", periods=600, freq="30s")
+    df = pd.DataFrame({"dt": dts, "Glorefs": np.arange(600.0) % 37, "PhyRds": ["x"] + [1.0] * 599})
+    stats = _period_stats(df, ["Glorefs", "PhyRds", "Missing"])
+    assert list(stats.columns.get_level_values(0).unique()) == ["Glorefs", "PhyRds"]
+    for (weekday, period), row in stats.iterrows():
+        assert weekday == "Monday"
+        vals = df.loc[_label_periods(df["dt"]) == period, "Glorefs"]
+        assert row[("Glorefs", "n_samples")] == len(vals)
+        assert abs(row[("Glorefs", "p95")] - np.percentile(vals, 95)) < 1e-9
+        assert abs(row[("Glorefs", "sigma")] - vals.std(ddof=1)) < 1e-9
+    assert stats[("PhyRds", "n_samples")].sum() == _label_periods(df["dt"]).notna().sum() - 1  # "x" ignored
+
+
 # Task 4: _find_breaches
 def test_find_breaches_no_breach():
     vals = pd.Series([5.0, 6.0, 4.0, 3.0])
@@ -217,6 +242,17 @@ def test_find_breaches_returns_timestamps():
     assert str(end)   == "2026-01-01 09:00:10"
 
 
+def test_find_breach_levels_alert_and_warn_in_one_call():
+    vals = pd.Series([25.0, 25.0, 12.0, 12.0, 4.0, 30.0, 12.0, 25.0, 25.0, 25.0])
+    # Positions, not index labels, pick the timestamps (e.g. a group sliced out of a frame)
+    dts  = pd.Series(pd.date_range("2026-01-01 09:00:00", periods=10, freq="5s"), index=range(100, 110))
+    red, warn = _find_breach_levels(vals, dts, [(20.0, 2), (10.0, 3)])
+    assert red == [(dts.iloc[0], dts.iloc[1], 2), (dts.iloc[7], dts.iloc[9], 3)]
+    assert warn == [(dts.iloc[0], dts.iloc[3], 4), (dts.iloc[5], dts.iloc[9], 5)]
+    assert _find_breaches(vals, dts, 20.0, 2) == red
+    assert _find_breach_levels(pd.Series([], dtype=float), dts.iloc[:0], [(1.0, 1), (2.0, 1)]) == [[], []]
+
+
 # Task 5: _analyse_vmstat
 
 def _make_vmstat_df(wa_vals, r_vals=None, si_vals=None, so_vals=None, us_vals=None, sy_vals=None):
@@ -459,3 +495,83 @@ def test_memory_danger_detects_free_declining_with_swap():
     result = _test_memory_danger(df)
     assert result is not None
     assert result.severity == "Red"
+
+
+def test_correlation_frame_shared_by_tests_matches_dataframe_calls():
+    # Shuffled rows with a non-numeric value: the frame sorts and converts once for every test
+    n = 20
+    df = _make_joined_df(
+        Glorefs=[1000.0] * 5 + [20.0] * 5 + [1000.0] * 10,
+        wa=[2.0] * 5 + [25.0] * 5 + ["-"] + [2.0] * 9,
+        free=[10000.0 - i * 400 for i in range(n)],
+        si=[0.0] * 10 + [1.0] * 10,
+    ).sample(frac=1, random_state=1)
+    frame = CorrelationFrame(df)
+    assert frame.dt.is_monotonic_increasing
+    assert frame.business.all() and not frame.overnight.any()
+    for test_fn in (_test_user_stall, _test_buffer_pressure, _test_write_daemon_strain, _test_memory_danger,
+                    _test_contention_vs_throughput, _test_kernel_overhead, _test_batch_window):
+        expected = test_fn(df.sort_values("dt"))
+        assert test_fn(frame) == expected
+    assert _test_user_stall(frame) is not None and _test_memory_danger(frame) is not None
+
+
+# Task 8: anomaly detection
+
+def _anomaly_df(n=2 * 17280):
+    """Two days at 5s: noisy Glorefs, RouLaS at zero, WIJwri around 100."""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "dt": pd.date_range("2026-03-02", periods=n, freq="5s"),
+        "Glorefs": rng.gamma(20, 1000, n),
+        "RouLaS": np.zeros(n),
+        "WIJwri": rng.normal(100, 10, n),
+    })
+
+
+def _anomalies(df, chunk_rows):
+    detector = AnomalyDetector("mgstat")
+    for i in range(0, len(df), chunk_rows):
+        detector.feed(df.iloc[i:i + chunk_rows])
+    return _anomaly_findings([detector])
+
+
+def test_anomaly_detector_flags_shifts_in_any_column_not_single_spikes():
+    df = _anomaly_df()
+    df.loc[20000:20300, "RouLaS"] = 40.0     # non-zero for 25 minutes
+    df.loc[30000:30100, "WIJwri"] += 200     # level shift
+    df.loc[25000, "Glorefs"] *= 50           # one sample: not an event
+    findings = _anomalies(df, len(df))
+    assert [(f.metric, f.severity) for f in findings] == [("mgstat RouLaS (anomaly)", "Red"),
+                                                          ("mgstat WIJwri (anomaly)", "Red")]
+    assert "for 301 consecutive samples" in findings[0].observation
+    assert findings[1].when == "2026-03-03 17:40:00 – 2026-03-03 17:48:20"
+    assert "above its trailing-hour norm" in findings[1].observation
+
+
+def test_anomaly_detector_same_findings_whatever_the_chunk_size():
+    df = _anomaly_df()
+    df.loc[20050:20300, "RouLaS"] = 40.0
+    df.loc[30000:30100, "WIJwri"] -= 60
+    expected = _anomalies(df, len(df))
+    assert expected and "below its trailing-hour norm" in expected[-1].observation
+    for chunk_rows in (61, 997, 5000):
+        assert _anomalies(df, chunk_rows) == expected
+
+
+def test_anomaly_detector_discounts_what_happens_every_day():
+    n = 3 * 17280
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({"dt": pd.date_range("2026-03-02", periods=n, freq="5s"),
+                       "Gloupds": rng.gamma(20, 50, n), "PhyWrs": rng.normal(200, 10, n)})
+    for day, minutes in ((0, 0), (1, -2), (2, 3)):   # the morning ramp, a few minutes early or late
+        start = pd.Timestamp("2026-03-02 08:00") + pd.Timedelta(days=day, minutes=minutes)
+        df.loc[(df["dt"] >= start) & (df["dt"] < start + pd.Timedelta(hours=9)), "Gloupds"] *= 10
+    df.loc[(df["dt"] >= "2026-03-04 14:00") & (df["dt"] < "2026-03-04 14:20"), "PhyWrs"] += 300
+    findings = _anomalies(df, len(df))
+    assert [(f.metric, f.severity) for f in findings] == [("mgstat PhyWrs (anomaly)", "Red")]
+    assert "at this time on the other days" in findings[0].observation
+    # With one day there is nothing to compare with: the ramp is all the trailing hour sees
+    findings = _anomalies(df[df["dt"] < "2026-03-03"], n)
+    assert [f.metric for f in findings] == ["mgstat Gloupds (anomaly)"]
+    assert findings[0].when.startswith("2026-03-02 08:0")
@@ -0,0 +1,143 @@
+# tests/test_yaspe_html.py
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import yaspe_html
+import yaspe_combined_overlay as yco
+
+
+def test_scatter_trace_svg_below_threshold():
+    trace = yaspe_html.scatter_trace(10, x=[1, 2], y=[3, 4], mode="lines")
+    assert isinstance(trace, go.Scatter)
+
+
+def test_scatter_trace_webgl_above_threshold():
+    n = yaspe_html.WEBGL_POINT_THRESHOLD + 1
+    trace = yaspe_html.scatter_trace(n, x=[1, 2], y=[3, 4], mode="lines")
+    assert isinstance(trace, go.Scattergl)
+
+
+def test_stacked_area_svg_uses_stackgroup():
+    kwargs, below = yaspe_html.stacked_area_kwargs(
+        pd.Series([1.0, 2.0]), None, "cpu", webgl=False,
+        hovertemplate="%{x}<br>us: %{y:.1f}",
+    )
+    assert kwargs["stackgroup"] == "cpu"
+    assert kwargs["hovertemplate"] == "%{x}<br>us: %{y:.1f}"
+    assert below is None
+
+
+def test_stacked_area_webgl_stacks_and_keeps_own_value_for_hover():
+    first, below = yaspe_html.stacked_area_kwargs(
+        pd.Series([1.0, 2.0]), None, "cpu", webgl=True)
+    second, below = yaspe_html.stacked_area_kwargs(
+        pd.Series([10.0, np.nan]), below, "cpu", webgl=True,
+        hovertemplate="us: %{y:.1f}",
+    )
+    assert "stackgroup" not in first
+    assert first["fill"] == "tozeroy"
+    assert second["fill"] == "tonexty"
+    assert list(second["y"]) == [11.0, 2.0]
+    assert second["customdata"][0] == 10.0
+    assert second["hovertemplate"] == "us: %{customdata:.1f}"
+
+
+def test_combined_chart_switches_to_webgl_for_large_series(monkeypatch):
+    monkeypatch.setattr(yaspe_html, "WEBGL_POINT_THRESHOLD", 3)
+    times = pd.date_range("2026-04-30 10:00", periods=5, freq="min").astype(str)
+    mg = pd.DataFrame({"datetime": times, "Glorefs": [1.0, 2.0, 3.0, 4.0, 5.0]})
+    vm = pd.DataFrame({"datetime": times, "us": [10.0] * 5, "sy": [3.0] * 5,
+                       "wa": [2.0] * 5, "id": [85.0] * 5})
+    vm["Total CPU"] = 100 - vm["id"]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        out_path = os.path.join(tmpdir, "combined_overlay.html")
+        yco._build_combined_chart(mg, vm, "datetime", "datetime", out_path)
+        with open(out_path) as f:
+            html = f.read()
+    assert '"type":"scattergl"' in html
+    assert '"stackgroup"' not in html
+
+
+def _metric_frame(periods=5):
+    times = pd.date_range("2026-04-30 10:00", periods=periods, freq="min")
+    return pd.DataFrame({"datetime_parsed": times, "metric": np.arange(periods, dtype="float64")})
+
+
+def test_dashboard_writes_index_and_lazy_data_files():
+    import yaspe
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        bundle = yaspe_html.write_plotly_bundle(tmpdir)
+        source_dir = os.path.join(tmpdir, "mgstat") + "/"
+        os.mkdir(source_dir)
+        board = yaspe_html.Dashboard(source_dir, "mgstat", "mgstat - test", bundle)
+        for column in ("Glorefs", "PhyRds"):
+            yaspe.linked_chart(_metric_frame(), column, f"{column} - test", 0, source_dir, "", dashboard=board)
+        index_path = board.write()
+
+        assert sorted(os.listdir(source_dir)) == ["mgstat.html", "mgstat_data"]
+        assert sorted(os.listdir(os.path.join(source_dir, "mgstat_data"))) == ["Glorefs.js", "PhyRds.js"]
+        with open(index_path) as f:
+            index = f.read()
+        with open(os.path.join(source_dir, "mgstat_data", "Glorefs.js")) as f:
+            data = f.read()
+
+    assert '<script src="../plotly.min.js">' in index
+    assert 'data-src="mgstat_data/Glorefs.js"' in index
+    assert "IntersectionObserver" in index
+    assert "cdn.plot.ly" not in index
+    # The template is written once into the index, not into every data file
+    assert '"template"' not in data
+    assert data.startswith('yaspeDashboard.load("chart-0", ')
+
+
+def test_dashboard_without_charts_writes_nothing():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        board = yaspe_html.Dashboard(tmpdir, "vmstat", "vmstat", os.path.join(tmpdir, "plotly.min.js"))
+        assert board.write() is None
+        assert os.listdir(tmpdir) == []
+
+
+def test_time_kwargs_evenly_spaced_uses_x0_dx():
+    times = pd.Series(pd.date_range("2026-04-30 10:00", periods=4, freq="5s"))
+    kwargs = yaspe_html.time_kwargs(times)
+    assert set(kwargs) == {"x0", "dx"}
+    assert kwargs["x0"] == pd.Timestamp("2026-04-30 10:00").value / 1e6
+    assert kwargs["dx"] == 5000
+
+
+def test_time_kwargs_gap_uses_epoch_ms():
+    times = pd.Series(pd.to_datetime(["2026-04-30 10:00:00", "2026-04-30 10:00:05", "2026-04-30 10:01:00"]))
+    kwargs = yaspe_html.time_kwargs(times)
+    assert list(kwargs["x"]) == list(pd.DatetimeIndex(times).asi8 / 1e6)
+
+
+def test_compact_values_float32_only_when_lossless_for_display():
+    assert yaspe_html.compact_values([1.0, 2.5, 3_000_000.0]).dtype == np.float32
+    assert yaspe_html.compact_values([0.1234, np.nan]).dtype == np.float32
+    # float32 cannot hold 50,000,001 exactly
+    assert yaspe_html.compact_values([50_000_001.0]).dtype == np.float64
+
+
+def test_linked_chart_html_encodes_data_once():
+    import yaspe
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yaspe.linked_chart(_metric_frame(), "Glorefs", "Glorefs - test", 0, tmpdir + "/", "")
+        with open(os.path.join(tmpdir, "Glorefs.html")) as f:
+            html = f.read()
+    # evenly spaced samples: no time array, no ISO datetime strings
+    assert '"x0":' in html and '"dx":60000' in html
+    assert "2026-04-30T10:00:00" not in html
+    assert '"dtype":"f4"' in html
+    # the overview trace carries no data of its own
+    assert html.count('"bdata"') == 1
+    assert '"yaspe_data_from":0' in html
+    assert "yaspeSharedData" in html
@@ -0,0 +1,35 @@
+# tests/test_yaspe_png.py
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+
+import yaspe_png
+
+
+def test_single_axes_figure_is_reused_with_default_layout():
+    with tempfile.TemporaryDirectory() as tmpdir, mpl.rc_context():
+        fig, ax = yaspe_png.figure()
+        ax.plot(range(1000), range(1000))
+        fig.subplots_adjust(bottom=0.3)
+        yaspe_png.save(fig, os.path.join(tmpdir, "a.png"))
+
+        plt.style.use("ggplot")  # another module changing the style in between
+        again, ax = yaspe_png.figure()
+
+        assert again is fig and again.axes == [ax]
+        assert fig.subplotpars.bottom == mpl.rcParams["figure.subplot.bottom"]
+        assert mpl.rcParams["axes.facecolor"] == "white"
+        assert mpl.rcParams["agg.path.chunksize"] == yaspe_png.AGG_RC["agg.path.chunksize"]
+
+        grid, axes = yaspe_png.figure(figsize=(6, 3), nrows=1, ncols=2, squeeze=False)
+        assert grid is not fig and axes.shape == (1, 2)
+        yaspe_png.save(grid, os.path.join(tmpdir, "b.png"), tight=False)
+
+        assert sorted(os.listdir(tmpdir)) == ["a.png", "b.png"]
+        with open(os.path.join(tmpdir, "b.png"), "rb") as f:
+            assert f.read(8) == b"\x89PNG\r\n\x1a\n"
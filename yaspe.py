@@ -12,8 +12,6 @@ import os
 import yaml
 
 from datetime import datetime
-from dateutil.parser import parse
-from functools import lru_cache
 
 import sqlite3
 import sys
@@ -24,6 +22,7 @@ mpl.use("Agg")
 import matplotlib.pyplot as plt
 import matplotlib.dates as plt_dates
 
+import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
@@ -35,21 +34,19 @@ from extract_mgstat import extract_mgstat
 import system_review
 import yaspe_compare_overlay
 import yaspe_combined_overlay
+import yaspe_html
+import yaspe_png
+from chart_cache import ChartCache
+import chart_progress
+import chart_rollups
+import baseline_store
+from chart_selection import ChartSelection
+from datetime_resolver import parse_datetimes, profile_run_date
 
 # Suppress FutureWarning messages
 warnings.simplefilter(action="ignore", category=FutureWarning)
 
 
-# Define a function to infer the date format
-@lru_cache(maxsize=128)
-def guess_datetime_format(datetime_string):
-    try:
-        dt = parse(datetime_string)
-        return dt.strftime("%m/%d/%Y %H:%M:%S")
-    except ValueError:
-        return "Unable to determine datetime format."
-
-
 def create_connection(path):
     connection = None
     try:
@@ -174,8 +171,8 @@ def create_mgstat(
     # Add each section to the database
 
     if not mgstat_df.empty:
-        mgstat_df.to_sql("mgstat", connection, if_exists="append", index=True, index_label="id_key")
-        connection.commit()
+        chart_rollups.append_rows(connection, "mgstat", mgstat_df, html_filename)
+        baseline_store.BaselineStore(connection).update()
 
         if csv_out:
             mgstat_output_csv = f"{output_filepath_prefix}mgstat.csv"
@@ -230,8 +227,8 @@ def create_sections(
     # Add each section to the database
     if not mgstat_df.empty:
         align_table_columns(connection, "mgstat", mgstat_df)
-        mgstat_df.to_sql("mgstat", connection, if_exists="append", index=True, index_label="id_key")
-        connection.commit()
+        chart_rollups.append_rows(connection, "mgstat", mgstat_df, html_filename)
+        baseline_store.BaselineStore(connection).update()
 
         if csv_out:
             mgstat_output_csv = f"{output_filepath_prefix}mgstat.csv"
@@ -248,8 +245,7 @@ def create_sections(
 
     if not vmstat_df.empty:
         align_table_columns(connection, "vmstat", vmstat_df)
-        vmstat_df.to_sql("vmstat", connection, if_exists="append", index=True, index_label="id_key")
-        connection.commit()
+        chart_rollups.append_rows(connection, "vmstat", vmstat_df, html_filename)
 
         if csv_out:
             vmstat_output_csv = f"{output_filepath_prefix}vmstat.csv"
@@ -266,8 +262,7 @@ def create_sections(
 
     if not perfmon_df.empty:
         align_table_columns(connection, "perfmon", perfmon_df)
-        perfmon_df.to_sql("perfmon", connection, if_exists="append", index=True, index_label="id_key")
-        connection.commit()
+        chart_rollups.append_rows(connection, "perfmon", perfmon_df, html_filename)
 
         if csv_out:
             perfmon_output_csv = f"{output_filepath_prefix}perfmon.csv"
@@ -285,8 +280,7 @@ def create_sections(
     if not iostat_df.empty:
         # id_key is used when there is no time
         align_table_columns(connection, "iostat", iostat_df)
-        iostat_df.to_sql("iostat", connection, if_exists="append", index=True, index_label="id_key")
-        connection.commit()
+        chart_rollups.append_rows(connection, "iostat", iostat_df, html_filename)
 
         if csv_out:
             iostat_output_csv = f"{output_filepath_prefix}iostat.csv"
@@ -304,8 +298,7 @@ def create_sections(
     if not nfsiostat_df.empty:
         # id_key is used when there is no time
         align_table_columns(connection, "nfsiostat", nfsiostat_df)
-        nfsiostat_df.to_sql("nfsiostat", connection, if_exists="append", index=True, index_label="id_key")
-        connection.commit()
+        chart_rollups.append_rows(connection, "nfsiostat", nfsiostat_df, html_filename)
 
         if csv_out:
             nfsiostat_output_csv = f"{output_filepath_prefix}nfsiostat.csv"
@@ -322,8 +315,7 @@ def create_sections(
 
     if not aix_sar_d_df.empty:
         align_table_columns(connection, "aix_sar_d", aix_sar_d_df)
-        aix_sar_d_df.to_sql("aix_sar_d", connection, if_exists="append", index=True, index_label="id_key")
-        connection.commit()
+        chart_rollups.append_rows(connection, "aix_sar_d", aix_sar_d_df, html_filename)
 
         if csv_out:
             aix_sar_d_output_csv = f"{output_filepath_prefix}aix_sar_d.csv"
@@ -340,8 +332,7 @@ def create_sections(
 
     if not free_df.empty:
         align_table_columns(connection, "free_memory", free_df)
-        free_df.to_sql("free_memory", connection, if_exists="append", index=True, index_label="id_key")
-        connection.commit()
+        chart_rollups.append_rows(connection, "free_memory", free_df, html_filename)
 
         if csv_out:
             free_output_csv = f"{output_filepath_prefix}free.csv"
@@ -425,75 +416,117 @@ def get_chart_title_base(connection):
     return f"{customer} ({hostname})"
 
 
-def _find_peak_60_window(png_data, datetime_column):
-    """Find the peak 60-minute window for the data. Returns (peak_start_time, peak_end_time) or (None, None)."""
-    from datetime import timedelta
+def get_profile_run_date(connection):
+    """Date of the "Profile run" line, the anchor for resolving day/month order. None if not recorded."""
+    row = execute_single_read_query(connection, "SELECT * FROM overview WHERE field = 'profile run';")
+    return profile_run_date(row[2]) if row else None
 
-    if len(png_data) < 2:
-        return None, None
 
-    # Sort data by datetime to ensure proper rolling window calculation
-    sorted_data = png_data.sort_values(by=datetime_column).copy()
-
-    # Set the datetime column as index for rolling operations
-    sorted_data = sorted_data.set_index(datetime_column)
+def _peak_min_periods(index):
+    """Samples a 60-minute window needs before it can be the peak.
 
-    # Compute min_periods from the actual sampling interval so that a window
-    # must contain at least 50 minutes of data before it can be considered the peak.
-    # This prevents a short early spike (e.g. 15 min of data) from beating a genuine
-    # sustained 60-minute period later in the day.
-    time_diffs = sorted_data.index.to_series().diff().dropna()
+    Taken from the actual sampling interval so that a window must contain at
+    least 50 minutes of data. This prevents a short early spike (e.g. 15 min of
+    data) from beating a genuine sustained 60-minute period later in the day.
+    """
+    time_diffs = index.to_series().diff().dropna()
     if len(time_diffs) > 0:
         median_interval_secs = time_diffs.median().total_seconds()
-        min_periods = max(10, int(50 * 60 / median_interval_secs))
-    else:
-        min_periods = 30
-    rolling_mean = sorted_data["metric"].rolling(window="60min", min_periods=min_periods).mean()
+        if median_interval_secs > 0:
+            return max(10, int(50 * 60 / median_interval_secs))
+    return 30
 
-    # Find the end time of the peak 60-minute window
-    peak_end_time = rolling_mean.idxmax()
-    peak_start_time = peak_end_time - timedelta(minutes=60)
 
+def _peak_ends(rolling_mean, groups=None):
+    """End time of the highest rolling mean per column (per group and column when grouped).
+    Returns (ends, valid); valid is False where a column has no complete window."""
+    filled = rolling_mean.fillna(-np.inf)
+    valid = rolling_mean.notna()
+    if groups is None:
+        return filled.idxmax(), valid.any()
+    return filled.groupby(groups).idxmax(), valid.groupby(groups).any()
+
+
+def _clamp_window(peak_end_time, min_data_time, max_data_time):
+    """The 60 minutes ending at peak_end_time, shifted to lie within the data."""
+    hour = pd.Timedelta(minutes=60)
+    peak_start_time = peak_end_time - hour
+    if peak_start_time < min_data_time:
+        return min_data_time, min(min_data_time + hour, max_data_time)
+    if peak_end_time > max_data_time:
+        return max(max_data_time - hour, min_data_time), max_data_time
     return peak_start_time, peak_end_time
 
 
+def _find_peak_windows(wide, datetime_column, columns, bh_start=8, bh_end=18):
+    """Peak 60-minute windows for every column of a wide frame (one row per sample) in one pass.
+
+    Returns {column: {"peak60": (start, end), "bh_peak": (start, end), "bh_days": {day: (start, end)}}}:
+    the peak 60 minutes over the whole run (not clamped, so it can be passed on as the Glorefs window),
+    the peak 60 minutes within business hours, and the business hours peak of each calendar day.
+    Windows are (None, None) where there is not enough data. The time-based rolling mean is
+    computed once for all columns; business hours of consecutive days are more than 60 minutes
+    apart, so the per-day peaks come from the same rolling mean grouped by day.
+    """
+    values = wide.set_index(datetime_column)[columns].select_dtypes("number").sort_index()
+    peaks = {column: {"peak60": (None, None), "bh_peak": (None, None), "bh_days": {}} for column in values.columns}
+    if len(values) < 2 or values.shape[1] == 0:
+        return peaks
+
+    rolling_mean = values.rolling(window="60min", min_periods=_peak_min_periods(values.index)).mean()
+    ends, valid = _peak_ends(rolling_mean)
+    for column in values.columns[valid.values]:
+        peaks[column]["peak60"] = (ends[column] - pd.Timedelta(minutes=60), ends[column])
+
+    bh_values = values.between_time(f"{bh_start:02d}:00", f"{bh_end:02d}:00")
+    if len(bh_values) < 10:
+        return peaks
+    bh_rolling = bh_values.rolling(window="60min", min_periods=_peak_min_periods(bh_values.index)).mean()
+
+    min_data_time, max_data_time = values.index.min(), values.index.max()
+    ends, valid = _peak_ends(bh_rolling)
+    for column in values.columns[valid.values]:
+        peaks[column]["bh_peak"] = _clamp_window(ends[column], min_data_time, max_data_time)
+
+    # Per day: at least 10 samples in the day and 10 in its business hours
+    day_of_sample = values.index.normalize()
+    day_rows = values.groupby(day_of_sample).size()
+    day_first = values.index.to_series().groupby(day_of_sample).min()
+    day_last = values.index.to_series().groupby(day_of_sample).max()
+    bh_day = bh_rolling.index.normalize()
+    bh_day_rows = bh_rolling.groupby(bh_day).size()
+    day_ends, day_valid = _peak_ends(bh_rolling, bh_day)
+    for day in day_ends.index:
+        if day_rows[day] < 10 or bh_day_rows[day] < 10:
+            continue
+        for column in values.columns[day_valid.loc[day].values]:
+            peaks[column]["bh_days"][day] = _clamp_window(day_ends.at[day, column], day_first[day], day_last[day])
+
+    return peaks
+
+
 def _ordinal(n):
     suffix = "th" if 11 <= n % 100 <= 13 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
     return f"{n}{suffix}"
 
 
+@chart_progress.timed("peak60")
 def _create_peak_60_chart(
-    png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column, line_chart=True
+    png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column, peak_window,
+    line_chart=True,
 ):
-    """Create a chart showing only the peak 60 minutes for the column. Returns (peak_start_time, peak_end_time)."""
-    from datetime import timedelta
-
-    # Find the peak window
-    peak_start_time, peak_end_time = _find_peak_60_window(png_data, datetime_column)
+    """Create a chart showing only the peak 60 minutes for the column (peak_window from _find_peak_windows).
+    Returns (peak_start_time, peak_end_time)."""
+    peak_start_time, peak_end_time = peak_window
 
     if peak_start_time is None:
         return None, None
 
     # Sort and filter data to peak window
-    sorted_data = png_data.sort_values(by=datetime_column).copy()
-    sorted_data = sorted_data.set_index(datetime_column)
-
-    # Get the actual data boundaries
-    min_data_time = sorted_data.index.min()
-    max_data_time = sorted_data.index.max()
+    sorted_data = png_data.sort_values(by=datetime_column).set_index(datetime_column)
 
     # Adjust filter range to actual data boundaries while maintaining 60-minute window
-    # If peak_start_time is before data starts, shift the window forward
-    if peak_start_time < min_data_time:
-        chart_start_time = min_data_time
-        chart_end_time = min(min_data_time + timedelta(minutes=60), max_data_time)
-    # If peak_end_time is after data ends, shift the window backward
-    elif peak_end_time > max_data_time:
-        chart_end_time = max_data_time
-        chart_start_time = max(max_data_time - timedelta(minutes=60), min_data_time)
-    else:
-        chart_start_time = peak_start_time
-        chart_end_time = peak_end_time
+    chart_start_time, chart_end_time = _clamp_window(peak_end_time, sorted_data.index.min(), sorted_data.index.max())
 
     # Filter data to the adjusted peak window
     peak_data = sorted_data.loc[chart_start_time:chart_end_time].copy()
@@ -506,12 +539,10 @@ def _create_peak_60_chart(
         return None, None
 
     colormap_name = "Set1"
-    plt.style.use("seaborn-v0_8-whitegrid")
-
     palette = plt.get_cmap(colormap_name)
     color = palette(1)
 
-    fig, ax = plt.subplots(figsize=(16, 6))
+    fig, ax = yaspe_png.figure()
 
     # Choose plot style based on line_chart option
     if line_chart:
@@ -577,7 +608,7 @@ def _create_peak_60_chart(
 
     ax.set_ylabel(column_name, fontsize=14)
     ax.tick_params(labelsize=14)
-    plt.subplots_adjust(bottom=0.15)
+    fig.subplots_adjust(bottom=0.15)
     ax.set_ylim(bottom=0)
     if max_y != 0:
         ax.set_ylim(top=max_y)
@@ -601,68 +632,35 @@ def _create_peak_60_chart(
     plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
 
     output_name = column_name.replace("/", "_")
-    plt.tight_layout()
-    plt.savefig(f"{filepath}{output_prefix}{file_prefix}z_{output_name}_peak60.png", format="png", dpi=150, bbox_inches="tight")
-    plt.close("all")
+    fig.tight_layout()
+    yaspe_png.save(fig, f"{filepath}{output_prefix}{file_prefix}z_{output_name}_peak60.png")
 
     return peak_start_time, peak_end_time
 
 
+@chart_progress.timed("bh_peak")
 def _create_business_hours_peak_chart(
-    png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column, line_chart=True,
-    bh_start=8, bh_end=18
+    png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column, peak_window,
+    line_chart=True,
 ):
-    """Create a peak 60-min chart restricted to business hours (default 08:00-18:00).
+    """Create a peak 60-min chart restricted to business hours (peak_window from _find_peak_windows, bh_peak).
     Returns (peak_start_time, peak_end_time) or (None, None)."""
-    from datetime import timedelta
-
-    sorted_data = png_data.sort_values(by=datetime_column).copy()
-    sorted_data = sorted_data.set_index(datetime_column)
+    peak_start_time, peak_end_time = peak_window
 
-    # Filter to business hours only for peak detection
-    bh_data = sorted_data.between_time(f"{bh_start:02d}:00", f"{bh_end:02d}:00")
-
-    if len(bh_data) < 10:
-        return None, None
-
-    # Compute min_periods from actual sampling interval
-    time_diffs = bh_data.index.to_series().diff().dropna()
-    if len(time_diffs) > 0:
-        median_interval_secs = time_diffs.median().total_seconds()
-        min_periods = max(10, int(50 * 60 / median_interval_secs)) if median_interval_secs > 0 else 30
-    else:
-        min_periods = 30
-
-    rolling_mean = bh_data["metric"].rolling(window="60min", min_periods=min_periods).mean()
-
-    if rolling_mean.isna().all():
+    if peak_start_time is None:
         return None, None
 
-    peak_end_time = rolling_mean.idxmax()
-    peak_start_time = peak_end_time - timedelta(minutes=60)
-
-    # Clamp to actual data boundaries
-    min_data_time = sorted_data.index.min()
-    max_data_time = sorted_data.index.max()
-    if peak_start_time < min_data_time:
-        peak_start_time = min_data_time
-        peak_end_time = min(min_data_time + timedelta(minutes=60), max_data_time)
-    elif peak_end_time > max_data_time:
-        peak_end_time = max_data_time
-        peak_start_time = max(max_data_time - timedelta(minutes=60), min_data_time)
-
+    sorted_data = png_data.sort_values(by=datetime_column).set_index(datetime_column)
     peak_data = sorted_data.loc[peak_start_time:peak_end_time].copy().reset_index()
 
     if len(peak_data) < 2:
         return None, None
 
     colormap_name = "Set1"
-    plt.style.use("seaborn-v0_8-whitegrid")
-
     palette = plt.get_cmap(colormap_name)
     color = palette(3)  # Distinct colour from peak60 (palette(1)) and glorefs (palette(2))
 
-    fig, ax = plt.subplots(figsize=(16, 6))
+    fig, ax = yaspe_png.figure()
 
     if line_chart:
         ax.plot(peak_data[datetime_column], peak_data["metric"],
@@ -709,7 +707,7 @@ def _create_business_hours_peak_chart(
 
     ax.set_ylabel(column_name, fontsize=14)
     ax.tick_params(labelsize=14)
-    plt.subplots_adjust(bottom=0.15)
+    fig.subplots_adjust(bottom=0.15)
     ax.set_ylim(bottom=0)
     if max_y != 0:
         ax.set_ylim(top=max_y)
@@ -728,23 +726,43 @@ def _create_business_hours_peak_chart(
     plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
 
     output_name = column_name.replace("/", "_")
-    plt.tight_layout()
-    plt.savefig(f"{filepath}{output_prefix}{file_prefix}z_{output_name}_bh_peak.png", format="png", dpi=150, bbox_inches="tight")
-    plt.close("all")
+    fig.tight_layout()
+    yaspe_png.save(fig, f"{filepath}{output_prefix}{file_prefix}z_{output_name}_bh_peak.png")
 
     return peak_start_time, peak_end_time
 
 
-def _create_daily_summary_chart(png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column):
-    """Bar chart: 99th percentile value per calendar day. Highlights the busiest day in red."""
-    sorted_data = png_data.set_index(datetime_column)["metric"].sort_index()
-    daily = sorted_data.groupby(sorted_data.index.date).quantile(0.99)
+def _find_day_profiles(wide, datetime_column, columns, rollups=None, source=None):
+    """Multi-day aggregates for every column of a wide frame (one row per sample) in one pass.
+
+    Returns {column: profile} for the long-period charts, or {} when the data spans 25 hours or less;
+    see chart_rollups.profiles for what a profile holds. With a chart_rollups.RollupStore the per-day
+    rollups are stored under source, and in an incremental run merged with the days stored before.
+    Short data is neither rolled up nor stored, except in an incremental run, where the rows read are
+    only the days the appends touch.
+    """
+    values = wide.set_index(datetime_column)[columns].select_dtypes("number").sort_index()
+    if len(values) < 2 or values.shape[1] == 0:
+        return {}
+    if _increment(rollups) is None and values.index[-1] - values.index[0] <= chart_rollups.LONG_PERIOD:
+        return {}
+
+    day_rollups = chart_rollups.day_rollups(values)
+    if rollups is not None:
+        day_rollups = rollups.update(source, day_rollups)
+    return chart_rollups.profiles(day_rollups)
+
+
+@chart_progress.timed("daily_summary")
+def _create_daily_summary_chart(column_name, title, max_y, filepath, output_prefix, file_prefix, profile):
+    """Bar chart: 99th percentile value per calendar day. Highlights the busiest day in red.
+    profile is the column's entry from _find_day_profiles."""
+    daily = profile["daily_p99"]
 
     if len(daily) < 2:
         return
 
-    plt.style.use("seaborn-v0_8-whitegrid")
-    fig, ax = plt.subplots(figsize=(16, 6))
+    fig, ax = yaspe_png.figure()
 
     colors = ["steelblue"] * len(daily)
     colors[int(daily.values.argmax())] = "tomato"
@@ -752,7 +770,7 @@ def _create_daily_summary_chart(png_data, column_name, title, max_y, filepath, o
     x_pos = range(len(daily))
     bars = ax.bar(x_pos, daily.values, color=colors, alpha=0.85, edgecolor="white")
     ax.set_xticks(list(x_pos))
-    ax.set_xticklabels([str(d) for d in daily.index])
+    ax.set_xticklabels([str(d.date()) for d in daily.index])
     for bar, val in zip(bars, daily.values):
         ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height() * 1.01,
                 f"{val:,.0f}", ha="center", va="bottom", fontsize=10)
@@ -767,8 +785,8 @@ def _create_daily_summary_chart(png_data, column_name, title, max_y, filepath, o
     else:
         ax.yaxis.set_major_formatter(mpl.ticker.StrMethodFormatter("{x:,.3f}"))
 
-    start_str = sorted_data.index.min().strftime("%d-%b-%y")
-    end_str = sorted_data.index.max().strftime("%d-%b-%y")
+    start_str = profile["start"].strftime("%d-%b-%y")
+    end_str = profile["end"].strftime("%d-%b-%y")
     ax.set_title(f"{title} - Daily 99th pct ({start_str} to {end_str})", fontsize=16)
     ax.set_ylabel(column_name, fontsize=14)
     ax.set_xlabel("Date", fontsize=12)
@@ -776,25 +794,20 @@ def _create_daily_summary_chart(png_data, column_name, title, max_y, filepath, o
     plt.setp(ax.get_xticklabels(), rotation=30, ha="right")
 
     output_name = column_name.replace("/", "_")
-    plt.tight_layout()
-    plt.savefig(f"{filepath}{output_prefix}{file_prefix}z_{output_name}_daily_summary.png", format="png", dpi=150, bbox_inches="tight")
-    plt.close("all")
-
+    fig.tight_layout()
+    yaspe_png.save(fig, f"{filepath}{output_prefix}{file_prefix}z_{output_name}_daily_summary.png")
 
-def _create_heatmap_chart(png_data, column_name, title, filepath, output_prefix, file_prefix, datetime_column):
-    """Heatmap: hour-of-day (x) × date (y), colour = 99th pct. Shows consistent peak hours across days."""
-    sorted_data = png_data.set_index(datetime_column)["metric"].sort_index()
-    df = sorted_data.to_frame("metric")
-    df["date"] = df.index.date
-    df["hour"] = df.index.hour
 
-    pivot = df.groupby(["date", "hour"])["metric"].quantile(0.99).unstack(fill_value=0)
+@chart_progress.timed("heatmap")
+def _create_heatmap_chart(column_name, title, filepath, output_prefix, file_prefix, profile):
+    """Heatmap: hour-of-day (x) × date (y), colour = 99th pct. Shows consistent peak hours across days.
+    profile is the column's entry from _find_day_profiles."""
+    pivot = profile["hourly_p99"].unstack(fill_value=0)
 
     if pivot.shape[0] < 2:
         return
 
-    plt.style.use("seaborn-v0_8-whitegrid")
-    fig, ax = plt.subplots(figsize=(16, max(4, pivot.shape[0] * 0.7)))
+    fig, ax = yaspe_png.figure(figsize=(16, max(4, pivot.shape[0] * 0.7)))
 
     im = ax.imshow(pivot.values, aspect="auto", cmap="YlOrRd", interpolation="nearest")
     ax.set_xticks(range(24))
@@ -802,20 +815,20 @@ def _create_heatmap_chart(png_data, column_name, title, filepath, output_prefix,
     ax.set_yticks(range(len(pivot.index)))
     ax.set_yticklabels([pd.Timestamp(d).strftime("%a %d-%b") for d in pivot.index], fontsize=11)
 
-    cbar = plt.colorbar(im, ax=ax, fraction=0.02, pad=0.02)
+    cbar = fig.colorbar(im, ax=ax, fraction=0.02, pad=0.02)
     cbar.set_label(f"{column_name} (99th pct)", fontsize=11)
 
-    start_str = sorted_data.index.min().strftime("%d-%b-%y")
-    end_str = sorted_data.index.max().strftime("%d-%b-%y")
+    start_str = profile["start"].strftime("%d-%b-%y")
+    end_str = profile["end"].strftime("%d-%b-%y")
     ax.set_title(f"{title} - Hourly 99th pct Heatmap ({start_str} to {end_str})", fontsize=16)
     ax.set_xlabel("Hour of day", fontsize=12)
 
     output_name = column_name.replace("/", "_")
-    plt.tight_layout()
-    plt.savefig(f"{filepath}{output_prefix}{file_prefix}z_{output_name}_heatmap.png", format="png", dpi=150, bbox_inches="tight")
-    plt.close("all")
+    fig.tight_layout()
+    yaspe_png.save(fig, f"{filepath}{output_prefix}{file_prefix}z_{output_name}_heatmap.png")
 
 
+@chart_progress.timed("5min_avg")
 def _create_5min_avg_chart(png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column, avg_minutes=5):
     """Long-period chart smoothed to a rolling N-minute average (default 5 min). Same layout as the 30-min chart."""
     from datetime import timedelta
@@ -838,10 +851,9 @@ def _create_5min_avg_chart(png_data, column_name, title, max_y, filepath, output
     else:
         sample_label = "samples"
 
-    plt.style.use("seaborn-v0_8-whitegrid")
     palette = plt.get_cmap("Set1")
     color = palette(1)
-    fig, ax = plt.subplots(figsize=(16, 6))
+    fig, ax = yaspe_png.figure()
 
     ax.plot(sorted_data.index, sorted_data.values, color=color, alpha=0.15, linewidth=0.5, label="_raw")
     ax.plot(smoothed.index, smoothed.values, color=color, alpha=0.85, linewidth=1.5,
@@ -881,52 +893,39 @@ def _create_5min_avg_chart(png_data, column_name, title, max_y, filepath, output
     ax.grid(which="major", axis="y", linestyle="--")
     ax.xaxis.grid(False)
     ax.legend(bbox_to_anchor=(1.01, 1), loc="upper left", borderaxespad=0, fontsize=11)
-    plt.subplots_adjust(bottom=0.2)
+    fig.subplots_adjust(bottom=0.2)
 
     output_name = column_name.replace("/", "_")
-    plt.tight_layout()
-    plt.savefig(f"{filepath}{output_prefix}{file_prefix}z_{output_name}_{avg_minutes}min_avg.png",
-                format="png", dpi=150, bbox_inches="tight")
-    plt.close("all")
-
+    fig.tight_layout()
+    yaspe_png.save(fig, f"{filepath}{output_prefix}{file_prefix}z_{output_name}_{avg_minutes}min_avg.png")
 
-def _create_day_overlay_chart(png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column, line_chart=True):
-    """All days overlaid on a 00:00–24:00 x-axis, one colour per day. Shows consistency of the daily profile."""
-    from datetime import timedelta
 
-    sorted_data = png_data.copy().set_index(datetime_column).sort_index()
-    dates = sorted(set(sorted_data.index.date))
+@chart_progress.timed("day_overlay PNG")
+def _create_day_overlay_chart(column_name, title, max_y, filepath, output_prefix, file_prefix, profile, line_chart=True):
+    """All days overlaid on a 00:00–24:00 x-axis, one colour per day. Shows consistency of the daily profile.
+    profile is the column's entry from _find_day_profiles (days already smoothed and mapped to a reference day)."""
+    days = profile["days"]
 
-    if len(dates) < 2:
+    if len(days) < 2:
         return
 
-    plt.style.use("seaborn-v0_8-whitegrid")
     cmap = plt.get_cmap("tab10")
-    fig, ax = plt.subplots(figsize=(16, 6))
+    fig, ax = yaspe_png.figure()
 
-    for i, date in enumerate(dates):
-        day_data = sorted_data[sorted_data.index.date == date]["metric"]
-        if day_data.empty:
-            continue
-
-        # Smooth per day with ~30-min window
-        win = max(2, min(len(day_data), 60))
-        day_smooth = day_data.rolling(window=win, center=True, min_periods=1).mean()
-
-        # Map to a reference date so all days share the same x-axis
-        x_ref = [pd.Timestamp("2000-01-01") + timedelta(seconds=(ts - pd.Timestamp(date)).total_seconds())
-                 for ts in day_data.index]
-        ax.plot(x_ref, day_smooth.values, color=cmap(i % 10), alpha=0.8, linewidth=1.2,
-                label=pd.Timestamp(date).strftime("%a %d-%b"))
+    x_ref = profile["x_ref"]
+    smooth = profile["smooth"].values
+    for i, (date, start, end) in enumerate(days):
+        ax.plot(x_ref[start:end], smooth[start:end], color=cmap(i % 10), alpha=0.8, linewidth=1.2,
+                label=date.strftime("%a %d-%b"))
 
     ax.set_ylim(bottom=0)
     if max_y > 0:
         ax.set_ylim(top=max_y)
 
     cpu_names = ["wa", "sy", "us"]
-    if png_data["metric"].max() > 5 or "%" in column_name or column_name in cpu_names or png_data["metric"].max() == 0:
+    if profile["max"] > 5 or "%" in column_name or column_name in cpu_names or profile["max"] == 0:
         ax.yaxis.set_major_formatter(mpl.ticker.StrMethodFormatter("{x:,.0f}"))
-    elif png_data["metric"].max() < 0.002:
+    elif profile["max"] < 0.002:
         ax.yaxis.set_major_formatter(mpl.ticker.StrMethodFormatter("{x:,.4f}"))
     else:
         ax.yaxis.set_major_formatter(mpl.ticker.StrMethodFormatter("{x:,.3f}"))
@@ -936,8 +935,8 @@ def _create_day_overlay_chart(png_data, column_name, title, max_y, filepath, out
     ax.xaxis.set_major_formatter(plt_dates.DateFormatter("%H:%M"))
     plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
 
-    start_str = sorted_data.index.min().strftime("%d-%b-%y")
-    end_str = sorted_data.index.max().strftime("%d-%b-%y")
+    start_str = profile["start"].strftime("%d-%b-%y")
+    end_str = profile["end"].strftime("%d-%b-%y")
     ax.set_title(f"{title} - Day Overlay ({start_str} to {end_str})", fontsize=16)
     ax.set_ylabel(column_name, fontsize=14)
     ax.set_xlabel("Time of day", fontsize=12)
@@ -946,20 +945,19 @@ def _create_day_overlay_chart(png_data, column_name, title, max_y, filepath, out
     ax.legend(bbox_to_anchor=(1.01, 1), loc="upper left", borderaxespad=0, fontsize=11)
 
     output_name = column_name.replace("/", "_")
-    plt.tight_layout()
-    plt.savefig(f"{filepath}{output_prefix}{file_prefix}z_{output_name}_day_overlay.png", format="png", dpi=150, bbox_inches="tight")
-    plt.close("all")
+    fig.tight_layout()
+    yaspe_png.save(fig, f"{filepath}{output_prefix}{file_prefix}z_{output_name}_day_overlay.png")
 
 
-def _create_day_overlay_html(png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column):
+@chart_progress.timed("day_overlay HTML")
+def _create_day_overlay_html(column_name, title, max_y, filepath, output_prefix, file_prefix, profile, dashboard=None):
     """Interactive Plotly day-overlay chart: one trace per calendar day on a shared 00:00-24:00 x-axis.
-    Hover shows actual date + time + value. Includes the overview/zoom panel."""
-    from datetime import timedelta
+    Hover shows actual date + time + value. Includes the overview/zoom panel.
+    profile is the column's entry from _find_day_profiles.
+    With a yaspe_html.Dashboard the chart is added to it instead of written as its own page."""
+    days = profile["days"]
 
-    sorted_data = png_data.copy().set_index(datetime_column).sort_index()
-    dates = sorted(set(sorted_data.index.date))
-
-    if len(dates) < 2:
+    if len(days) < 2:
         return
 
     colors = [
@@ -974,33 +972,27 @@ def _create_day_overlay_html(png_data, column_name, title, max_y, filepath, outp
         vertical_spacing=0.05,
     )
 
-    for i, date in enumerate(dates):
-        day_data = sorted_data[sorted_data.index.date == date]["metric"]
-        if day_data.empty:
-            continue
-
-        # Smooth with ~30-min window
-        win = max(2, min(len(day_data), 60))
-        day_smooth = day_data.rolling(window=win, center=True, min_periods=1).mean()
-
-        # Map to a reference date for shared x-axis, store actual datetime in customdata
-        x_ref = [pd.Timestamp("2000-01-01") + timedelta(seconds=(ts - pd.Timestamp(date)).total_seconds())
-                 for ts in day_data.index]
-        actual_times = [ts.strftime("%a %d-%b %H:%M:%S") for ts in day_data.index]
-
+    # Reference-day x for the shared axis, actual datetime in customdata
+    x_ref = profile["x_ref"]
+    smooth = profile["smooth"].values
+    when = profile["when"]
+    for i, (date, start, end) in enumerate(days):
         color = colors[i % len(colors)]
-        label = pd.Timestamp(date).strftime("%a %d-%b")
+        label = date.strftime("%a %d-%b")
 
-        fig.add_trace(go.Scatter(
-            x=x_ref, y=day_smooth.values,
+        source = len(fig.data)
+        fig.add_trace(yaspe_html.scatter_trace(
+            end - start,
+            **yaspe_html.time_kwargs(x_ref[start:end]), y=yaspe_html.compact_values(smooth[start:end]),
             mode="lines", name=label,
             line=dict(width=1.5, color=color),
-            customdata=actual_times,
+            customdata=when[start:end],
             hovertemplate="%{customdata}<br>" + column_name + ": %{y:,.0f}<extra></extra>",
         ), row=1, col=1)
 
-        fig.add_trace(go.Scatter(
-            x=x_ref, y=day_smooth.values,
+        fig.add_trace(yaspe_html.scatter_trace(
+            end - start,
+            **yaspe_html.shared_data(source),
             mode="lines", name=label,
             line=dict(width=0.8, color=color),
             showlegend=False,
@@ -1008,15 +1000,15 @@ def _create_day_overlay_html(png_data, column_name, title, max_y, filepath, outp
         ), row=2, col=1)
 
     yaxis_range = [0, max_y] if max_y > 0 else [0, None]
-    start_str = sorted_data.index.min().strftime("%d-%b-%y")
-    end_str = sorted_data.index.max().strftime("%d-%b-%y")
+    start_str = profile["start"].strftime("%d-%b-%y")
+    end_str = profile["end"].strftime("%d-%b-%y")
 
     fig.update_layout(
         title=dict(text=f"{title} - Day Overlay ({start_str} to {end_str})", font=dict(size=16), x=0.5, xanchor="center"),
         xaxis=dict(title="Time of day", tickfont=dict(size=13),
-                   tickformat="%H:%M"),
+                   tickformat="%H:%M", type="date"),
         xaxis2=dict(title="Drag box here to zoom ↑",
-                    tickfont=dict(size=11), tickformat="%H:%M"),
+                    tickfont=dict(size=11), tickformat="%H:%M", type="date"),
         yaxis=dict(title=column_name, range=yaxis_range, tickfont=dict(size=13), rangemode="tozero"),
         yaxis2=dict(rangemode="tozero", showticklabels=False),
         legend=dict(bgcolor="#EEEEEE", bordercolor="gray", borderwidth=1,
@@ -1028,34 +1020,79 @@ def _create_day_overlay_html(png_data, column_name, title, max_y, filepath, outp
     )
 
     output_name = column_name.replace("/", "_")
+    if dashboard is not None:
+        dashboard.add(fig, f"{file_prefix}{output_name}_day_overlay")
+        return
     fig.write_html(
         f"{filepath}{output_prefix}{file_prefix}{output_name}_day_overlay.html",
         include_plotlyjs="cdn",
-        post_script=_OVERVIEW_ZOOM_JS,
+        post_script=yaspe_html.SHARED_DATA_JS + _OVERVIEW_ZOOM_JS,
         full_html=True,
     )
 
 
-def _create_per_day_bh_peak_charts(png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column, line_chart=True, bh_start=8, bh_end=18):
-    """For each calendar day in a long-period dataset, create a business-hours peak 60-min chart."""
-    sorted_data = png_data.copy().set_index(datetime_column).sort_index()
-    dates = sorted(set(sorted_data.index.date))
+@chart_progress.timed("bh_days")
+def _create_per_day_bh_peak_charts(png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column, day_windows, line_chart=True):
+    """Business-hours peak 60 minutes of each calendar day as small multiples: one PNG per metric
+    (z_{metric}_bh_days.png) with a panel per day, up to a week per row.
+    day_windows is {day: (start, end)} from _find_peak_windows (bh_days)."""
+    if not day_windows:
+        return
 
-    for date in dates:
-        day_data = sorted_data[sorted_data.index.date == date].reset_index()
-        if len(day_data) < 10:
-            continue
+    # Sort once; each panel is a binary-search slice of the same series
+    series = png_data.set_index(datetime_column)["metric"].sort_index()
+    days = sorted(day_windows)
+    ncols = min(len(days), 7)
+    nrows = -(-len(days) // ncols)
 
-        date_str = pd.Timestamp(date).strftime("%a %d-%b-%y")
-        day_title = f"{title} - {date_str}"
-        day_file_prefix = f"{file_prefix}{pd.Timestamp(date).strftime('%Y%m%d')}_"
+    color = plt.get_cmap("Set1")(3)  # Same colour as the business hours peak chart
 
-        _create_business_hours_peak_chart(
-            day_data, column_name, day_title, max_y, filepath, output_prefix,
-            day_file_prefix, datetime_column, line_chart, bh_start, bh_end,
+    fig, axes = yaspe_png.figure(figsize=(3.2 * ncols, 2.6 * nrows + 0.8), nrows=nrows, ncols=ncols, sharey=True,
+                                  squeeze=False)
+
+    metric_max = series.max()
+    if metric_max > 5 or "%" in column_name or column_name in ("wa", "sy", "us") or metric_max == 0:
+        y_format = "{x:,.0f}"
+    elif metric_max < 0.002:
+        y_format = "{x:,.4f}"
+    else:
+        y_format = "{x:,.3f}"
+
+    for ax, day in zip(axes.flat, days):
+        peak_start_time, peak_end_time = day_windows[day]
+        window = series.loc[peak_start_time:peak_end_time]
+        if line_chart:
+            ax.plot(window.index, window.values, color=color, linestyle="-", alpha=0.7, linewidth=1)
+        else:
+            ax.plot(window.index, window.values, color=color, marker=".", linestyle="none", alpha=0.7)
+        mean = window.mean()
+        ax.axhline(y=mean, color="gray", linestyle="--", linewidth=0.8, alpha=0.7)
+        ax.set_title(
+            f"{day:%a %d-%b} {peak_start_time:%H:%M}-{peak_end_time:%H:%M}\nmean {y_format.format(x=mean)}",
+            fontsize=10,
         )
+        ax.grid(which="major", axis="both", linestyle="--")
+        ax.xaxis.set_major_locator(plt_dates.MinuteLocator(byminute=[0, 30]))
+        ax.xaxis.set_major_formatter(plt_dates.DateFormatter("%H:%M"))
+        ax.tick_params(labelsize=8)
+
+    for ax in axes.flat[len(days):]:
+        ax.set_visible(False)
+
+    axes[0, 0].set_ylim(bottom=0)
+    if max_y != 0:
+        axes[0, 0].set_ylim(top=max_y)
+    axes[0, 0].yaxis.set_major_formatter(mpl.ticker.StrMethodFormatter(y_format))
+    for ax in axes[:, 0]:
+        ax.set_ylabel(column_name, fontsize=10)
+
+    fig.suptitle(f"{title} - BH Peak 60 min by day", fontsize=14)
+    fig.tight_layout()
+    output_name = column_name.replace("/", "_")
+    yaspe_png.save(fig, f"{filepath}{output_prefix}{file_prefix}z_{output_name}_bh_days.png", tight=False)
 
 
+@chart_progress.timed("glorefs_peak")
 def _create_glorefs_peak_chart(
     png_data,
     column_name,
@@ -1107,12 +1144,10 @@ def _create_glorefs_peak_chart(
         return
 
     colormap_name = "Set1"
-    plt.style.use("seaborn-v0_8-whitegrid")
-
     palette = plt.get_cmap(colormap_name)
     color = palette(2)  # Different color to distinguish from regular peak chart
 
-    fig, ax = plt.subplots(figsize=(16, 6))
+    fig, ax = yaspe_png.figure()
 
     # Choose plot style based on line_chart option
     if line_chart:
@@ -1178,7 +1213,7 @@ def _create_glorefs_peak_chart(
 
     ax.set_ylabel(column_name, fontsize=14)
     ax.tick_params(labelsize=14)
-    plt.subplots_adjust(bottom=0.15)
+    fig.subplots_adjust(bottom=0.15)
     ax.set_ylim(bottom=0)
     if max_y != 0:
         ax.set_ylim(top=max_y)
@@ -1202,105 +1237,36 @@ def _create_glorefs_peak_chart(
     plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
 
     output_name = column_name.replace("/", "_")
-    plt.tight_layout()
-    plt.savefig(f"{filepath}{output_prefix}{file_prefix}z_{output_name}_glorefs_peak.png", format="png", dpi=150, bbox_inches="tight")
-    plt.close("all")
+    fig.tight_layout()
+    yaspe_png.save(fig, f"{filepath}{output_prefix}{file_prefix}z_{output_name}_glorefs_peak.png")
 
 
 
 _DAY_OVERLAY_ALWAYS = {"Total CPU", "Glorefs", "PhyRds"}
 
-_OVERVIEW_ZOOM_JS = """
-(function() {
-var gd = document.querySelector('.plotly-graph-div');
-var syncing = false;
-var zoomRange = null;
-
-function noHighlightShapes() {
-    return (gd.layout.shapes || []).filter(function(s) { return !s._yaspe_highlight; });
-}
-
-function applyHighlight(r0, r1) {
-    var shapes = noHighlightShapes().concat([{
-        _yaspe_highlight: true,
-        type: 'rect', xref: 'x2', yref: 'y2 domain',
-        x0: r0, x1: r1, y0: 0, y1: 1,
-        fillcolor: 'rgba(255,165,0,0.3)',
-        line: {color: 'rgba(255,140,0,0.7)', width: 1},
-        layer: 'above'
-    }]);
-    syncing = true;
-    Plotly.relayout(gd, {shapes: shapes}).then(function() { syncing = false; });
-}
-
-function resetAll() {
-    zoomRange = null;
-    syncing = true;
-    Plotly.relayout(gd, {
-        'xaxis.autorange': true,
-        'xaxis2.autorange': true,
-        shapes: noHighlightShapes()
-    }).then(function() { syncing = false; btn.style.display = 'none'; });
-}
-
-gd.on('plotly_relayout', function(eventdata) {
-    if (syncing) return;
-    var r0 = eventdata['xaxis2.range[0]'];
-    var r1 = eventdata['xaxis2.range[1]'];
-    if (r0 !== undefined && r1 !== undefined) {
-        // User dragged on overview: zoom top chart, snap overview back, draw highlight
-        zoomRange = [r0, r1];
-        syncing = true;
-        Plotly.relayout(gd, {
-            'xaxis.range[0]': r0, 'xaxis.range[1]': r1,
-            'xaxis.autorange': false,
-            'xaxis2.autorange': true
-        }).then(function() { syncing = false; applyHighlight(r0, r1); btn.style.display = 'block'; });
-        return;
-    }
-    // Double-click on either chart: reset both axes and clear highlight
-    if (eventdata['xaxis.autorange'] === true || eventdata['xaxis2.autorange'] === true) {
-        resetAll();
-        return;
-    }
-    // Direct zoom on top chart: mirror to highlight on overview
-    var m0 = eventdata['xaxis.range[0]'];
-    var m1 = eventdata['xaxis.range[1]'];
-    if (m0 !== undefined && m1 !== undefined) {
-        zoomRange = [m0, m1];
-        applyHighlight(m0, m1);
-        btn.style.display = 'block';
-    }
-});
-
-// Reset Zoom button — reliable alternative to double-click
-var btn = document.createElement('button');
-btn.textContent = 'Reset Zoom';
-btn.style.cssText = 'position:absolute;top:8px;left:8px;z-index:999;padding:6px 14px;font-size:13px;font-weight:bold;color:#fff;background:#e63946;border:none;border-radius:4px;cursor:pointer;display:none;box-shadow:0 2px 6px rgba(0,0,0,0.3);';
-btn.addEventListener('click', resetAll);
-gd.style.position = 'relative';
-gd.appendChild(btn);
-})();
-"""
+_OVERVIEW_ZOOM_JS = yaspe_html.OVERVIEW_ZOOM_JS
 
 
-def _maybe_day_overlay_html(data, column_name, title, max_y, filepath, output_prefix, file_prefix, day_overlay=False):
+def _maybe_day_overlay_html(data, column_name, title, max_y, filepath, output_prefix, file_prefix, day_overlay=False, dashboard=None,
+                            profile=None):
     """Emit a day-overlay HTML chart when data spans more than 25 hours.
 
     Created only when day_overlay=True OR the column is in _DAY_OVERLAY_ALWAYS.
+    profile is the column's entry from _find_day_profiles, found here if not given.
     """
     if not day_overlay and column_name not in _DAY_OVERLAY_ALWAYS:
         return
     x_column = "datetime_parsed" if "datetime_parsed" in data.columns else "datetime"
-    time_range = data[x_column].max() - data[x_column].min()
-    if time_range.total_seconds() > 25 * 60 * 60:
-        _create_day_overlay_html(data, column_name, title, max_y, filepath, output_prefix, file_prefix, x_column)
+    if profile is None:
+        profile = _find_day_profiles(data, x_column, ["metric"]).get("metric")
+    if profile is not None:
+        _create_day_overlay_html(column_name, title, max_y, filepath, output_prefix, file_prefix, profile, dashboard)
 
 
-def _apply_ref_lines(fig, data, min_max, threshold, row):
-    """Add min/max percentile and threshold reference lines to a Plotly figure.
-    row=None for single-panel figures, row=1 for the top panel of a 2-row subplot."""
-    kw = dict(row=row, col=1) if row is not None else {}
+def _ref_lines(data, min_max, threshold):
+    """Min/max percentile and threshold reference lines as (y, color, dash, width, label, position) tuples.
+    dash and position use Plotly names; _write_linked_png maps them for matplotlib."""
+    lines = []
 
     if min_max:
         metric = data["metric"]
@@ -1311,43 +1277,77 @@ def _apply_ref_lines(fig, data, min_max, threshold, row):
         filtered = metric[(metric >= p2) & (metric <= p99)]
         has_outliers = len(filtered) < len(metric)
 
-        ann = dict(bgcolor="rgba(255,255,255,0.85)", bordercolor="lightgrey", borderwidth=1)
-
         if has_outliers and len(filtered) > 0:
             adj_min = filtered.min()
             adj_max = filtered.max()
-            fig.add_hline(y=abs_min, line=dict(color="darkred", dash="dot", width=1),
-                          annotation_text=f"Abs Min: {abs_min:,.0f}", annotation_position="top left",
-                          annotation=ann, **kw)
-            fig.add_hline(y=adj_min, line=dict(color="red", dash="dash", width=1),
-                          annotation_text=f"98th pct Min: {adj_min:,.0f}", annotation_position="top right",
-                          annotation=ann, **kw)
-            fig.add_hline(y=abs_max, line=dict(color="darkgreen", dash="dot", width=1),
-                          annotation_text=f"Abs Max: {abs_max:,.0f}", annotation_position="top left",
-                          annotation=ann, **kw)
-            fig.add_hline(y=adj_max, line=dict(color="green", dash="dash", width=1),
-                          annotation_text=f"99th pct Max: {adj_max:,.0f}", annotation_position="top right",
-                          annotation=ann, **kw)
+            lines += [
+                (abs_min, "darkred", "dot", 1, f"Abs Min: {abs_min:,.0f}", "top left"),
+                (adj_min, "red", "dash", 1, f"98th pct Min: {adj_min:,.0f}", "top right"),
+                (abs_max, "darkgreen", "dot", 1, f"Abs Max: {abs_max:,.0f}", "top left"),
+                (adj_max, "green", "dash", 1, f"99th pct Max: {adj_max:,.0f}", "top right"),
+            ]
         else:
-            fig.add_hline(y=abs_min, line=dict(color="red", dash="dash", width=1),
-                          annotation_text=f"Min: {abs_min:,.0f}", annotation_position="top right",
-                          annotation=ann, **kw)
-            fig.add_hline(y=abs_max, line=dict(color="green", dash="dash", width=1),
-                          annotation_text=f"Max: {abs_max:,.0f}", annotation_position="top right",
-                          annotation=ann, **kw)
+            lines += [
+                (abs_min, "red", "dash", 1, f"Min: {abs_min:,.0f}", "top right"),
+                (abs_max, "green", "dash", 1, f"Max: {abs_max:,.0f}", "top right"),
+            ]
 
     if threshold is not None:
         thresh_val, thresh_label = threshold
         thresh_color = "red" if data["metric"].max() > thresh_val else "orange"
-        fig.add_hline(y=thresh_val, line=dict(color=thresh_color, dash="dashdot", width=1.5),
-                      annotation_text=thresh_label, annotation_position="top left",
-                      annotation=dict(bgcolor="rgba(255,255,255,0.85)", bordercolor="lightgrey", borderwidth=1),
-                      **kw)
+        lines.append((thresh_val, thresh_color, "dashdot", 1.5, thresh_label, "top left"))
+
+    return lines
+
+
+def _apply_ref_lines(fig, data, min_max, threshold, row):
+    """Add min/max percentile and threshold reference lines to a Plotly figure.
+    row=None for single-panel figures, row=1 for the top panel of a 2-row subplot."""
+    kw = dict(row=row, col=1) if row is not None else {}
+    ann = dict(bgcolor="rgba(255,255,255,0.85)", bordercolor="lightgrey", borderwidth=1)
+
+    for y, color, dash, width, label, position in _ref_lines(data, min_max, threshold):
+        fig.add_hline(y=y, line=dict(color=color, dash=dash, width=width),
+                      annotation_text=label, annotation_position=position,
+                      annotation=ann, **kw)
+
+
+_MPL_DASHES = {"dot": ":", "dash": "--", "dashdot": "-."}
 
 
+@chart_progress.timed("HTML chart PNG")
+def _write_linked_png(x, data, column_name, title, max_y, png_file, **kwargs):
+    """Single-panel PNG for linked_chart / linked_chart_no_time (write_png=True).
+
+    Rendered with matplotlib (Agg): no browser process per image and the same
+    style as the simple_chart PNGs.
+    """
+    min_max = kwargs.get("min_max", False)
+    threshold = kwargs.get("threshold")
+    x_title = kwargs.get("x_title", "")
+
+    # 14 x 5 in at 200 dpi
+    fig, ax = yaspe_png.figure(figsize=(14, 5))
+    ax.plot(x, data["metric"], label=column_name, color=plt.get_cmap("Set1")(1), linewidth=1)
+    for y, color, dash, width, label, position in _ref_lines(data, min_max, threshold):
+        ax.axhline(y=y, color=color, linestyle=_MPL_DASHES[dash], linewidth=width, alpha=0.7, label=label)
+
+    ax.set_title(title, fontsize=16)
+    ax.set_xlabel(x_title, fontsize=13)
+    ax.set_ylabel(column_name, fontsize=13)
+    ax.set_ylim(bottom=0)
+    if max_y > 0:
+        ax.set_ylim(top=max_y)
+    ax.legend(frameon=True, facecolor="#EEEEEE", edgecolor="gray", fontsize=11)
+    fig.tight_layout()
+    yaspe_png.save(fig, png_file, dpi=200, tight=False)
+
+
+@chart_progress.timed("HTML")
 def linked_chart(data, column_name, title, max_y, filepath, output_prefix, **kwargs):
     """Interactive HTML chart: drag a box on the overview (bottom) to zoom the main chart (top).
-    The overview resets to full range after each zoom. Double-click overview to reset both."""
+    The overview resets to full range after each zoom. Double-click overview to reset both.
+    dashboard=yaspe_html.Dashboard adds the chart to that page instead of writing its own HTML file."""
     file_prefix = kwargs.get("file_prefix", "")
     if file_prefix != "":
         file_prefix = f"{file_prefix}_"
@@ -1358,6 +1358,16 @@ def linked_chart(data, column_name, title, max_y, filepath, output_prefix, **kwa
     png_path = kwargs.get("png_path", filepath)
     day_overlay = kwargs.get("day_overlay", False)
     chart_label = kwargs.get("chart_label", [])  # List of strings for right-side annotation
+    dashboard = kwargs.get("dashboard")
+    variants = kwargs.get("variants")  # Selected chart variants (chart_selection.VARIANTS), None for the defaults
+    profile = kwargs.get("profile")  # This column's entry from _find_day_profiles, for the day overlay
+    if variants is not None:
+        day_overlay = "day_overlay" in variants
+        if "base" not in variants:
+            if write_html and day_overlay:
+                _maybe_day_overlay_html(data, column_name, title, max_y, filepath, output_prefix, file_prefix, True,
+                                        dashboard, profile)
+            return
 
     x_column = "datetime_parsed" if "datetime_parsed" in data.columns else "datetime"
 
@@ -1375,25 +1385,9 @@ def linked_chart(data, column_name, title, max_y, filepath, output_prefix, **kwa
 
     # PNG-only: single-panel figure, no overview row
     if write_png and not write_html:
-        png_fig = go.Figure()
-        png_fig.add_trace(go.Scatter(
-            x=data[x_column], y=data["metric"],
-            mode="lines", name=column_name,
-            line=dict(width=1),
-        ))
-        _apply_ref_lines(png_fig, data, min_max, threshold, row=None)
-        png_fig.update_layout(
-            title=dict(text=title, font=dict(size=16), x=0.5, xanchor="center"),
-            xaxis=dict(title="", tickfont=dict(size=13)),
-            yaxis=dict(title=column_name, range=yaxis_range, tickfont=dict(size=13), rangemode="tozero"),
-            legend=dict(bgcolor="#EEEEEE", bordercolor="gray", borderwidth=1, font=dict(size=13)),
-            height=500, width=1400,
-            template="plotly_white",
-        )
-        png_fig.write_image(
-            f"{png_path}{output_prefix}{file_prefix}{output_name}.png",
-            scale=2, width=1400, height=500,
-        )
+        _write_linked_png(data[x_column], data, column_name, title, max_y,
+                          f"{png_path}{output_prefix}{file_prefix}{output_name}.png",
+                          min_max=min_max, threshold=threshold)
         return
 
     # HTML (or PNG+HTML): two-panel figure with overview row
@@ -1404,15 +1398,20 @@ def linked_chart(data, column_name, title, max_y, filepath, output_prefix, **kwa
         vertical_spacing=0.05,
     )
 
-    fig.add_trace(go.Scatter(
-        x=data[x_column], y=data["metric"],
+    # Time as epoch ms and values as compact typed arrays; the overview row
+    # reuses the main trace's data in the browser rather than a second copy.
+    n_points = len(data)
+    fig.add_trace(yaspe_html.scatter_trace(
+        n_points,
+        **yaspe_html.time_kwargs(data[x_column]), y=yaspe_html.compact_values(data["metric"]),
         mode="lines", name=column_name,
         line=dict(width=1),
         hovertemplate=f"%{{x|%H:%M:%S}}<br>{column_name}: {hover_fmt}<extra></extra>",
     ), row=1, col=1)
 
-    fig.add_trace(go.Scatter(
-        x=data[x_column], y=data["metric"],
+    fig.add_trace(yaspe_html.scatter_trace(
+        n_points,
+        **yaspe_html.shared_data(0),
         mode="lines", fill="tozeroy",
         name=column_name,
         line=dict(width=0.5, color="steelblue"),
@@ -1440,8 +1439,8 @@ def linked_chart(data, column_name, title, max_y, filepath, output_prefix, **kwa
 
     fig.update_layout(
         title=dict(text=title, font=dict(size=16), x=0.5, xanchor="center"),
-        xaxis=dict(title="", tickfont=dict(size=13)),
-        xaxis2=dict(title="Drag box here to zoom ↑", tickfont=dict(size=11)),
+        xaxis=dict(title="", tickfont=dict(size=13), type="date"),
+        xaxis2=dict(title="Drag box here to zoom ↑", tickfont=dict(size=11), type="date"),
         yaxis=dict(title=column_name, range=yaxis_range, tickfont=dict(size=13), rangemode="tozero"),
         yaxis2=dict(rangemode="tozero", showticklabels=False),
         legend=dict(bgcolor="#EEEEEE", bordercolor="gray", borderwidth=1, font=dict(size=13)),
@@ -1452,39 +1451,27 @@ def linked_chart(data, column_name, title, max_y, filepath, output_prefix, **kwa
         margin=dict(r=160) if chart_label else {},
     )
 
-    if write_html:
+    if write_html and dashboard is not None:
+        dashboard.add(fig, f"{file_prefix}{output_name}")
+    elif write_html:
         fig.write_html(
             f"{filepath}{output_prefix}{file_prefix}{output_name}.html",
             include_plotlyjs="cdn",
-            post_script=_OVERVIEW_ZOOM_JS,
+            post_script=yaspe_html.SHARED_DATA_JS + _OVERVIEW_ZOOM_JS,
             full_html=True,
         )
 
     if write_png:
-        png_fig = go.Figure()
-        png_fig.add_trace(go.Scatter(
-            x=data[x_column], y=data["metric"],
-            mode="lines", name=column_name,
-            line=dict(width=1),
-        ))
-        _apply_ref_lines(png_fig, data, min_max, threshold, row=None)
-        png_fig.update_layout(
-            title=dict(text=title, font=dict(size=16), x=0.5, xanchor="center"),
-            xaxis=dict(title="", tickfont=dict(size=13)),
-            yaxis=dict(title=column_name, range=yaxis_range, tickfont=dict(size=13), rangemode="tozero"),
-            legend=dict(bgcolor="#EEEEEE", bordercolor="gray", borderwidth=1, font=dict(size=13)),
-            height=500, width=1400,
-            template="plotly_white",
-        )
-        png_fig.write_image(
-            f"{png_path}{output_prefix}{file_prefix}{output_name}.png",
-            scale=2, width=1400, height=500,
-        )
+        _write_linked_png(data[x_column], data, column_name, title, max_y,
+                          f"{png_path}{output_prefix}{file_prefix}{output_name}.png",
+                          min_max=min_max, threshold=threshold)
 
-    if write_html:
-        _maybe_day_overlay_html(data, column_name, title, max_y, filepath, output_prefix, file_prefix, day_overlay)
+    if write_html and (variants is None or day_overlay):
+        _maybe_day_overlay_html(data, column_name, title, max_y, filepath, output_prefix, file_prefix, day_overlay,
+                                dashboard, profile)
 
 
+@chart_progress.timed("HTML")
 def linked_chart_no_time(data, column_name, title, max_y, filepath, output_prefix, **kwargs):
     """Interactive HTML chart for index-based data: drag overview (bottom) to zoom main chart (top)."""
     file_prefix = kwargs.get("file_prefix", "")
@@ -1499,24 +1486,9 @@ def linked_chart_no_time(data, column_name, title, max_y, filepath, output_prefi
 
     # PNG-only: single-panel figure, no overview row
     if write_png and not write_html:
-        png_fig = go.Figure()
-        png_fig.add_trace(go.Scatter(
-            x=data["id_key"], y=data["metric"],
-            mode="lines", name=column_name,
-            line=dict(width=1),
-        ))
-        png_fig.update_layout(
-            title=dict(text=title, font=dict(size=16), x=0.5, xanchor="center"),
-            xaxis=dict(title="Sample", tickfont=dict(size=13)),
-            yaxis=dict(title=column_name, range=yaxis_range, tickfont=dict(size=13), rangemode="tozero"),
-            legend=dict(bgcolor="#EEEEEE", bordercolor="gray", borderwidth=1, font=dict(size=13)),
-            height=500, width=1400,
-            template="plotly_white",
-        )
-        png_fig.write_image(
-            f"{png_path}{output_prefix}{file_prefix}{output_name}.png",
-            scale=2, width=1400, height=500,
-        )
+        _write_linked_png(data["id_key"], data, column_name, title, max_y,
+                          f"{png_path}{output_prefix}{file_prefix}{output_name}.png",
+                          x_title="Sample")
         return
 
     # HTML (or PNG+HTML): two-panel figure with overview row
@@ -1527,15 +1499,18 @@ def linked_chart_no_time(data, column_name, title, max_y, filepath, output_prefi
         vertical_spacing=0.05,
     )
 
-    fig.add_trace(go.Scatter(
-        x=data["id_key"], y=data["metric"],
+    n_points = len(data)
+    fig.add_trace(yaspe_html.scatter_trace(
+        n_points,
+        x=data["id_key"].to_numpy(), y=yaspe_html.compact_values(data["metric"]),
         mode="lines", name=column_name,
         line=dict(width=1),
         hovertemplate="Sample %{x}<br>%{y:,.2f}<extra></extra>",
     ), row=1, col=1)
 
-    fig.add_trace(go.Scatter(
-        x=data["id_key"], y=data["metric"],
+    fig.add_trace(yaspe_html.scatter_trace(
+        n_points,
+        **yaspe_html.shared_data(0),
         mode="lines", name=column_name,
         line=dict(width=1, color="lightsteelblue"),
         showlegend=False,
@@ -1558,29 +1533,14 @@ def linked_chart_no_time(data, column_name, title, max_y, filepath, output_prefi
         fig.write_html(
             f"{filepath}{output_prefix}{file_prefix}{output_name}.html",
             include_plotlyjs="cdn",
-            post_script=_OVERVIEW_ZOOM_JS,
+            post_script=yaspe_html.SHARED_DATA_JS + _OVERVIEW_ZOOM_JS,
             full_html=True,
         )
 
     if write_png:
-        png_fig = go.Figure()
-        png_fig.add_trace(go.Scatter(
-            x=data["id_key"], y=data["metric"],
-            mode="lines", name=column_name,
-            line=dict(width=1),
-        ))
-        png_fig.update_layout(
-            title=dict(text=title, font=dict(size=16), x=0.5, xanchor="center"),
-            xaxis=dict(title="Sample", tickfont=dict(size=13)),
-            yaxis=dict(title=column_name, range=yaxis_range, tickfont=dict(size=13), rangemode="tozero"),
-            legend=dict(bgcolor="#EEEEEE", bordercolor="gray", borderwidth=1, font=dict(size=13)),
-            height=500, width=1400,
-            template="plotly_white",
-        )
-        png_fig.write_image(
-            f"{png_path}{output_prefix}{file_prefix}{output_name}.png",
-            scale=2, width=1400, height=500,
-        )
+        _write_linked_png(data["id_key"], data, column_name, title, max_y,
+                          f"{png_path}{output_prefix}{file_prefix}{output_name}.png",
+                          x_title="Sample")
 
 
 
@@ -1601,58 +1561,37 @@ def _shade_days(ax, start_date, end_date):
         idx += 1
 
 
-def simple_chart(data, column_name, title, max_y, filepath, output_prefix, **kwargs):
-    """
-    Create a simple chart. Returns (peak_start, peak_end) if this is a Glorefs chart with peak enabled,
-    otherwise returns (None, None).
-    """
-    # Check column only has numeric data (strings can sneak in with AIX)
-    if not is_column_numeric(data, "metric"):
-        print(f"Non numeric data in in column: {column_name} for chart {title}:\n{data.head(2)}")
-        return None, None
-
-    file_prefix = kwargs.get("file_prefix", "")
-    min_max = kwargs.get("min_max", False)
-    peak_chart = kwargs.get("peak_chart", True)
-    glorefs_peak_window = kwargs.get("glorefs_peak_window")  # Can be None or (start, end) tuple
-    day_overlay = kwargs.get("day_overlay", False)
-    line_chart = kwargs.get("line_chart", True)  # Use line charts by default
-    threshold = kwargs.get("threshold")  # Optional (value, label) tuple for a reference line
-    business_hours_chart = kwargs.get("business_hours_chart", False)  # Generate business-hours peak chart
-    bh_charts = kwargs.get("bh_charts", False)  # Generate per-day BH peak charts for multi-day data
-    long_period_smooth = kwargs.get("long_period_smooth", 30)
-    chart_label = kwargs.get("chart_label", [])  # List of strings for right-side annotation
-    if file_prefix != "":
-        file_prefix = f"{file_prefix}_"
+def _default_variants(column_name, min_max=False, peak_chart=True, business_hours_chart=False, day_overlay=False,
+                      bh_charts=False):
+    """Chart variants simple_chart draws when none are selected, from its flags."""
+    variants = {"base"}
+    if min_max:
+        variants |= {"glorefs_peak", "5min_avg", "daily_summary", "heatmap"}
+        if peak_chart:
+            variants.add("peak60")
+        if day_overlay or column_name in _DAY_OVERLAY_ALWAYS:
+            variants.add("day_overlay")
+        if bh_charts:
+            variants.add("bh_days")
+    if business_hours_chart and peak_chart:
+        variants.add("bh_peak")
+    return variants
 
-    # Make a copy of the data for plotting
-    png_data = data.copy()
-
-    # Use the pre-processed datetime column if available
-    if "datetime_parsed" in png_data.columns:
-        # Simply use the already parsed datetime column
-        pass
-    else:
-        # Convert datetime string to datetime type
-        png_data.loc[:, "datetime"] = pd.to_datetime(
-            data["datetime"].apply(guess_datetime_format), format="%m/%d/%Y %H:%M:%S"
-        )
 
+@chart_progress.timed("base PNG")
+def _create_base_chart(
+    png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column, is_long_period,
+    line_chart=True, min_max=False, threshold=None, long_period_smooth=30, chart_label=(),
+):
+    """
+    The main chart for a metric: z_{metric}.png over the whole run.
+    Long periods (>25h) are smoothed with a rolling mean over the raw data drawn faintly behind it.
+    """
     colormap_name = "Set1"
-    plt.style.use("seaborn-v0_8-whitegrid")
-
     palette = plt.get_cmap(colormap_name)
     color = palette(1)
 
-    fig, ax = plt.subplots(figsize=(16, 6))
-
-    # For plotting, use datetime_parsed if it exists, otherwise use datetime
-    datetime_column = "datetime_parsed" if "datetime_parsed" in png_data.columns else "datetime"
-
-    # Calculate time period duration
-    time_range = png_data[datetime_column].max() - png_data[datetime_column].min()
-    is_long_period = time_range.total_seconds() > (25 * 60 * 60)  # More than 25 hours
-    is_medium_period = time_range.total_seconds() > (8 * 60 * 60)  # More than 8 hours
+    fig, ax = yaspe_png.figure()
 
     # For long periods, smooth with a 30-min rolling mean and show raw data faintly behind it
     if is_long_period:
@@ -1780,7 +1719,7 @@ def simple_chart(data, column_name, title, max_y, filepath, output_prefix, **kwa
         # Restore small label size and suppress x-axis grid lines (shading handles day separation)
         ax.tick_params(axis="x", which="major", labelsize=6)
         ax.xaxis.grid(False)
-    plt.subplots_adjust(bottom=0.2)
+    fig.subplots_adjust(bottom=0.2)
     ax.set_ylim(bottom=0)  # Always zero start
     if max_y != 0:
         ax.set_ylim(top=max_y)
@@ -1806,20 +1745,83 @@ def simple_chart(data, column_name, title, max_y, filepath, output_prefix, **kwa
         fig.text(1.01, 0.0, label_text, transform=ax.transAxes,
                  fontsize=10, va="bottom", ha="left",
                  bbox=dict(boxstyle="round,pad=0.3", facecolor="#f0f0f0", edgecolor="gray", alpha=0.8))
-    plt.tight_layout()
-    plt.savefig(f"{filepath}{output_prefix}{file_prefix}z_{output_name}.png", format="png", dpi=150, bbox_inches="tight")
-    plt.close("all")
+    fig.tight_layout()
+    yaspe_png.save(fig, f"{filepath}{output_prefix}{file_prefix}z_{output_name}.png")
+
+
+@chart_progress.timed("PNG data prep")
+def simple_chart(data, column_name, title, max_y, filepath, output_prefix, **kwargs):
+    """
+    Create a simple chart. Returns (peak_start, peak_end) if this is a Glorefs chart with peak enabled,
+    otherwise returns (None, None).
+    """
+    # Check column only has numeric data (strings can sneak in with AIX)
+    if not is_column_numeric(data, "metric"):
+        print(f"Non numeric data in in column: {column_name} for chart {title}:\n{data.head(2)}")
+        return None, None
+
+    file_prefix = kwargs.get("file_prefix", "")
+    min_max = kwargs.get("min_max", False)
+    peak_chart = kwargs.get("peak_chart", True)
+    glorefs_peak_window = kwargs.get("glorefs_peak_window")  # Can be None or (start, end) tuple
+    day_overlay = kwargs.get("day_overlay", False)
+    line_chart = kwargs.get("line_chart", True)  # Use line charts by default
+    threshold = kwargs.get("threshold")  # Optional (value, label) tuple for a reference line
+    business_hours_chart = kwargs.get("business_hours_chart", False)  # Generate business-hours peak chart
+    bh_charts = kwargs.get("bh_charts", False)  # Generate per-day BH peak charts for multi-day data
+    long_period_smooth = kwargs.get("long_period_smooth", 30)
+    chart_label = kwargs.get("chart_label", [])  # List of strings for right-side annotation
+    peaks = kwargs.get("peaks")  # This column's entry from _find_peak_windows, found here if not given
+    profile = kwargs.get("profile")  # This column's entry from _find_day_profiles, found here if not given
+    # Chart variants to draw (chart_selection.VARIANTS), e.g. from --chart-manifest. The default set follows the flags.
+    variants = kwargs.get("variants")
+    if variants is None:
+        variants = _default_variants(column_name, min_max, peak_chart, business_hours_chart, day_overlay, bh_charts)
+    if file_prefix != "":
+        file_prefix = f"{file_prefix}_"
+
+    # Make a copy of the data for plotting
+    png_data = data.copy()
+
+    # Use the pre-processed datetime column if available
+    if "datetime_parsed" in png_data.columns:
+        # Simply use the already parsed datetime column
+        pass
+    else:
+        # Convert datetime string to datetime type
+        png_data.loc[:, "datetime"] = parse_datetimes(data["datetime"])
+
+    # For plotting, use datetime_parsed if it exists, otherwise use datetime
+    datetime_column = "datetime_parsed" if "datetime_parsed" in png_data.columns else "datetime"
+
+    # Calculate time period duration
+    time_range = png_data[datetime_column].max() - png_data[datetime_column].min()
+    is_long_period = time_range.total_seconds() > (25 * 60 * 60)  # More than 25 hours
+    is_medium_period = time_range.total_seconds() > (8 * 60 * 60)  # More than 8 hours
+
+    if "base" in variants:
+        _create_base_chart(
+            png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column, is_long_period,
+            line_chart=line_chart, min_max=min_max, threshold=threshold, long_period_smooth=long_period_smooth,
+            chart_label=chart_label,
+        )
 
     # Track peak times for Glorefs
     peak_start_time, peak_end_time = None, None
 
-    # Create peak 60-minute chart if conditions are met:
-    # - peak_chart is True
-    # - min_max is True
-    # - Data is more than 8 hours but less than 25 hours
-    if peak_chart and min_max and is_medium_period and not is_long_period:
+    if peaks is None and (
+        (("peak60" in variants or "bh_peak" in variants) and is_medium_period and not is_long_period)
+        or ("bh_days" in variants and is_long_period)
+    ):
+        peaks = _find_peak_windows(png_data, datetime_column, ["metric"]).get("metric")
+    if peaks is None:
+        peaks = {"peak60": (None, None), "bh_peak": (None, None), "bh_days": {}}
+
+    # Create peak 60-minute chart if data is more than 8 hours but less than 25 hours
+    if "peak60" in variants and is_medium_period and not is_long_period:
         peak_start_time, peak_end_time = _create_peak_60_chart(
-            png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column, line_chart
+            png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column,
+            peaks["peak60"], line_chart,
         )
 
     # Create Glorefs peak chart if glorefs_peak_window is provided and valid
@@ -1827,7 +1829,7 @@ def simple_chart(data, column_name, title, max_y, filepath, output_prefix, **kwa
     if (
         isinstance(glorefs_peak_window, tuple)
         and glorefs_peak_window[0] is not None
-        and min_max
+        and "glorefs_peak" in variants
         and is_medium_period
         and not is_long_period
     ):
@@ -1845,26 +1847,34 @@ def simple_chart(data, column_name, title, max_y, filepath, output_prefix, **kwa
         )
 
     # Business hours peak chart for selected key metrics (Total CPU, Glorefs)
-    if business_hours_chart and peak_chart and is_medium_period and not is_long_period:
+    if "bh_peak" in variants and is_medium_period and not is_long_period:
         _create_business_hours_peak_chart(
-            png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column, line_chart
+            png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column,
+            peaks["bh_peak"], line_chart,
         )
 
     # Long-period (>25h) supplementary charts
-    if is_long_period and min_max:
-        _create_5min_avg_chart(png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column)
-        _create_daily_summary_chart(png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column)
-        _create_heatmap_chart(png_data, column_name, title, filepath, output_prefix, file_prefix, datetime_column)
-        if day_overlay or column_name in _DAY_OVERLAY_ALWAYS:
-            _create_day_overlay_chart(png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column, line_chart)
+    if is_long_period:
+        if profile is None and ("daily_summary" in variants or "heatmap" in variants or "day_overlay" in variants):
+            profile = _find_day_profiles(png_data, datetime_column, ["metric"]).get("metric")
+        if "5min_avg" in variants:
+            _create_5min_avg_chart(png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column)
+        if "daily_summary" in variants:
+            _create_daily_summary_chart(column_name, title, max_y, filepath, output_prefix, file_prefix, profile)
+        if "heatmap" in variants:
+            _create_heatmap_chart(column_name, title, filepath, output_prefix, file_prefix, profile)
+        if "day_overlay" in variants:
+            _create_day_overlay_chart(column_name, title, max_y, filepath, output_prefix, file_prefix, profile, line_chart)
         # day_overlay HTML is handled by linked_chart via _maybe_day_overlay_html
-        if bh_charts:
-            _create_per_day_bh_peak_charts(png_data, column_name, title, max_y, filepath, output_prefix, file_prefix, datetime_column, line_chart)
+        if "bh_days" in variants:
+            _create_per_day_bh_peak_charts(png_data, column_name, title, max_y, filepath, output_prefix, file_prefix,
+                                           datetime_column, peaks["bh_days"], line_chart)
 
     # Return peak times (useful for Glorefs to pass to other charts)
     return peak_start_time, peak_end_time
 
 
+@chart_progress.timed("base PNG")
 def simple_chart_no_time(data, column_name, title, max_y, filepath, output_prefix, **kwargs):
     file_prefix = kwargs.get("file_prefix", "")
     if file_prefix != "":
@@ -1874,12 +1884,10 @@ def simple_chart_no_time(data, column_name, title, max_y, filepath, output_prefi
     png_data = data.copy()
 
     colormap_name = "Set1"
-    plt.style.use("seaborn-v0_8-whitegrid")
-
     palette = plt.get_cmap(colormap_name)
     color = palette(1)
 
-    fig, ax = plt.subplots(figsize=(16, 6))
+    fig, ax = yaspe_png.figure()
 
     ax.plot(
         png_data["id_key"], png_data["metric"], label=column_name, color=color, marker=".", linestyle="-", alpha=0.7
@@ -1888,7 +1896,7 @@ def simple_chart_no_time(data, column_name, title, max_y, filepath, output_prefi
     ax.set_title(title, fontsize=16)
     ax.set_ylabel(column_name, fontsize=14)
     ax.tick_params(labelsize=14)
-    plt.subplots_adjust(bottom=0.15)
+    fig.subplots_adjust(bottom=0.15)
     ax.set_ylim(bottom=0)  # Always zero start
     if max_y != 0:
         ax.set_ylim(top=max_y)
@@ -1903,13 +1911,13 @@ def simple_chart_no_time(data, column_name, title, max_y, filepath, output_prefi
 
     plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
 
-    plt.tight_layout()
+    fig.tight_layout()
 
     output_name = column_name.replace("/", "_per_").replace(" ", "_")
-    plt.savefig(f"{filepath}{output_prefix}{file_prefix}z_{output_name}.png", format="png", dpi=150)
-    plt.close("all")
+    yaspe_png.save(fig, f"{filepath}{output_prefix}{file_prefix}z_{output_name}.png", tight=False)
 
 
+@chart_progress.timed("stacked PNG")
 def simple_chart_stacked(data, column_names, title, max_y, filepath, output_prefix, **kwargs):
     file_prefix = kwargs.get("file_prefix", "")
     if file_prefix != "":
@@ -1923,21 +1931,17 @@ def simple_chart_stacked(data, column_names, title, max_y, filepath, output_pref
         png_data.set_index("datetime_parsed", inplace=True)
     else:
         # Fall back to original conversion if not available
-        png_data.loc[:, "datetime"] = pd.to_datetime(
-            data["datetime"].apply(guess_datetime_format), format="%m/%d/%Y %H:%M:%S"
-        )
+        png_data.loc[:, "datetime"] = parse_datetimes(data["datetime"])
         png_data.set_index("datetime", inplace=True)
 
     if png_data.empty:
         return
 
     colormap_name = "Set1"
-    plt.style.use("seaborn-v0_8-whitegrid")
-
     palette = plt.get_cmap(colormap_name)
     color = palette(1)
 
-    fig, ax = plt.subplots(figsize=(16, 6))
+    fig, ax = yaspe_png.figure()
 
     ax.stackplot(png_data.index, png_data["sy"], png_data["wa"], png_data["us"], labels=["sy", "wa", "us"], alpha=0.7)
 
@@ -1947,7 +1951,7 @@ def simple_chart_stacked(data, column_names, title, max_y, filepath, output_pref
     ax.set_ylabel("CPU Utilisation %", fontsize=14)
     ax.legend(loc="upper left", reverse=True, fontsize=14)
     ax.tick_params(labelsize=14)
-    plt.subplots_adjust(bottom=0.15)
+    fig.subplots_adjust(bottom=0.15)
     ax.set_ylim(bottom=0)  # Always zero start
     if max_y != 0:
         ax.set_ylim(top=max_y)
@@ -1961,10 +1965,10 @@ def simple_chart_stacked(data, column_names, title, max_y, filepath, output_pref
     plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
 
     output_name = "Stacked CPU"
-    plt.savefig(f"{filepath}{output_prefix}{file_prefix}z_{output_name}.png", format="png", dpi=150)
-    plt.close("all")
+    yaspe_png.save(fig, f"{filepath}{output_prefix}{file_prefix}z_{output_name}.png", tight=False)
 
 
+@chart_progress.timed("stacked PNG")
 def simple_chart_stacked_iostat(data, columns_to_stack, device, title, max_y, filepath, output_prefix, **kwargs):
     file_prefix = kwargs.get("file_prefix", "")
     if file_prefix != "":
@@ -1978,9 +1982,7 @@ def simple_chart_stacked_iostat(data, columns_to_stack, device, title, max_y, fi
         png_data.set_index("datetime_parsed", inplace=True)
     else:
         # Fall back to original conversion if not available
-        png_data.loc[:, "datetime"] = pd.to_datetime(
-            data["datetime"].apply(guess_datetime_format), format="%m/%d/%Y %H:%M:%S"
-        )
+        png_data.loc[:, "datetime"] = parse_datetimes(data["datetime"])
         png_data.set_index("datetime", inplace=True)
 
     # {'r/s': 'Reads per sec', 'w/s': 'Writes per sec'}
@@ -1990,12 +1992,10 @@ def simple_chart_stacked_iostat(data, columns_to_stack, device, title, max_y, fi
     column_1_legend = columns_to_stack[column_1]
 
     colormap_name = "Set1"
-    plt.style.use("seaborn-v0_8-whitegrid")
-
     palette = plt.get_cmap(colormap_name)
     color = palette(1)
 
-    fig, ax = plt.subplots(figsize=(16, 6))
+    fig, ax = yaspe_png.figure()
     ax.stackplot(
         png_data.index,
         png_data[column_0],
@@ -2010,7 +2010,7 @@ def simple_chart_stacked_iostat(data, columns_to_stack, device, title, max_y, fi
     ax.set_ylabel("Total IOPS", fontsize=14)
     ax.legend(loc="upper left", reverse=True)
     ax.tick_params(labelsize=14)
-    plt.subplots_adjust(bottom=0.15)
+    fig.subplots_adjust(bottom=0.15)
     ax.set_ylim(bottom=0)  # Always zero start
     if max_y != 0:
         ax.set_ylim(top=max_y)
@@ -2024,10 +2024,10 @@ def simple_chart_stacked_iostat(data, columns_to_stack, device, title, max_y, fi
     plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
 
     output_name = "Stacked IOPS"
-    plt.savefig(f"{filepath}{output_prefix}{file_prefix}_{device}_z_{output_name}.png", format="png", dpi=150)
-    plt.close("all")
+    yaspe_png.save(fig, f"{filepath}{output_prefix}{file_prefix}_{device}_z_{output_name}.png", tight=False)
 
 
+@chart_progress.timed("latency histogram")
 def simple_chart_histogram_iostat(png_data, columns_to_histogram, device, title, filepath, output_prefix, **kwargs):
     file_prefix = kwargs.get("file_prefix", "")
     if file_prefix != "":
@@ -2049,19 +2049,13 @@ def simple_chart_histogram_iostat(png_data, columns_to_histogram, device, title,
     writes = png_data.loc[mask1, column_1]
 
     colormap_name = "Set1"
-    plt.style.use("seaborn-v0_8-whitegrid")
-
-    plt.figure(num=None, figsize=(16, 6))
-    plt.tight_layout()
-
     palette = plt.get_cmap(colormap_name)
 
     color = palette(1)
 
     # Reads
 
-    fig, ax = plt.subplots()
-    plt.gcf().set_size_inches(16, 6)
+    fig, ax = yaspe_png.figure()
 
     ax.hist(reads, bins=10, edgecolor="black")
 
@@ -2071,17 +2065,15 @@ def simple_chart_histogram_iostat(png_data, columns_to_histogram, device, title,
     ax.set_ylabel("Frequency", fontsize=14)
 
     ax.tick_params(labelsize=14)
-    plt.subplots_adjust(bottom=0.15)
+    fig.subplots_adjust(bottom=0.15)
     plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
 
     output_name = "Read Latency Histogram"
-    plt.savefig(f"{filepath}{output_prefix}{file_prefix}_{device}_z_{output_name}.png", format="png", dpi=150)
-    plt.close("all")
+    yaspe_png.save(fig, f"{filepath}{output_prefix}{file_prefix}_{device}_z_{output_name}.png", tight=False)
 
     # Writes
 
-    fig, ax = plt.subplots()
-    plt.gcf().set_size_inches(16, 6)
+    fig, ax = yaspe_png.figure()
 
     ax.hist(writes, bins=10, edgecolor="black")
 
@@ -2091,12 +2083,11 @@ def simple_chart_histogram_iostat(png_data, columns_to_histogram, device, title,
     ax.set_ylabel("Frequency", fontsize=14)
 
     ax.tick_params(labelsize=14)
-    plt.subplots_adjust(bottom=0.15)
+    fig.subplots_adjust(bottom=0.15)
     plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
 
     output_name = "Write Latency Histogram"
-    plt.savefig(f"{filepath}{output_prefix}{file_prefix}_{device}_z_{output_name}.png", format="png", dpi=150)
-    plt.close("all")
+    yaspe_png.save(fig, f"{filepath}{output_prefix}{file_prefix}_{device}_z_{output_name}.png", tight=False)
 
 
 def chart_vmstat(
@@ -2111,6 +2102,10 @@ def chart_vmstat(
     day_overlay=False,
     bh_charts=False,
     long_period_smooth=5,
+    dashboard_bundle=None,
+    chart_cache=None,
+    selection=None,
+    rollups=None,
 ):
     # print(f"vmstat...")
     # Get useful
@@ -2124,7 +2119,7 @@ def chart_vmstat(
 
     # Read in to dataframe, drop any bad rows
     try:
-        df = pd.read_sql_query("SELECT * FROM vmstat", connection)
+        df = pd.read_sql_query(_select_rows("vmstat", rollups), connection)
     except DatabaseError as e:
         # Check if the error message indicates a missing table
         if "no such table" in str(e):
@@ -2141,23 +2136,31 @@ def chart_vmstat(
 
     # *** NEW CODE: Pre-process datetime conversion once ***
     # Create a cached datetime column
-    df["datetime_parsed"] = pd.to_datetime(df["datetime"].apply(guess_datetime_format), format="%m/%d/%Y %H:%M:%S")
+    df["datetime_parsed"] = parse_datetimes(df["datetime"], get_profile_run_date(connection))
     df.sort_values("datetime_parsed", inplace=True)
 
     png_filepath, html_filepath = _split_filepath(filepath, png_html_out)
+    dashboard = _new_dashboard(html_filepath, f"{output_prefix}vmstat", f"vmstat - {customer}",
+                               dashboard_bundle, png_out, png_html_out)
 
     # Create stacked CPU chart if columns exist
     if png_out or png_html_out:
         if "sy" in df.columns and "wa" in df.columns and "us" in df.columns:
             title = f"CPU utilisation % - {customer}"
             title += f"\n{number_cpus} cores ({processor})"
-            simple_chart_stacked(df, "sy, wa, us", title, 100, png_filepath, output_prefix)
+            for frame, frame_filepath in _increment_frames(rollups, df, png_filepath):
+                simple_chart_stacked(frame, "sy, wa, us", title, 100, frame_filepath, output_prefix)
 
     # Format the data for Altair
     # Cut down the df to just the list of categorical data we care about (columns)
     columns_to_chart = list(df.columns)
     unwanted_columns = ["id_key", "RunDate", "RunTime", "html name", "hr", "datetime_parsed"]  # Add datetime_parsed
     columns_to_chart = [ele for ele in columns_to_chart if ele not in unwanted_columns]
+    columns_to_chart = _select_columns(selection, "vmstat", columns_to_chart)
+    _plan_columns("vmstat", columns_to_chart)
+    # Peak windows and multi-day aggregates for every column in one pass; the chart helpers only look them up
+    peaks = _find_peak_windows(df, "datetime_parsed", columns_to_chart) if png_out or png_html_out else {}
+    profiles = _find_day_profiles(df, "datetime_parsed", columns_to_chart, rollups, "vmstat")
 
     vmstat_df = df[columns_to_chart + ["datetime_parsed"]]  # Add datetime_parsed to preserved columns
 
@@ -2190,6 +2193,8 @@ def chart_vmstat(
 
             data = to_chart_df
 
+            variants = _selected_variants(selection, "vmstat", column_name)
+
             # Reference threshold lines for key CPU metrics
             threshold = None
             if column_name in ("Total CPU", "us"):
@@ -2198,7 +2203,8 @@ def chart_vmstat(
                 threshold = (10, "10% iowait threshold")
 
             if png_out or png_html_out:
-                simple_chart(
+                _cached_chart(
+                    chart_cache, simple_chart,
                     data,
                     column_name,
                     title,
@@ -2214,17 +2220,39 @@ def chart_vmstat(
                     day_overlay=day_overlay,
                     bh_charts=bh_charts,
                     long_period_smooth=long_period_smooth,
+                    variants=variants,
+                    profile=profiles.get(column_name),
+                    rollups=rollups,
+                    peaks=peaks.get(column_name),
                 )
                 if png_html_out:
-                    linked_chart(data, column_name, title, max_y, html_filepath, output_prefix,
-                                 min_max=min_max, threshold=threshold, day_overlay=day_overlay)
+                    _cached_chart(
+                        chart_cache, linked_chart, data, column_name, title, max_y, html_filepath, output_prefix,
+                        min_max=min_max, threshold=threshold, day_overlay=day_overlay, dashboard=dashboard,
+                        variants=variants,
+                        profile=profiles.get(column_name),
+                        rollups=rollups,
+                    )
             else:
-                linked_chart(data, column_name, title, max_y, filepath, output_prefix,
-                             min_max=min_max, threshold=threshold, day_overlay=day_overlay)
+                _cached_chart(
+                    chart_cache, linked_chart, data, column_name, title, max_y, filepath, output_prefix,
+                    min_max=min_max, threshold=threshold, day_overlay=day_overlay, dashboard=dashboard,
+                    variants=variants,
+                    profile=profiles.get(column_name),
+                    rollups=rollups,
+                )
+            chart_progress.tick()
+
+    if dashboard is not None:
+        dashboard.write()
 
 
 def chart_mgstat(
     connection, filepath, output_prefix, png_out, png_html_out, mgstat_file, peak_chart=True, line_chart=True, day_overlay=False, bh_charts=False, long_period_smooth=5,
+    dashboard_bundle=None,
+    chart_cache=None,
+    selection=None,
+    rollups=None,
 ):
     """
     Chart mgstat data. Returns the Glorefs peak window (start, end) if available, otherwise (None, None).
@@ -2241,9 +2269,12 @@ def chart_mgstat(
         print("mgstat only")
         customer = "mgstat"
 
+    dashboard = _new_dashboard(html_filepath, f"{output_prefix}mgstat", f"mgstat - {customer}",
+                               dashboard_bundle, png_out, png_html_out)
+
     # Read in to dataframe, drop any bad rows
     try:
-        df = pd.read_sql_query("SELECT * FROM mgstat", connection)
+        df = pd.read_sql_query(_select_rows("mgstat", rollups), connection)
     except DatabaseError as e:
         # Check if the error message indicates a missing table
         if "no such table" in str(e):
@@ -2259,7 +2290,7 @@ def chart_mgstat(
 
     # *** NEW CODE: Pre-process datetime conversion once ***
     # Create a cached datetime column - do this once for all charts
-    df["datetime_parsed"] = pd.to_datetime(df["datetime"].apply(guess_datetime_format), format="%m/%d/%Y %H:%M:%S")
+    df["datetime_parsed"] = parse_datetimes(df["datetime"], get_profile_run_date(connection))
     df.sort_values("datetime_parsed", inplace=True)
 
     # Format the data for Altair
@@ -2273,6 +2304,11 @@ def chart_mgstat(
         "datetime_parsed",
     ]  # Add datetime_parsed to unwanted
     columns_to_chart = [ele for ele in columns_to_chart if ele not in unwanted_columns]
+    columns_to_chart = _select_columns(selection, "mgstat", columns_to_chart)
+    _plan_columns("mgstat", columns_to_chart)
+    # Peak windows and multi-day aggregates for every column in one pass; the chart helpers only look them up
+    peaks = _find_peak_windows(df, "datetime_parsed", columns_to_chart) if png_out or png_html_out else {}
+    profiles = _find_day_profiles(df, "datetime_parsed", columns_to_chart, rollups, "mgstat")
 
     # Include datetime_parsed in the dataframe we'll be charting, but not as a column to chart
     mgstat_df = df[columns_to_chart + ["datetime_parsed"]]
@@ -2295,6 +2331,8 @@ def chart_mgstat(
             max_y = to_chart_df["metric"].max()
 
             data = to_chart_df
+
+            variants = _selected_variants(selection, "mgstat", column_name)
             if column_name in (
                 "Glorefs",
                 "RemGrefs",
@@ -2310,7 +2348,8 @@ def chart_mgstat(
                 min_max = True
 
             if png_out or png_html_out:
-                peak_start, peak_end = simple_chart(
+                peak_start, peak_end = _cached_chart(
+                    chart_cache, simple_chart,
                     data,
                     column_name,
                     title,
@@ -2324,16 +2363,34 @@ def chart_mgstat(
                     day_overlay=day_overlay,
                     bh_charts=bh_charts,
                     long_period_smooth=long_period_smooth,
+                    variants=variants,
+                    profile=profiles.get(column_name),
+                    rollups=rollups,
+                    peaks=peaks.get(column_name),
                 )
                 # Capture Glorefs peak window
                 if column_name == "Glorefs" and peak_start is not None:
                     glorefs_peak_window = (peak_start, peak_end)
                 if png_html_out:
-                    linked_chart(data, column_name, title, max_y, html_filepath, output_prefix,
-                                 min_max=min_max, day_overlay=day_overlay)
+                    _cached_chart(
+                        chart_cache, linked_chart, data, column_name, title, max_y, html_filepath, output_prefix,
+                        min_max=min_max, day_overlay=day_overlay, dashboard=dashboard,
+                        variants=variants,
+                        profile=profiles.get(column_name),
+                        rollups=rollups,
+                    )
             else:
-                linked_chart(data, column_name, title, max_y, filepath, output_prefix,
-                             min_max=min_max, day_overlay=day_overlay)
+                _cached_chart(
+                    chart_cache, linked_chart, data, column_name, title, max_y, filepath, output_prefix,
+                    min_max=min_max, day_overlay=day_overlay, dashboard=dashboard,
+                    variants=variants,
+                    profile=profiles.get(column_name),
+                    rollups=rollups,
+                )
+            chart_progress.tick()
+
+    if dashboard is not None:
+        dashboard.write()
 
     return glorefs_peak_window
 
@@ -2350,6 +2407,10 @@ def chart_perfmon(
     day_overlay=False,
     bh_charts=False,
     long_period_smooth=5,
+    dashboard_bundle=None,
+    chart_cache=None,
+    selection=None,
+    rollups=None,
 ):
     # print(f"perfmon...")
 
@@ -2358,7 +2419,7 @@ def chart_perfmon(
 
     # Read in to dataframe, drop any bad rows
     try:
-        df = pd.read_sql_query("SELECT * FROM perfmon", connection)
+        df = pd.read_sql_query(_select_rows("perfmon", rollups), connection)
     except DatabaseError as e:
         # Check if the error message indicates a missing table
         if "no such table" in str(e):
@@ -2375,7 +2436,7 @@ def chart_perfmon(
         df["datetime"] = df["Time"]  # Adjust based on actual perfmon data structure
 
     # Parse the datetime column once for all charts
-    df["datetime_parsed"] = pd.to_datetime(df["datetime"].apply(guess_datetime_format), format="%m/%d/%Y %H:%M:%S")
+    df["datetime_parsed"] = parse_datetimes(df["datetime"], get_profile_run_date(connection))
     df.sort_values("datetime_parsed", inplace=True)
 
     # Format the data for Altair
@@ -2383,6 +2444,11 @@ def chart_perfmon(
     columns_to_chart = list(df.columns)
     unwanted_columns = ["id_key", "Time", "html name", "datetime_parsed"]  # Add datetime_parsed to unwanted
     columns_to_chart = [ele for ele in columns_to_chart if ele not in unwanted_columns]
+    columns_to_chart = _select_columns(selection, "perfmon", columns_to_chart)
+    _plan_columns("perfmon", columns_to_chart)
+    # Peak windows and multi-day aggregates for every column in one pass; the chart helpers only look them up
+    peaks = _find_peak_windows(df, "datetime_parsed", columns_to_chart) if png_out or png_html_out else {}
+    profiles = _find_day_profiles(df, "datetime_parsed", columns_to_chart, rollups, "perfmon")
 
     # Include datetime_parsed in the dataframe we'll be charting, but not as a column to chart
     perfmon_df = df[columns_to_chart + ["datetime_parsed"]]
@@ -2404,6 +2470,8 @@ def chart_perfmon(
     ]
 
     png_filepath, html_filepath = _split_filepath(filepath, png_html_out)
+    dashboard = _new_dashboard(html_filepath, f"{output_prefix}perfmon", f"perfmon - {customer}",
+                               dashboard_bundle, png_out, png_html_out)
 
     for column_name in columns_to_chart:
         if column_name == "datetime":
@@ -2429,19 +2497,40 @@ def chart_perfmon(
 
             data = to_chart_df
 
+            variants = _selected_variants(selection, "perfmon", column_name)
+
             if png_out or png_html_out:
-                simple_chart(
+                _cached_chart(
+                    chart_cache, simple_chart,
                     data, column_name, title, max_y, png_filepath, output_prefix,
                     min_max=min_max, peak_chart=peak_chart, glorefs_peak_window=glorefs_peak_window,
                     line_chart=line_chart, business_hours_chart=min_max, day_overlay=day_overlay,
                     bh_charts=bh_charts, long_period_smooth=long_period_smooth,
+                    variants=variants,
+                    profile=profiles.get(column_name),
+                    rollups=rollups,
+                    peaks=peaks.get(column_name),
                 )
                 if png_html_out:
-                    linked_chart(data, column_name, title, max_y, html_filepath, output_prefix,
-                                 min_max=min_max, day_overlay=day_overlay)
+                    _cached_chart(
+                        chart_cache, linked_chart, data, column_name, title, max_y, html_filepath, output_prefix,
+                        min_max=min_max, day_overlay=day_overlay, dashboard=dashboard,
+                        variants=variants,
+                        profile=profiles.get(column_name),
+                        rollups=rollups,
+                    )
             else:
-                linked_chart(data, column_name, title, max_y, filepath, output_prefix,
-                             min_max=min_max, day_overlay=day_overlay)
+                _cached_chart(
+                    chart_cache, linked_chart, data, column_name, title, max_y, filepath, output_prefix,
+                    min_max=min_max, day_overlay=day_overlay, dashboard=dashboard,
+                    variants=variants,
+                    profile=profiles.get(column_name),
+                    rollups=rollups,
+                )
+            chart_progress.tick()
+
+    if dashboard is not None:
+        dashboard.write()
 
 
 def chart_iostat(
@@ -2460,6 +2549,10 @@ def chart_iostat(
     bh_charts=False,
     long_period_smooth=5,
     device_labels=None,
+    dashboard_bundle=None,
+    chart_cache=None,
+    selection=None,
+    rollups=None,
 ):
     # print(f"iostat...")
 
@@ -2490,7 +2583,7 @@ def chart_iostat(
 
     # Read in to dataframe, drop any bad rows
     try:
-        df = pd.read_sql_query("SELECT * FROM iostat", connection)
+        df = pd.read_sql_query(_select_rows("iostat", rollups), connection)
     except DatabaseError as e:
         # Check if the error message indicates a missing table
         if "no such table" in str(e):
@@ -2511,7 +2604,7 @@ def chart_iostat(
 
         # *** NEW CODE: Pre-process datetime conversion once ***
         # Create a cached datetime column - do this once for all charts
-        df["datetime_parsed"] = pd.to_datetime(df["datetime"].apply(guess_datetime_format), format="%m/%d/%Y %H:%M:%S")
+        df["datetime_parsed"] = parse_datetimes(df["datetime"], get_profile_run_date(connection))
         df.sort_values(["datetime_parsed", "Device"], inplace=True)
 
         # Format the data for Altair
@@ -2522,6 +2615,8 @@ def chart_iostat(
 
         iostat_df = df[columns_to_chart + ["datetime_parsed"]]  # Include datetime_parsed
         devices = iostat_df["Device"].unique()
+        # The stacked IOPS and latency charts use the whole device frame, the per-column charts only the selection
+        columns_to_chart = _select_columns(selection, "iostat", columns_to_chart)
 
         # If a disk list has been passed in. Validate the list.
         if disk_list:
@@ -2530,10 +2625,10 @@ def chart_iostat(
                 # print(f"Only devices: {disk_list}")
                 devices = disk_list
 
-        # Chart each disk
-        for device in devices:
-            device_df = iostat_df.loc[iostat_df["Device"] == device]
+        _plan_columns("iostat", columns_to_chart, devices)
 
+        # Chart each disk
+        for device, device_df in _device_frames(iostat_df, "Device", devices).items():
             if iostat_subfolders:
                 device_dirname = _device_slug(device)
                 device_filepath = f"{filepath}{device_dirname}/"
@@ -2543,47 +2638,49 @@ def chart_iostat(
                 device_filepath = filepath
 
             dev_png_fp, dev_html_fp = _split_filepath(device_filepath, png_html_out)
+            dashboard = _new_dashboard(dev_html_fp, f"{output_prefix}iostat_{device}", f"iostat {device} - {customer}",
+                                       dashboard_bundle, png_out, png_html_out)
 
             # Create stacked read write chart if columns exist
             if png_out or png_html_out:
                 _chart_label = _device_chart_label(device)
-                if operating_system == "AIX":
-                    # Something wrong with the way stacked charts come out base is not zero and a fake base rises l-r
-
-                    if "read rps" in device_df.columns and "write wps" in device_df.columns:
-                        title = f"{device} : Total IOPS - {customer}"
-                        columns_to_stack = {"read rps": "Reads per sec", "write wps": "Writes per sec"}
-                        simple_chart_stacked_iostat(
-                            device_df, columns_to_stack, device, title, 0, dev_png_fp, output_prefix
-                        )
+                for frame, frame_filepath in _increment_frames(rollups, device_df, dev_png_fp):
+                    if operating_system == "AIX":
+                        # Something wrong with the way stacked charts come out base is not zero and a fake base rises l-r
 
-                        if "read avg serv" in device_df.columns and "write avg serv" in device_df.columns:
-                            title = f"{device} : Latency - {customer}"
-                            columns_to_histogram = {"read avg serv": "read rps", "write avg serv": "write wps"}
-                            simple_chart_histogram_iostat(
-                                device_df, columns_to_histogram, device, title, dev_png_fp, output_prefix
+                        if "read rps" in device_df.columns and "write wps" in device_df.columns:
+                            title = f"{device} : Total IOPS - {customer}"
+                            columns_to_stack = {"read rps": "Reads per sec", "write wps": "Writes per sec"}
+                            simple_chart_stacked_iostat(
+                                frame, columns_to_stack, device, title, 0, frame_filepath, output_prefix
                             )
 
-                else:
-                    if "r/s" in device_df.columns and "w/s" in device_df.columns:
-                        _stacked_title = f"{device} : Total IOPS - {customer}"
-                        columns_to_stack = {"r/s": "Reads per sec", "w/s": "Writes per sec"}
-                        simple_chart_stacked_iostat(
-                            device_df, columns_to_stack, device, _stacked_title, 0, dev_png_fp, output_prefix
-                        )
+                            if "read avg serv" in device_df.columns and "write avg serv" in device_df.columns:
+                                title = f"{device} : Latency - {customer}"
+                                columns_to_histogram = {"read avg serv": "read rps", "write avg serv": "write wps"}
+                                simple_chart_histogram_iostat(
+                                    frame, columns_to_histogram, device, title, frame_filepath, output_prefix
+                                )
 
-                        if "r_await" in device_df.columns and "w_await" in device_df.columns:
-                            _lat_title = f"{device} : Latency - {customer}"
-                            # Column name : check for non-zero column
-                            columns_to_histogram = {"r_await": "r/s", "w_await": "w/s"}
-                            simple_chart_histogram_iostat(
-                                device_df, columns_to_histogram, device, _lat_title, dev_png_fp, output_prefix
+                    else:
+                        if "r/s" in device_df.columns and "w/s" in device_df.columns:
+                            _stacked_title = f"{device} : Total IOPS - {customer}"
+                            columns_to_stack = {"r/s": "Reads per sec", "w/s": "Writes per sec"}
+                            simple_chart_stacked_iostat(
+                                frame, columns_to_stack, device, _stacked_title, 0, frame_filepath, output_prefix
                             )
 
-            # unpivot the dataframe; include both datetime and datetime_parsed as id_vars
-            device_df = device_df.melt(
-                id_vars=["datetime", "datetime_parsed", "Device"], var_name="Type", value_name="metric"
-            )
+                            if "r_await" in device_df.columns and "w_await" in device_df.columns:
+                                _lat_title = f"{device} : Latency - {customer}"
+                                # Column name : check for non-zero column
+                                columns_to_histogram = {"r_await": "r/s", "w_await": "w/s"}
+                                simple_chart_histogram_iostat(
+                                    frame, columns_to_histogram, device, _lat_title, frame_filepath, output_prefix
+                                )
+
+            # Peak windows and multi-day aggregates for every column in one pass; the chart helpers only look them up
+            peaks = _find_peak_windows(device_df, "datetime_parsed", columns_to_chart) if png_out or png_html_out else {}
+            profiles = _find_day_profiles(device_df, "datetime_parsed", columns_to_chart, rollups, f"iostat:{device}")
 
             # For each column create a chart
             for column_name in columns_to_chart:
@@ -2593,7 +2690,7 @@ def chart_iostat(
                     _chart_label = _device_chart_label(device)
                     title = f"{device} : {column_name} - {customer}"
 
-                    to_chart_df = device_df.loc[device_df["Type"] == column_name]
+                    to_chart_df = _metric_frame(device_df, column_name, ["datetime", "datetime_parsed", "Device"])
 
                     # Remove outliers first, will result in nan for zero values, so needs more work
                     # to_chart_df = to_chart_df[((to_chart_df.metric - to_chart_df.metric.mean()) / to_chart_df.metric.std()).abs() < 3]
@@ -2601,6 +2698,8 @@ def chart_iostat(
 
                     data = to_chart_df
 
+                    variants = _selected_variants(selection, "iostat", column_name)
+
                     min_max = False
                     if column_name in ("r/s", "w/s", "r_await", "w_await"):
                         min_max = True
@@ -2611,7 +2710,8 @@ def chart_iostat(
                         threshold = (1, "1 ms latency target")
 
                     if png_out or png_html_out:
-                        simple_chart(
+                        _cached_chart(
+                            chart_cache, simple_chart,
                             data,
                             column_name,
                             title,
@@ -2629,15 +2729,33 @@ def chart_iostat(
                             bh_charts=bh_charts,
                             long_period_smooth=long_period_smooth,
                             chart_label=_chart_label,
+                            variants=variants,
+                            profile=profiles.get(column_name),
+                            rollups=rollups,
+                            peaks=peaks.get(column_name),
                         )
                         if png_html_out:
-                            linked_chart(data, column_name, title, max_y, dev_html_fp, output_prefix,
-                                         file_prefix=device, min_max=min_max, threshold=threshold,
-                                         day_overlay=day_overlay, chart_label=_chart_label)
+                            _cached_chart(
+                                chart_cache, linked_chart, data, column_name, title, max_y, dev_html_fp, output_prefix,
+                                file_prefix=device, min_max=min_max, threshold=threshold,
+                                day_overlay=day_overlay, chart_label=_chart_label, dashboard=dashboard,
+                                variants=variants,
+                                profile=profiles.get(column_name),
+                                rollups=rollups,
+                            )
                     else:
-                        linked_chart(data, column_name, title, max_y, device_filepath, output_prefix,
-                                     file_prefix=device, min_max=min_max, threshold=threshold,
-                                     day_overlay=day_overlay, chart_label=_chart_label)
+                        _cached_chart(
+                            chart_cache, linked_chart, data, column_name, title, max_y, device_filepath, output_prefix,
+                            file_prefix=device, min_max=min_max, threshold=threshold,
+                            day_overlay=day_overlay, chart_label=_chart_label, dashboard=dashboard,
+                            variants=variants,
+                            profile=profiles.get(column_name),
+                            rollups=rollups,
+                        )
+                    chart_progress.tick()
+
+            if dashboard is not None:
+                dashboard.write()
 
     else:
         # No date or time, chart all columns, index is x axis
@@ -2645,6 +2763,7 @@ def chart_iostat(
         columns_to_chart = list(df.columns)
         unwanted_columns = ["id_key", "html name"]
         columns_to_chart = [ele for ele in columns_to_chart if ele not in unwanted_columns]
+        columns_to_chart = _select_columns(selection, "iostat", columns_to_chart)
 
         iostat_df = df
         devices = iostat_df["Device"].unique()
@@ -2656,10 +2775,10 @@ def chart_iostat(
                 # print(f"Only devices: {disk_list}")
                 devices = disk_list
 
-        # Chart each disk
-        for device in devices:
-            device_df = iostat_df.loc[iostat_df["Device"] == device]
+        _plan_columns("iostat", columns_to_chart, devices)
 
+        # Chart each disk
+        for device, device_df in _device_frames(iostat_df, "Device", devices).items():
             if iostat_subfolders:
                 device_dirname = _device_slug(device)
                 device_filepath = f"{filepath}{device_dirname}/"
@@ -2670,16 +2789,13 @@ def chart_iostat(
 
             dev_png_fp, dev_html_fp = _split_filepath(device_filepath, png_html_out)
 
-            # unpivot the dataframe; first column is index, column name is next, then the value in that column
-            device_df = device_df.melt("id_key", var_name="Type", value_name="metric")
-
             # For each column create a chart
             for column_name in columns_to_chart:
                 if not column_name == "Device":
                     _chart_label = _device_chart_label(device)
                     title = f"{device} : {column_name} - {customer}"
 
-                    to_chart_df = device_df.loc[device_df["Type"] == column_name]
+                    to_chart_df = _metric_frame(device_df, column_name, ["id_key"])
 
                     # Remove outliers first, will result in nan for zero values, so needs more work
                     # to_chart_df = to_chart_df[((to_chart_df.metric - to_chart_df.metric.mean()) / to_chart_df.metric.std()).abs() < 3]
@@ -2701,6 +2817,7 @@ def chart_iostat(
                     else:
                         linked_chart_no_time(data, column_name, title, max_y,
                                              device_filepath, output_prefix, file_prefix=device)
+                    chart_progress.tick()
 
 
 def chart_nfsiostat(connection, filepath, output_prefix, operating_system, png_out, png_html_out, peak_chart=True, line_chart=True, iostat_subfolders=False):
@@ -2727,11 +2844,10 @@ def chart_nfsiostat(connection, filepath, output_prefix, operating_system, png_o
 
     nfsiostat_df = df
     devices = nfsiostat_df["Device"].unique()
+    _plan_columns("nfsiostat", columns_to_chart, devices)
 
     # Chart each disk
-    for device in devices:
-        device_df = nfsiostat_df.loc[nfsiostat_df["Device"] == device]
-
+    for device, device_df in _device_frames(nfsiostat_df, "Device", devices).items():
         if iostat_subfolders:
             device_filepath = _make_chart_dir(filepath.rstrip("/"), device.replace("/", "_"))
         else:
@@ -2739,15 +2855,12 @@ def chart_nfsiostat(connection, filepath, output_prefix, operating_system, png_o
 
         dev_png_fp, dev_html_fp = _split_filepath(device_filepath, png_html_out)
 
-        # unpivot the dataframe; first column is index, column name is next, then the value in that column
-        device_df = device_df.melt("id_key", var_name="Type", value_name="metric")
-
         # For each column create a chart
         for column_name in columns_to_chart:
             if not column_name == "Device":
                 title = f"{device} : {column_name} - {customer}"
 
-                to_chart_df = device_df.loc[device_df["Type"] == column_name]
+                to_chart_df = _metric_frame(device_df, column_name, ["id_key"])
 
                 # Remove outliers first, will result in nan for zero values, so needs more work
                 # to_chart_df = to_chart_df[((to_chart_df.metric - to_chart_df.metric.mean()) / to_chart_df.metric.std()).abs() < 3]
@@ -2764,6 +2877,7 @@ def chart_nfsiostat(connection, filepath, output_prefix, operating_system, png_o
                 else:
                     linked_chart_no_time(data, column_name, title, max_y,
                                          device_filepath, output_prefix, file_prefix=pfx)
+                chart_progress.tick()
 
 
 def chart_aix_sar_d(
@@ -2778,6 +2892,8 @@ def chart_aix_sar_d(
     line_chart=True,
     iostat_subfolders=False,
     day_overlay=False,
+    bh_charts=False,
+    long_period_smooth=5,
 ):
     customer = get_chart_title_base(connection)
 
@@ -2810,12 +2926,12 @@ def chart_aix_sar_d(
             # print(f"Only devices: {disk_list}")
             devices = disk_list
 
+    _plan_columns("sar_d", columns_to_chart, devices)
+
     min_max = False
 
     # Chart each disk
-    for device in devices:
-        device_df = aix_sar_d_df.loc[aix_sar_d_df["device"] == device]
-
+    for device, device_df in _device_frames(aix_sar_d_df, "device", devices).items():
         if iostat_subfolders:
             device_filepath = _make_chart_dir(filepath.rstrip("/"), device)
         else:
@@ -2823,9 +2939,6 @@ def chart_aix_sar_d(
 
         dev_png_fp, dev_html_fp = _split_filepath(device_filepath, png_html_out)
 
-        # unpivot the dataframe; first column is index, column name is next, then the value in that column
-        device_df = device_df.melt("datetime", var_name="Type", value_name="metric")
-
         # For each column create a chart
         for column_name in columns_to_chart:
             if column_name == "datetime" or column_name == "device":
@@ -2833,7 +2946,7 @@ def chart_aix_sar_d(
             else:
                 title = f"{device} : {column_name} - {customer}"
 
-                to_chart_df = device_df.loc[device_df["Type"] == column_name]
+                to_chart_df = _metric_frame(device_df, column_name, ["datetime"])
 
                 # Remove outliers first, will result in nan for zero values, so needs more work
                 # to_chart_df = to_chart_df[((to_chart_df.metric - to_chart_df.metric.mean()) / to_chart_df.metric.std()).abs() < 3]
@@ -2854,14 +2967,16 @@ def chart_aix_sar_d(
                 else:
                     linked_chart(data, column_name, title, max_y, device_filepath, output_prefix,
                                  file_prefix=pfx, min_max=min_max, day_overlay=day_overlay)
+                chart_progress.tick()
 
 
-def chart_free_memory(connection, filepath, output_prefix, png_out, png_html_out, peak_chart=True, line_chart=True, day_overlay=False):
+def chart_free_memory(connection, filepath, output_prefix, png_out, png_html_out, peak_chart=True, line_chart=True, day_overlay=False, dashboard_bundle=None, chart_cache=None,
+                      selection=None, rollups=None):
     customer = get_chart_title_base(connection)
 
     # Read in to dataframe, drop any bad rows
     try:
-        df = pd.read_sql_query("SELECT * FROM free_memory", connection)
+        df = pd.read_sql_query(_select_rows("free_memory", rollups), connection)
     except DatabaseError as e:
         # Check if the error message indicates a missing table
         if "no such table" in str(e):
@@ -2876,13 +2991,18 @@ def chart_free_memory(connection, filepath, output_prefix, png_out, png_html_out
     df["datetime"] = df["RunDate"] + " " + df["RunTime"]
 
     # Pre-process datetime conversion once
-    df["datetime_parsed"] = pd.to_datetime(df["datetime"].apply(guess_datetime_format), format="%m/%d/%Y %H:%M:%S")
+    df["datetime_parsed"] = parse_datetimes(df["datetime"], get_profile_run_date(connection))
     df.sort_values("datetime_parsed", inplace=True)
 
     # Format the data for charting
     columns_to_chart = list(df.columns)
     unwanted_columns = ["id_key", "RunDate", "RunTime", "html name", "datetime_parsed"]
     columns_to_chart = [ele for ele in columns_to_chart if ele not in unwanted_columns]
+    columns_to_chart = _select_columns(selection, "free_memory", columns_to_chart)
+    _plan_columns("free_memory", columns_to_chart)
+    # Peak windows and multi-day aggregates for every column in one pass; the chart helpers only look them up
+    peaks = _find_peak_windows(df, "datetime_parsed", columns_to_chart) if png_out or png_html_out else {}
+    profiles = _find_day_profiles(df, "datetime_parsed", columns_to_chart, rollups, "free_memory")
 
     free_df = df[columns_to_chart + ["datetime_parsed"]]
 
@@ -2890,6 +3010,8 @@ def chart_free_memory(connection, filepath, output_prefix, png_out, png_html_out
     free_df = free_df.melt(id_vars=["datetime", "datetime_parsed"], var_name="Type", value_name="metric")
 
     png_filepath, html_filepath = _split_filepath(filepath, png_html_out)
+    dashboard = _new_dashboard(html_filepath, f"{output_prefix}free_memory", f"free memory - {customer}",
+                               dashboard_bundle, png_out, png_html_out)
 
     # For each column create a chart
     for column_name in columns_to_chart:
@@ -2901,22 +3023,42 @@ def chart_free_memory(connection, filepath, output_prefix, png_out, png_html_out
 
             max_y = to_chart_df["metric"].max()
             data = to_chart_df
+            variants = _selected_variants(selection, "free_memory", column_name)
 
             # Add min/max lines for key memory metrics
             min_max = column_name in ("used", "free", "available")
 
             if png_out or png_html_out:
-                simple_chart(
+                _cached_chart(
+                    chart_cache, simple_chart,
                     data, column_name, title, max_y, png_filepath, output_prefix,
                     min_max=min_max, peak_chart=peak_chart, line_chart=line_chart,
                     business_hours_chart=min_max, day_overlay=day_overlay,
+                    variants=variants,
+                    profile=profiles.get(column_name),
+                    rollups=rollups,
+                    peaks=peaks.get(column_name),
                 )
                 if png_html_out:
-                    linked_chart(data, column_name, title, max_y, html_filepath, output_prefix,
-                                 min_max=min_max, day_overlay=day_overlay)
+                    _cached_chart(
+                        chart_cache, linked_chart, data, column_name, title, max_y, html_filepath, output_prefix,
+                        min_max=min_max, day_overlay=day_overlay, dashboard=dashboard,
+                        variants=variants,
+                        profile=profiles.get(column_name),
+                        rollups=rollups,
+                    )
             else:
-                linked_chart(data, column_name, title, max_y, filepath, output_prefix,
-                             min_max=min_max, day_overlay=day_overlay)
+                _cached_chart(
+                    chart_cache, linked_chart, data, column_name, title, max_y, filepath, output_prefix,
+                    min_max=min_max, day_overlay=day_overlay, dashboard=dashboard,
+                    variants=variants,
+                    profile=profiles.get(column_name),
+                    rollups=rollups,
+                )
+            chart_progress.tick()
+
+    if dashboard is not None:
+        dashboard.write()
 
 
 def _make_chart_dir(base, name):
@@ -2933,6 +3075,201 @@ def _split_filepath(fp, png_html_out):
     return _make_chart_dir(fp.rstrip("/"), "png"), _make_chart_dir(fp.rstrip("/"), "html")
 
 
+def _device_frames(df, device_column, devices):
+    """{device: rows} for each of devices, splitting df in one pass rather than one scan per device."""
+    groups = dict(tuple(df.groupby(device_column, sort=False)))
+    return {device: groups[device] for device in devices if device in groups}
+
+
+def _metric_frame(wide, column_name, id_columns):
+    """One column of a wide frame in the long layout the chart functions take:
+    id_columns, Type (column_name) and metric. The same rows as a melt filtered on Type,
+    without melting every column."""
+    frame = wide[id_columns].copy()
+    frame["Type"] = column_name
+    frame["metric"] = wide[column_name]
+    return frame
+
+
+def _wants_source(selection, source):
+    """Whether to chart source (folder name) under --metrics / --chart-manifest."""
+    return selection is None or selection.wants_source(source)
+
+
+def _select_columns(selection, source, columns):
+    """Columns of source to chart under --metrics / --chart-manifest (all of them without a selection)."""
+    if selection is None:
+        return columns
+    return selection.columns(source, columns, keep=("datetime", "Device"))
+
+
+def _selected_variants(selection, source, column_name):
+    """Chart variants for simple_chart / linked_chart, None for the defaults.
+    A sorted tuple so the chart cache hash does not depend on set order."""
+    if selection is None:
+        return None
+    variants = selection.variants(source, column_name)
+    return None if variants is None else tuple(sorted(variants))
+
+
+def _increment(rollups):
+    """The ChartIncrement of an incremental run, otherwise None."""
+    return rollups.increment if rollups is not None else None
+
+
+def _select_rows(table_name, rollups):
+    """SELECT for a source table: every row, or in an incremental run only the rows it charts."""
+    increment = _increment(rollups)
+    if increment is None:
+        return f"SELECT * FROM {table_name}"
+    return increment.select(table_name)
+
+
+def _has_new_rows(rollups, table_name):
+    """False when an incremental run has nothing new to chart for table_name."""
+    increment = _increment(rollups)
+    return increment is None or increment.has_rows(table_name)
+
+
+# Columns that label rows rather than hold a metric to chart
+_NOT_CHARTED = {"id_key", "RunDate", "RunTime", "html name", "hr", "datetime", "datetime_parsed", "Device", "device",
+                "Host", "Mounted on"}
+
+
+def _plan_columns(source, columns, devices=None):
+    """Tell chart_progress how many charts source draws: one per column (and device)."""
+    chart_progress.plan(source, len([column for column in columns if column not in _NOT_CHARTED]), devices)
+
+
+def _plan_charts(connection, operating_system, include_iostat, include_nfsiostat, selection, disk_list, rollups):
+    """Estimate the charts of each source mainline will chart from the table columns, before reading any rows.
+    Each chart function corrects its estimate with _plan_columns once it has the data."""
+    is_unix = operating_system in ("Linux", "Ubuntu", "AIX")
+    sources = [("mgstat", "mgstat", None)]
+    if is_unix:
+        sources.append(("vmstat", "vmstat", None))
+        if operating_system in ("Linux", "Ubuntu"):
+            sources.append(("free_memory", "free_memory", None))
+        if include_iostat:
+            sources.append(("iostat", "iostat", "Device"))
+            if operating_system == "AIX":
+                sources.append(("sar_d", "aix_sar_d", "device"))
+        if include_nfsiostat:
+            sources.append(("nfsiostat", "nfsiostat", "Device"))
+    if operating_system == "Windows":
+        sources.append(("perfmon", "perfmon", None))
+
+    for source, table_name, device_column in sources:
+        if not _wants_source(selection, source) or not _has_new_rows(rollups, table_name):
+            continue
+        columns = [row[1] for row in connection.execute(f'PRAGMA table_info("{table_name}")')]
+        if not columns:  # No such table
+            continue
+        # Columns the chart functions add
+        if source == "vmstat" and "id" in columns:
+            columns.append("Total CPU")
+        if source == "iostat" and "r/s" in columns and "w/s" in columns:
+            columns.append("Total IOPS")
+        if source not in ("nfsiostat", "sar_d"):
+            columns = _select_columns(selection, source, columns)
+        devices = None
+        if device_column is not None:
+            devices = [row[0] for row in connection.execute(f'SELECT DISTINCT "{device_column}" FROM "{table_name}"')]
+            if disk_list and set(disk_list).intersection(devices):
+                devices = list(set(disk_list).intersection(devices))
+        _plan_columns(source, columns, devices)
+
+
+def _increment_frames(rollups, frame, filepath):
+    """(frame, filepath) to chart: as given, or in an incremental run the rows of each appended
+    input file, charted into a folder of their own named after the file."""
+    increment = _increment(rollups)
+    if increment is None:
+        yield frame, filepath
+        return
+    for name, rows in increment.slices(frame, "datetime_parsed"):
+        yield rows, _make_chart_dir(filepath.rstrip("/"), name)
+
+
+def _cached_chart(chart_cache, chart_fn, data, column_name, title, max_y, filepath, output_prefix, rollups=None,
+                  **kwargs):
+    """Call chart_fn (simple_chart or linked_chart), skipping it when chart_cache says the chart is unchanged.
+    No caching without a chart_cache (-e runs only) or when the chart goes into a dashboard.
+    In an incremental run (see chart_rollups) the call is split by _incremental_chart."""
+    if _increment(rollups) is not None:
+        return _incremental_chart(chart_cache, chart_fn, data, column_name, title, max_y, filepath, output_prefix,
+                                  rollups, **kwargs)
+    if chart_cache is None or kwargs.get("dashboard") is not None:
+        return chart_fn(data, column_name, title, max_y, filepath, output_prefix, **kwargs)
+    file_prefix = kwargs.get("file_prefix", "")
+    key = f"{filepath}{output_prefix}{file_prefix}:{chart_fn.__name__}:{column_name}"
+    params = dict(title=title, max_y=max_y, **kwargs)
+    # Found from the column's data, which the hash already covers
+    params.pop("peaks", None)
+    params.pop("profile", None)
+    return chart_cache.render(
+        key, filepath, data, params,
+        lambda: chart_fn(data, column_name, title, max_y, filepath, output_prefix, **kwargs),
+    )
+
+
+def _incremental_chart(chart_cache, chart_fn, data, column_name, title, max_y, filepath, output_prefix, rollups,
+                       **kwargs):
+    """chart_fn for an incremental run. data holds the appended rows plus any earlier rows on the same days.
+
+    Each appended input file's rows get the full chart set in a folder of their own (_increment_frames),
+    then the daily summary, heatmap and day overlay over all days are redrawn in filepath from the
+    rollup profile. max_y follows the data charted unless the source fixed it (e.g. 100 for CPU %).
+    Returns the result for the last appended file, e.g. its Glorefs peak window.
+    """
+    profile = kwargs.pop("profile", None)
+    kwargs.pop("peaks", None)
+    data_max = data["metric"].max()
+
+    result = None
+    for frame, frame_filepath in _increment_frames(rollups, data, filepath):
+        frame_max_y = frame["metric"].max() if max_y == data_max else max_y
+        result = _cached_chart(chart_cache, chart_fn, frame, column_name, title, frame_max_y, frame_filepath,
+                               output_prefix, **kwargs)
+
+    if profile is None:
+        return result
+    if max_y == data_max:
+        max_y = profile["max"]
+    file_prefix = kwargs.get("file_prefix", "")
+    if file_prefix != "":
+        file_prefix = f"{file_prefix}_"
+    variants = kwargs.get("variants")
+
+    if chart_fn is simple_chart:
+        if variants is None:
+            variants = _default_variants(
+                column_name, kwargs.get("min_max", False), kwargs.get("peak_chart", True),
+                kwargs.get("business_hours_chart", False), kwargs.get("day_overlay", False), kwargs.get("bh_charts", False),
+            )
+        if "daily_summary" in variants:
+            _create_daily_summary_chart(column_name, title, max_y, filepath, output_prefix, file_prefix, profile)
+        if "heatmap" in variants:
+            _create_heatmap_chart(column_name, title, filepath, output_prefix, file_prefix, profile)
+        if "day_overlay" in variants:
+            _create_day_overlay_chart(column_name, title, max_y, filepath, output_prefix, file_prefix, profile,
+                                      kwargs.get("line_chart", True))
+    else:
+        day_overlay = "day_overlay" in variants if variants is not None else kwargs.get("day_overlay", False)
+        if day_overlay or column_name in _DAY_OVERLAY_ALWAYS:
+            _create_day_overlay_html(column_name, title, max_y, filepath, output_prefix, file_prefix, profile,
+                                     kwargs.get("dashboard"))
+    return result
+
+
+def _new_dashboard(html_filepath, name, title, dashboard_bundle, png_out, png_html_out):
+    """Dashboard collecting a source's HTML charts when --dashboard is active (dashboard_bundle is
+    the shared plotly.min.js), otherwise None and each chart is written as its own HTML file."""
+    if dashboard_bundle is None or (png_out and not png_html_out):
+        return None
+    return yaspe_html.Dashboard(html_filepath, name, title, dashboard_bundle)
+
+
 def mainline(
     input_file,
     include_iostat,
@@ -2953,13 +3290,20 @@ def mainline(
     iostat_subfolders=True,
     smooth_minutes=5,
     day_overlay=False,
-    bh_charts=False,
+    bh_charts=True,
     long_period_smooth=5,
     context=None,
     llm_context=False,
     resample_interval=None,
     combined_overlay=False,
     all_disks=False,
+    dashboard=False,
+    chart_cache=True,
+    chart_selection=None,
+    incremental_chart=False,
+    token_budget=None,
+    history_baselines=False,
+    llm_workers=1,
 ):
     input_error = False
     sp_dict = None
@@ -3129,13 +3473,20 @@ def mainline(
                 except Exception:
                     sp_dict = {}
             import llm_context as _llm_context
-            bundle_path, prompt_path = _llm_context.export_llm_context(
-                connection=llm_conn,
-                sp_dict=sp_dict,
-                filepath=filepath,
-                resample_interval=resample_interval,
-                context=context,
-            )
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always", UserWarning)
+                bundle_path, prompt_path = _llm_context.export_llm_context(
+                    connection=llm_conn,
+                    sp_dict=sp_dict,
+                    filepath=filepath,
+                    resample_interval=resample_interval,
+                    context=context,
+                    token_budget=token_budget,
+                    history_baselines=history_baselines,
+                    workers=llm_workers,
+                )
+            for warning in caught:
+                print(f"Warning: {warning.message}", file=sys.stderr)
             print(f"LLM context bundle: {bundle_path}")
             print(f"LLM analysis prompt: {prompt_path}")
         finally:
@@ -3147,24 +3498,37 @@ def mainline(
         if not os.path.isdir(output_file_path_base):
             os.mkdir(output_file_path_base)
 
+        # --dashboard: one index page per source, all sharing a single local plotly.min.js
+        dashboard_bundle = None
+        if dashboard and (png_html_out or not png_out):
+            dashboard_bundle = yaspe_html.write_plotly_bundle(output_file_path_base)
+
+        # -e re-chart runs skip charts whose data and options are unchanged since the last run
+        cache = None
+        if chart_cache and existing_database:
+            cache = ChartCache(output_file_path_base)
+
         if connection is None:
             connection = create_connection(sql_filename)
 
+        # Unselected runs keep per-day rollups; --incremental-chart after -a appends only charts the new input files
+        rollups = None
+        if chart_selection is None:
+            increment = None
+            if cache is not None and incremental_chart and dashboard_bundle is None:
+                increment = chart_rollups.ChartIncrement.pending(connection)
+            rollups = chart_rollups.RollupStore(connection, increment)
+            if increment is not None:
+                print(f"Incremental charting: {increment.describe()}; "
+                      f"full-period charts are not redrawn (run -e without --incremental-chart to redraw them)")
+
         try:
+            operating_system = None
             if not mgstat_file:
                 operating_system = execute_single_read_query(
                     connection, "SELECT * FROM overview WHERE field = 'operating system';"
                 )[2]
 
-            glorefs_peak_window = chart_mgstat(
-                connection, _make_chart_dir(output_file_path_base, "mgstat"),
-                output_prefix, png_out, png_html_out, mgstat_file, peak_chart, line_chart, day_overlay, bh_charts, long_period_smooth,
-            )
-
-            # No need to go further for .mgst file
-            if mgstat_file:
-                return
-
             is_unix = operating_system in ("Linux", "Ubuntu", "AIX")
             is_linux = operating_system in ("Linux", "Ubuntu")
 
@@ -3209,54 +3573,89 @@ def mainline(
                     disk_list = auto_devices
                     print(f"  Auto disk list from CPF: {disk_list}")
 
+            # Count the charts up front for the progress and ETA lines (stderr)
+            progress = chart_progress.start()
+            _plan_charts(connection, operating_system, include_iostat, include_nfsiostat, chart_selection, disk_list,
+                         rollups)
+            print(f"Charting {progress.describe_plan()}", file=sys.stderr)
+
+            glorefs_peak_window = (None, None)
+            if _wants_source(chart_selection, "mgstat") and _has_new_rows(rollups, "mgstat"):
+                glorefs_peak_window = chart_mgstat(
+                    connection, _make_chart_dir(output_file_path_base, "mgstat"),
+                    output_prefix, png_out, png_html_out, mgstat_file, peak_chart, line_chart, day_overlay, bh_charts, long_period_smooth,
+                    dashboard_bundle=dashboard_bundle, chart_cache=cache, selection=chart_selection, rollups=rollups,
+                )
+
+            # No need to go further for .mgst file
+            if mgstat_file:
+                if rollups is not None:
+                    chart_rollups.mark_charted(connection)
+                return
+
             if is_unix:
                 if extended_charts:
                     system_review.system_charts(filepath)
 
-                chart_vmstat(
-                    connection, _make_chart_dir(output_file_path_base, "vmstat"),
-                    output_prefix, png_out, png_html_out, peak_chart, glorefs_peak_window, line_chart, day_overlay, bh_charts, long_period_smooth,
-                )
+                if _wants_source(chart_selection, "vmstat") and _has_new_rows(rollups, "vmstat"):
+                    chart_vmstat(
+                        connection, _make_chart_dir(output_file_path_base, "vmstat"),
+                        output_prefix, png_out, png_html_out, peak_chart, glorefs_peak_window, line_chart, day_overlay, bh_charts, long_period_smooth,
+                        dashboard_bundle=dashboard_bundle, chart_cache=cache, selection=chart_selection, rollups=rollups,
+                    )
 
-                if is_linux:
+                if is_linux and _wants_source(chart_selection, "free_memory") and _has_new_rows(rollups, "free_memory"):
                     chart_free_memory(
                         connection, _make_chart_dir(output_file_path_base, "free_memory"),
                         output_prefix, png_out, png_html_out, peak_chart, line_chart, day_overlay,
+                        dashboard_bundle=dashboard_bundle, chart_cache=cache, selection=chart_selection, rollups=rollups,
                     )
 
-                if include_iostat:
+                if include_iostat and _wants_source(chart_selection, "iostat") and _has_new_rows(rollups, "iostat"):
                     chart_iostat(
                         connection, _make_chart_dir(output_file_path_base, "iostat"),
                         output_prefix, operating_system, png_out, png_html_out,
                         disk_list, peak_chart, glorefs_peak_window, line_chart, iostat_subfolders, day_overlay, bh_charts, long_period_smooth,
-                        device_labels=device_labels,
+                        device_labels=device_labels, dashboard_bundle=dashboard_bundle, chart_cache=cache,
+                        selection=chart_selection, rollups=rollups,
                     )
 
+                if include_iostat and _wants_source(chart_selection, "sar_d"):
                     if operating_system == "AIX":
                         chart_aix_sar_d(
                             connection, _make_chart_dir(output_file_path_base, "sar_d"),
                             output_prefix, operating_system, png_out, png_html_out,
-                            disk_list, peak_chart, line_chart, iostat_subfolders, day_overlay,
+                            disk_list, peak_chart, line_chart, iostat_subfolders, day_overlay, bh_charts, long_period_smooth,
                         )
 
-                if include_nfsiostat:
+                if include_nfsiostat and _wants_source(chart_selection, "nfsiostat"):
                     chart_nfsiostat(
                         connection, _make_chart_dir(output_file_path_base, "nfsiostat"),
                         output_prefix, operating_system, png_out, png_html_out, peak_chart, line_chart,
                         iostat_subfolders,
                     )
 
-            if operating_system == "Windows":
+            if (operating_system == "Windows" and _wants_source(chart_selection, "perfmon")
+                    and _has_new_rows(rollups, "perfmon")):
                 chart_perfmon(
                     connection, _make_chart_dir(output_file_path_base, "perfmon"),
                     output_prefix, png_out, png_html_out, peak_chart, glorefs_peak_window, line_chart, day_overlay,
+                    dashboard_bundle=dashboard_bundle, chart_cache=cache, selection=chart_selection, rollups=rollups,
                 )
 
+            if rollups is not None:
+                chart_rollups.mark_charted(connection)
+
         finally:
+            chart_progress.finish()
             close_connection(connection)
+            if cache is not None:
+                cache.save()
+                print(f"Charts: {cache.drawn} drawn, {cache.skipped} unchanged since last run (skipped)")
 
         if combined_overlay or not png_out:
-            yaspe_combined_overlay.run(sql_filename, output_file_path_base, smooth_minutes=smooth_minutes)
+            yaspe_combined_overlay.run(sql_filename, output_file_path_base, smooth_minutes=smooth_minutes,
+                                       plotlyjs=yaspe_html.PLOTLY_BUNDLE_NAME if dashboard_bundle else "cdn")
 
 
     return
@@ -3464,8 +3863,16 @@ if __name__ == "__main__":
     parser.add_argument(
         "--bh-charts",
         dest="bh_charts",
-        help="Create per-day business-hours peak charts for multi-day data (slow; off by default).",
+        help=argparse.SUPPRESS,  # kept for old scripts, per-day BH charts are on by default
         action="store_true",
+        default=True,
+    )
+
+    parser.add_argument(
+        "--no-bh-charts",
+        dest="bh_charts",
+        help="Do not create per-day business-hours peak charts.",
+        action="store_false",
     )
 
     parser.add_argument(
@@ -3477,6 +3884,52 @@ if __name__ == "__main__":
         metavar="N",
     )
 
+    parser.add_argument(
+        "--dashboard",
+        dest="dashboard",
+        help="Write one HTML dashboard per source (mgstat, vmstat, each iostat device...) instead of one "
+             "HTML file per metric. Charts load as you scroll and use a single local plotly.min.js, "
+             "so the output works offline.",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--metrics",
+        dest="metrics",
+        help='Only chart these columns, comma separated, optionally source qualified and with wildcards '
+             '(e.g. "Glorefs,PhyRds,vmstat:Total CPU,perfmon:*Processor_Time*"). Unlisted sources are skipped.',
+        action="store",
+        metavar='"Glorefs,vmstat:Total CPU"',
+    )
+
+    parser.add_argument(
+        "--chart-manifest",
+        dest="chart_manifest",
+        help="YAML file listing the sources, columns and chart variants to draw "
+             "(base, peak60, bh_peak, glorefs_peak, 5min_avg, daily_summary, heatmap, day_overlay, bh_days). "
+             "Everything not listed is skipped. See chart_selection.py for the format.",
+        action="store",
+        metavar="manifest.yml",
+    )
+
+    parser.add_argument(
+        "--no-chart-cache",
+        dest="no_chart_cache",
+        help="With -e, redraw every chart. By default charts whose data and options are unchanged "
+             "since the last -e run are skipped (see chart_manifest.json in the metrics folder).",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--incremental-chart",
+        dest="incremental_chart",
+        help="With -e after -a appends, chart only the appended input files (into their own folders) and "
+             "bring the daily summary, heatmap and day overlay charts up to date. The charts over the whole "
+             "period (base, N-minute average, business hours per day) are left as they were. By default "
+             "every chart is redrawn over the whole period.",
+        action="store_true",
+    )
+
     parser.add_argument(
         "--context",
         dest="context",
@@ -3506,6 +3959,36 @@ if __name__ == "__main__":
         metavar="INTERVAL",
     )
 
+    parser.add_argument(
+        "--token-budget",
+        dest="token_budget",
+        help="Size the LLM context bundle to about N tokens: timeseries intervals are chosen per "
+             "section, finer around findings, coarser elsewhere. Replaces --resample.",
+        action="store",
+        type=int,
+        default=None,
+        metavar="N",
+    )
+
+    parser.add_argument(
+        "--history-baselines",
+        dest="history_baselines",
+        help="With --llm-context on a database that captures are appended to: the bundle covers the last "
+             "capture loaded, and its mgstat baselines (and the findings judged against them) come from every "
+             "capture loaded (the first -i run and each -a append), without re-reading their samples.",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--llm-workers",
+        dest="llm_workers",
+        help="With --llm-context, run the cross-signal correlation tests on N threads (default: 1).",
+        action="store",
+        type=int,
+        default=1,
+        metavar="N",
+    )
+
     args = parser.parse_args()
 
     if args.compare_dir is not None:
@@ -3543,9 +4026,31 @@ if __name__ == "__main__":
     # yaml input
     site_survey_input = {}
 
+    # --metrics / --chart-manifest: chart only what is listed
+    chart_selection = None
+    option = "--chart-manifest"
+    try:
+        if args.chart_manifest is not None:
+            chart_selection = ChartSelection.from_manifest(args.chart_manifest)
+        if args.metrics is not None:
+            option = "--metrics"
+            metrics_selection = ChartSelection.from_metrics(args.metrics)
+            chart_selection = metrics_selection if chart_selection is None else chart_selection.merge(metrics_selection)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        print(f"Error: {option}: {e}")
+        sys.exit(1)
+
     if args.llm_context:
         args.system_out = True
 
+    if args.token_budget is not None and (args.token_budget <= 0 or args.resample_interval):
+        print("Error: --token-budget needs a positive number of tokens and cannot be used with --resample")
+        sys.exit()
+
+    if args.llm_workers < 1:
+        print("Error: --llm-workers needs at least 1 thread")
+        sys.exit(1)
+
     try:
         mainline(
             input_file,
@@ -3574,6 +4079,13 @@ if __name__ == "__main__":
             args.resample_interval,
             args.combined_overlay,
             all_disks=args.all_disks,
+            dashboard=args.dashboard,
+            chart_cache=not args.no_chart_cache,
+            incremental_chart=args.incremental_chart,
+            chart_selection=chart_selection,
+            token_budget=args.token_budget,
+            history_baselines=args.history_baselines,
+            llm_workers=args.llm_workers,
         )
     except OSError as e:
         print("Could not process files because: {}".format(str(e)))
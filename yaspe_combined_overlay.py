@@ -11,6 +11,8 @@ import sqlite3
 import pandas as pd
 import plotly.graph_objects as go
 
+import yaspe_html
+
 
 _OVERVIEW_ZOOM_JS = """
 (function() {
@@ -206,6 +208,7 @@ def _build_combined_chart(
     vm_dt_col: str,
     output_path: str,
     smooth_minutes: float = 5,
+    plotlyjs: str = "cdn",
 ) -> None:
     """Build and write the combined Plotly HTML chart.
 
@@ -225,45 +228,69 @@ def _build_combined_chart(
     mgstat_df[mg_dt_col] = pd.to_datetime(mgstat_df[mg_dt_col])
     mgstat_df = mgstat_df.sort_values(mg_dt_col)
 
+    # Large captures switch every trace to WebGL (see yaspe_html).
+    vm_points = len(vmstat_df)
+    mg_points = len(mgstat_df)
+    vm_webgl = yaspe_html.use_webgl(vm_points)
+    # Time as epoch ms (or x0/dx when evenly spaced) rather than ISO strings, see yaspe_html
+    vm_time = yaspe_html.time_kwargs(vmstat_df[vm_dt_col])
+    mg_time = yaspe_html.time_kwargs(mgstat_df[mg_dt_col])
+
     # --- CPU stacked areas on yaxis (left, main row) ---
+    cpu_series = {}
     for col in _CPU_COLS:
         if col not in vmstat_df.columns:
             print(f"  Skipping missing column: {col}")
             continue
-        series = _smooth(pd.to_numeric(vmstat_df[col], errors="coerce"),
-                         vmstat_df[vm_dt_col], smooth_minutes)
-        color = _CPU_COLORS[col]
-        fig.add_trace(go.Scatter(
-            x=vmstat_df[vm_dt_col],
-            y=series,
+        cpu_series[col] = _smooth(pd.to_numeric(vmstat_df[col], errors="coerce"),
+                                  vmstat_df[vm_dt_col], smooth_minutes)
+
+    # Main bands first, then their overview mirrors: under WebGL each band
+    # fills to the previous trace, so the two stacks must not interleave.
+    below = None
+    band_traces = {}
+    for col, series in cpu_series.items():
+        band, below = yaspe_html.stacked_area_kwargs(
+            series, below, "cpu", vm_webgl,
+            hovertemplate="%{x}<br>" + col + ": %{y:.1f}<extra></extra>",
+        )
+        band_traces[col] = len(fig.data)
+        fig.add_trace(yaspe_html.scatter_trace(
+            vm_points,
+            **vm_time,
             mode="lines",
             name=col,
             xaxis="x", yaxis="y",
-            stackgroup="cpu",
             visible=True if col in _DEFAULT_VISIBLE else "legendonly",
-            line=dict(width=0.5, color=color),
-            hovertemplate="%{x}<br>" + col + ": %{y:.1f}<extra></extra>",
+            line=dict(width=0.5, color=_CPU_COLORS[col]),
+            **band,
         ))
-        # Overview panel: mirror CPU stacked area
-        fig.add_trace(go.Scatter(
-            x=vmstat_df[vm_dt_col],
-            y=series,
+    # Overview panel: mirror CPU stacked area, drawn from the main bands' data
+    below = None
+    for col, series in cpu_series.items():
+        band, below = yaspe_html.stacked_area_kwargs(series, below, "cpu_overview", vm_webgl)
+        del band["y"]
+        band.pop("customdata", None)
+        fig.add_trace(yaspe_html.scatter_trace(
+            vm_points,
+            **yaspe_html.shared_data(band_traces[col]),
             mode="lines",
             name=col,
             xaxis="x2", yaxis="y8",
-            stackgroup="cpu_overview",
             showlegend=False,
-            line=dict(width=0.8, color=color),
+            line=dict(width=0.8, color=_CPU_COLORS[col]),
             hoverinfo="skip",
+            **band,
         ))
 
     # --- Total CPU line on yaxis (left, main row) ---
     if "Total CPU" in vmstat_df.columns:
         series = _smooth(pd.to_numeric(vmstat_df["Total CPU"], errors="coerce"),
                          vmstat_df[vm_dt_col], smooth_minutes)
-        fig.add_trace(go.Scatter(
-            x=vmstat_df[vm_dt_col],
-            y=series,
+        fig.add_trace(yaspe_html.scatter_trace(
+            vm_points,
+            **vm_time,
+            y=yaspe_html.compact_values(series),
             mode="lines",
             name="Total CPU",
             xaxis="x", yaxis="y",
@@ -281,9 +308,10 @@ def _build_combined_chart(
             continue
         series = _smooth(pd.to_numeric(mgstat_df[col], errors="coerce"),
                          mgstat_df[mg_dt_col], smooth_minutes)
-        fig.add_trace(go.Scatter(
-            x=mgstat_df[mg_dt_col],
-            y=series,
+        fig.add_trace(yaspe_html.scatter_trace(
+            mg_points,
+            **mg_time,
+            y=yaspe_html.compact_values(series),
             mode="lines",
             name=col,
             xaxis="x", yaxis="y2",
@@ -299,9 +327,10 @@ def _build_combined_chart(
             continue
         series = _smooth(pd.to_numeric(mgstat_df[col], errors="coerce"),
                          mgstat_df[mg_dt_col], smooth_minutes)
-        fig.add_trace(go.Scatter(
-            x=mgstat_df[mg_dt_col],
-            y=series,
+        fig.add_trace(yaspe_html.scatter_trace(
+            mg_points,
+            **mg_time,
+            y=yaspe_html.compact_values(series),
             mode="lines",
             name=col,
             xaxis="x", yaxis=_ROU_YAXIS[col],
@@ -346,7 +375,7 @@ def _build_combined_chart(
             xanchor="center",
         ),
         # Main row axes
-        xaxis=dict(tickfont=dict(size=11), anchor="y"),
+        xaxis=dict(tickfont=dict(size=11), anchor="y", type="date"),
         yaxis=dict(
             title="CPU %",
             tickfont=dict(size=12),
@@ -368,6 +397,7 @@ def _build_combined_chart(
             title="Drag box here to zoom ↑   (double-click top chart to reset)",
             tickfont=dict(size=11),
             anchor="y8",
+            type="date",
         ),
         yaxis8=dict(
             domain=[0.0, 0.22],
@@ -389,15 +419,19 @@ def _build_combined_chart(
     os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
     fig.write_html(
         output_path,
-        include_plotlyjs="cdn",
-        post_script=_OVERVIEW_ZOOM_JS + _AXIS_TOGGLE_JS,
+        include_plotlyjs=plotlyjs,
+        post_script=yaspe_html.SHARED_DATA_JS + _OVERVIEW_ZOOM_JS + _AXIS_TOGGLE_JS,
         full_html=True,
     )
     print(f"  Written: {output_path}")
 
 
-def run(sql_path: str, output_dir: str, smooth_minutes: float = 5) -> None:
-    """Public entry point. Called by yaspe.py when --combined is given."""
+def run(sql_path: str, output_dir: str, smooth_minutes: float = 5, plotlyjs: str = "cdn") -> None:
+    """Public entry point. Called by yaspe.py when --combined is given.
+
+    plotlyjs is passed to write_html's include_plotlyjs: "cdn", or the path of a
+    local plotly.min.js relative to output_dir (--dashboard).
+    """
     mgstat_df, vmstat_df = _load_dataframes(sql_path)
 
     if mgstat_df.empty:
@@ -419,4 +453,4 @@ def run(sql_path: str, output_dir: str, smooth_minutes: float = 5) -> None:
 
     output_path = os.path.join(output_dir, "combined_overlay.html")
     _build_combined_chart(mgstat_df, vmstat_df, mg_dt_col, vm_dt_col,
-                          output_path, smooth_minutes=smooth_minutes)
+                          output_path, smooth_minutes=smooth_minutes, plotlyjs=plotlyjs)
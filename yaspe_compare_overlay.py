@@ -9,10 +9,10 @@ import sqlite3
 from pathlib import Path
 
 import pandas as pd
-import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 import sp_check
+import yaspe_html
 
 
 _COLORS = [
@@ -229,16 +229,19 @@ def _write_overlay_html(datasets: list, column_name: str, metric_type: str, outp
         x_ref = [_normalise_to_timeofday(ts) for ts in df[dt_col]]
         actual_times = [ts.strftime("%a %d-%b-%Y %H:%M:%S") for ts in df[dt_col]]
 
-        fig.add_trace(go.Scatter(
-            x=x_ref, y=smoothed.values,
+        source = len(fig.data)
+        fig.add_trace(yaspe_html.scatter_trace(
+            len(smoothed),
+            **yaspe_html.time_kwargs(x_ref), y=yaspe_html.compact_values(smoothed),
             mode="lines", name=label,
             line=dict(width=1.5, color=color),
             customdata=actual_times,
             hovertemplate="%{customdata}<br>" + column_name + ": %{y:,.3g}<extra></extra>",
         ), row=1, col=1)
 
-        fig.add_trace(go.Scatter(
-            x=x_ref, y=smoothed.values,
+        fig.add_trace(yaspe_html.scatter_trace(
+            len(smoothed),
+            **yaspe_html.shared_data(source),
             mode="lines", name=label,
             line=dict(width=0.8, color=color),
             showlegend=False,
@@ -252,11 +255,12 @@ def _write_overlay_html(datasets: list, column_name: str, metric_type: str, outp
             x=0.5,
             xanchor="center",
         ),
-        xaxis=dict(title="Time of day", tickfont=dict(size=13), tickformat="%H:%M"),
+        xaxis=dict(title="Time of day", tickfont=dict(size=13), tickformat="%H:%M", type="date"),
         xaxis2=dict(
             title="Drag box here to zoom ↑   (double-click top chart to reset)",
             tickfont=dict(size=11),
             tickformat="%H:%M",
+            type="date",
         ),
         yaxis=dict(title=column_name, tickfont=dict(size=13), rangemode="tozero"),
         yaxis2=dict(rangemode="tozero", showticklabels=False),
@@ -275,7 +279,7 @@ def _write_overlay_html(datasets: list, column_name: str, metric_type: str, outp
     fig.write_html(
         out_path,
         include_plotlyjs="cdn",
-        post_script=_OVERVIEW_ZOOM_JS,
+        post_script=yaspe_html.SHARED_DATA_JS + _OVERVIEW_ZOOM_JS,
         full_html=True,
     )
 
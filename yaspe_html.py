@@ -0,0 +1,380 @@
+# yaspe_html.py
+"""
+Shared helpers for the Plotly HTML chart writers (yaspe.linked_chart,
+yaspe_combined_overlay and yaspe_compare_overlay), and the offline
+per-source dashboards written with --dashboard.
+"""
+
+import html
+import json
+import os
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+from plotly.offline import get_plotlyjs
+
+
+# Above this many points a trace is drawn with WebGL (go.Scattergl) instead of
+# SVG. SVG scatter becomes unusable in the browser at around 100k points per
+# trace; a 24-hour 1-second capture (86,400 points) is already sluggish.
+WEBGL_POINT_THRESHOLD = 50_000
+
+
+def use_webgl(n_points) -> bool:
+    """True when a trace of n_points should be rendered with WebGL."""
+    return n_points is not None and n_points > WEBGL_POINT_THRESHOLD
+
+
+def scatter_trace(n_points, **kwargs):
+    """go.Scatter for small traces, go.Scattergl once n_points exceeds the threshold.
+
+    Scattergl has no stackgroup; callers with stacked areas use stacked_area_kwargs.
+    """
+    if use_webgl(n_points):
+        return go.Scattergl(**kwargs)
+    return go.Scatter(**kwargs)
+
+
+def stacked_area_kwargs(series, below, stackgroup, webgl, hovertemplate=None):
+    """Trace kwargs for one band of a stacked area chart.
+
+    SVG: plotly stacks the band itself via stackgroup.
+    WebGL: Scattergl cannot stack, so the band is stacked here (cumulative sum
+    on top of `below`) and filled to the previous band. The unstacked value is
+    carried in customdata and %{y...} in hovertemplate is pointed at it, so
+    hover still shows the band's own value rather than the running total.
+
+    Returns (kwargs, below) where below is passed to the next band (None for
+    the first band).
+    """
+    values = np.asarray(series, dtype="float64")
+    if not webgl:
+        kwargs = dict(y=compact_values(values), stackgroup=stackgroup)
+        if hovertemplate is not None:
+            kwargs["hovertemplate"] = hovertemplate
+        return kwargs, below
+    top = np.nan_to_num(values) + (below if below is not None else 0.0)
+    kwargs = dict(
+        y=compact_values(top),
+        fill="tozeroy" if below is None else "tonexty",
+        customdata=compact_values(values),
+    )
+    if hovertemplate is not None:
+        kwargs["hovertemplate"] = hovertemplate.replace("%{y", "%{customdata")
+    return kwargs, top
+
+
+# plotly.py writes numpy arrays into the HTML as base64 typed arrays, but
+# datetimes as ISO strings and every value as float64. A float32 copy is used
+# when the round trip is below the finest hover format (4 decimal places).
+FLOAT32_MAX_ERROR = 0.00005
+
+
+def epoch_ms(times):
+    """Datetimes as float64 epoch milliseconds for a date axis (xaxis type="date").
+
+    Naive times are kept as wall-clock times: plotly reads the numbers as UTC,
+    which it displays without any offset.
+    """
+    values = np.asarray(pd.to_datetime(times), dtype="datetime64[ms]")
+    return values.astype("int64").astype("float64")
+
+
+def time_kwargs(times):
+    """Trace kwargs for x on a date axis: x0/dx for evenly spaced samples (no x
+    array at all), otherwise x as epoch ms."""
+    x = epoch_ms(times)
+    if len(x) > 2:
+        steps = np.diff(x)
+        if steps[0] > 0 and (steps == steps[0]).all():
+            return dict(x0=x[0], dx=steps[0])
+    return dict(x=x)
+
+
+def compact_values(values):
+    """values as float32 when that loses nothing a chart shows, otherwise float64."""
+    values = np.asarray(values, dtype="float64")
+    compact = values.astype("float32")
+    with np.errstate(invalid="ignore", over="ignore"):
+        error = np.abs(compact.astype("float64") - values)
+    if np.nan_to_num(error, nan=0.0, posinf=np.inf).max(initial=0.0) <= FLOAT32_MAX_ERROR:
+        return compact
+    return values
+
+
+def shared_data(source_index):
+    """Trace kwargs for a trace drawn from the data of trace source_index (e.g. an
+    overview mirror). The trace is written without data; SHARED_DATA_JS or the
+    dashboard loader points it at the source trace's arrays in the browser."""
+    return dict(meta=dict(yaspe_data_from=source_index))
+
+
+_SHARED_DATA_FN = """
+function yaspeSharedData(data) {
+    var pairs = [];
+    data.forEach(function(trace, i) {
+        var from = trace.meta && trace.meta.yaspe_data_from;
+        if (from !== undefined) pairs.push([i, from]);
+    });
+    return pairs;
+}
+"""
+
+SHARED_DATA_JS = _SHARED_DATA_FN + """
+(function(gd) {
+var pairs = yaspeSharedData(gd.data);
+if (!pairs.length) return;
+var update = {};
+['x', 'x0', 'dx', 'y'].forEach(function(key) {
+    // null (reset to default) where the source trace does not use the key
+    update[key] = pairs.map(function(p) {
+        var value = gd.data[p[1]][key];
+        return value === undefined ? null : value;
+    });
+});
+Plotly.restyle(gd, update, pairs.map(function(p) { return p[0]; }));
+})(document.querySelector('.plotly-graph-div'));
+"""
+
+
+# Overview/zoom behaviour for the two-panel charts: drag a box on the overview
+# (xaxis2) to zoom the main chart (xaxis), double-click or Reset Zoom to reset.
+# Written as the body of a function of the graph div so the single-chart pages
+# (post_script) and the dashboards (one call per lazily drawn chart) share it.
+_OVERVIEW_ZOOM_BODY = """
+var syncing = false;
+var zoomRange = null;
+
+function noHighlightShapes() {
+    return (gd.layout.shapes || []).filter(function(s) { return !s._yaspe_highlight; });
+}
+
+function applyHighlight(r0, r1) {
+    var shapes = noHighlightShapes().concat([{
+        _yaspe_highlight: true,
+        type: 'rect', xref: 'x2', yref: 'y2 domain',
+        x0: r0, x1: r1, y0: 0, y1: 1,
+        fillcolor: 'rgba(255,165,0,0.3)',
+        line: {color: 'rgba(255,140,0,0.7)', width: 1},
+        layer: 'above'
+    }]);
+    syncing = true;
+    Plotly.relayout(gd, {shapes: shapes}).then(function() { syncing = false; });
+}
+
+function resetAll() {
+    zoomRange = null;
+    syncing = true;
+    Plotly.relayout(gd, {
+        'xaxis.autorange': true,
+        'xaxis2.autorange': true,
+        shapes: noHighlightShapes()
+    }).then(function() { syncing = false; btn.style.display = 'none'; });
+}
+
+gd.on('plotly_relayout', function(eventdata) {
+    if (syncing) return;
+    var r0 = eventdata['xaxis2.range[0]'];
+    var r1 = eventdata['xaxis2.range[1]'];
+    if (r0 !== undefined && r1 !== undefined) {
+        // User dragged on overview: zoom top chart, snap overview back, draw highlight
+        zoomRange = [r0, r1];
+        syncing = true;
+        Plotly.relayout(gd, {
+            'xaxis.range[0]': r0, 'xaxis.range[1]': r1,
+            'xaxis.autorange': false,
+            'xaxis2.autorange': true
+        }).then(function() { syncing = false; applyHighlight(r0, r1); btn.style.display = 'block'; });
+        return;
+    }
+    // Double-click on either chart: reset both axes and clear highlight
+    if (eventdata['xaxis.autorange'] === true || eventdata['xaxis2.autorange'] === true) {
+        resetAll();
+        return;
+    }
+    // Direct zoom on top chart: mirror to highlight on overview
+    var m0 = eventdata['xaxis.range[0]'];
+    var m1 = eventdata['xaxis.range[1]'];
+    if (m0 !== undefined && m1 !== undefined) {
+        zoomRange = [m0, m1];
+        applyHighlight(m0, m1);
+        btn.style.display = 'block';
+    }
+});
+
+// Reset Zoom button — reliable alternative to double-click
+var btn = document.createElement('button');
+btn.textContent = 'Reset Zoom';
+btn.style.cssText = 'position:absolute;top:8px;left:8px;z-index:999;padding:6px 14px;font-size:13px;font-weight:bold;color:#fff;background:#e63946;border:none;border-radius:4px;cursor:pointer;display:none;box-shadow:0 2px 6px rgba(0,0,0,0.3);';
+btn.addEventListener('click', resetAll);
+gd.style.position = 'relative';
+gd.appendChild(btn);
+"""
+
+OVERVIEW_ZOOM_JS = (
+    "\n(function(gd) {" + _OVERVIEW_ZOOM_BODY + "})(document.querySelector('.plotly-graph-div'));\n"
+)
+
+
+# ---------------------------------------------------------------------------
+# Offline dashboards (--dashboard)
+# ---------------------------------------------------------------------------
+
+PLOTLY_BUNDLE_NAME = "plotly.min.js"
+
+_DASHBOARD_JS = """
+var yaspeDashboard = (function() {
+var template = %(template)s;
+
+function load(id, spec) {
+    var gd = document.getElementById(id);
+    if (!gd) return;
+    gd.textContent = '';
+    var layout = spec.layout;
+    if (!layout.template) layout.template = template;
+    yaspeSharedData(spec.data).forEach(function(p) {
+        ['x', 'x0', 'dx', 'y'].forEach(function(key) {
+            if (spec.data[p[1]][key] !== undefined) spec.data[p[0]][key] = spec.data[p[1]][key];
+        });
+    });
+    Plotly.newPlot(gd, spec.data, layout, {responsive: true}).then(function() {
+        if (layout.xaxis2) yaspeOverviewZoom(gd);
+    });
+}
+
+function fetchChart(el) {
+    var s = document.createElement('script');
+    s.src = el.getAttribute('data-src');
+    s.onerror = function() { el.textContent = 'Could not load ' + s.src; };
+    document.body.appendChild(s);
+}
+
+// Data files are plain scripts (not fetch) so the page also works from file://
+document.addEventListener('DOMContentLoaded', function() {
+    var charts = Array.prototype.slice.call(document.querySelectorAll('.yaspe-chart'));
+    if (!('IntersectionObserver' in window)) { charts.forEach(fetchChart); return; }
+    var observer = new IntersectionObserver(function(entries) {
+        entries.forEach(function(e) {
+            if (e.isIntersecting) { observer.unobserve(e.target); fetchChart(e.target); }
+        });
+    }, {rootMargin: '400px 0px'});
+    charts.forEach(function(el) { observer.observe(el); });
+});
+
+return {load: load};
+})();
+
+function yaspeOverviewZoom(gd) {%(zoom)s}
+%(shared)s"""
+
+_DASHBOARD_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>%(title)s</title>
+<style>
+body { font-family: sans-serif; margin: 16px 24px; }
+nav { columns: 4; font-size: 13px; margin-bottom: 24px; }
+nav a { display: block; }
+.yaspe-chart { margin-bottom: 32px; color: grey; }
+</style>
+<script src="%(bundle)s"></script>
+<script>%(script)s</script>
+</head>
+<body>
+<h2>%(title)s</h2>
+<nav>
+%(nav)s
+</nav>
+%(charts)s
+</body>
+</html>
+"""
+
+
+def write_plotly_bundle(directory):
+    """Write plotly.min.js into directory and return its path.
+
+    Every dashboard (and the combined overlay) in a run references this one
+    local copy instead of the CDN, so the output also opens offline.
+    """
+    path = os.path.join(directory, PLOTLY_BUNDLE_NAME)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(get_plotlyjs())
+    return path
+
+
+def _src_path(path, start):
+    """Relative URL from directory start to path."""
+    return quote(os.path.relpath(path, start).replace(os.sep, "/"))
+
+
+class Dashboard:
+    """One index page holding all the charts of a source (mgstat, vmstat, an iostat device...).
+
+    Figures are added one at a time; each is written straight away to its own
+    small data script under <name>_data/, without the plotly template, which is
+    written once into the index page. write() then creates <name>.html, which
+    loads the shared plotly bundle and pulls in each chart's data script only
+    as the chart is scrolled into view.
+    """
+
+    def __init__(self, directory, name, title, bundle_path):
+        self.directory = directory
+        self.name = name
+        self.title = title
+        self.bundle_path = bundle_path
+        self.data_dir = os.path.join(directory, f"{name}_data")
+        self.template = None
+        self.charts = []  # (element id, chart title, data script path, height)
+
+    def add(self, fig, chart_id):
+        """Write fig's data script and register it on the page."""
+        spec = fig.to_plotly_json()
+        layout = spec["layout"]
+        template = layout.pop("template", None)
+        if self.template is None:
+            self.template = template
+        elif template is not None and template != self.template:
+            layout["template"] = template
+
+        element_id = f"chart-{len(self.charts)}"
+        os.makedirs(self.data_dir, exist_ok=True)
+        data_path = os.path.join(self.data_dir, f"{chart_id}.js")
+        with open(data_path, "w", encoding="utf-8") as f:
+            f.write(f"yaspeDashboard.load({json.dumps(element_id)}, {to_json_plotly(spec)});\n")
+
+        title = layout.get("title", {}).get("text") or chart_id
+        self.charts.append((element_id, title, data_path, layout.get("height", 650)))
+
+    def write(self):
+        """Write the index page. Returns its path, or None if no charts were added."""
+        if not self.charts:
+            return None
+        script = _DASHBOARD_JS % dict(
+            template=to_json_plotly(self.template or {}),
+            zoom=_OVERVIEW_ZOOM_BODY,
+            shared=_SHARED_DATA_FN,
+        )
+        nav = "\n".join(
+            f'<a href="#{element_id}">{html.escape(title)}</a>'
+            for element_id, title, _, _ in self.charts
+        )
+        charts = "\n".join(
+            f'<div class="yaspe-chart" id="{element_id}" style="height:{height}px" '
+            f'data-src="{_src_path(data_path, self.directory)}">Loading {html.escape(title)}...</div>'
+            for element_id, title, data_path, height in self.charts
+        )
+        path = os.path.join(self.directory, f"{self.name}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(_DASHBOARD_HTML % dict(
+                title=html.escape(self.title),
+                bundle=_src_path(self.bundle_path, self.directory),
+                script=script,
+                nav=nav,
+                charts=charts,
+            ))
+        return path
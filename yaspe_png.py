@@ -0,0 +1,76 @@
+# yaspe_png.py
+"""
+Matplotlib rendering for yaspe's PNG charts.
+
+The chart style and Agg settings are read once and applied to rcParams before
+each chart, a cheap dict update where plt.style.use re-reads the style sheet
+(other modules, such as chart_templates, set their own style in between).
+Figures are plain Figure objects on an Agg canvas (no pyplot figure manager),
+and single-axes figures are reused from one chart to the next. Charts are saved
+with Figure.savefig: pyplot.savefig draws the whole figure a second time after
+saving.
+"""
+
+import matplotlib as mpl
+from matplotlib import style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+
+STYLE = "seaborn-v0_8-whitegrid"
+
+AGG_RC = {
+    "path.simplify": True,
+    # Merge line segments that deviate by less than half a pixel: a day of 1-second
+    # samples is ~40 points per pixel column, so this drops nothing visible.
+    "path.simplify_threshold": 0.5,
+    # Render long lines in chunks of this many points
+    "agg.path.chunksize": 10000,
+}
+
+_SUBPLOT_PARAMS = ("left", "right", "bottom", "top", "wspace", "hspace")
+
+_rc = None
+_figures = {}  # figsize -> reusable single-axes Figure
+
+
+def use_style():
+    """Apply the chart style and Agg settings."""
+    global _rc
+    if _rc is None:
+        _rc = {**style.library[STYLE], **AGG_RC}
+    mpl.rcParams.update(_rc)
+
+
+def _new_figure(figsize):
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def figure(figsize=(16, 6), **subplots_kw):
+    """(fig, ax) to draw a chart on; pass nrows/ncols etc. for a grid of axes (fig, axes).
+
+    The single-axes figure for each figsize is reused: cleared, with the default
+    subplot layout restored. Grids get a new figure each time.
+    """
+    use_style()
+    figsize = tuple(figsize)
+    if subplots_kw:
+        fig = _new_figure(figsize)
+        return fig, fig.subplots(**subplots_kw)
+
+    fig = _figures.get(figsize)
+    if fig is None:
+        fig = _figures[figsize] = _new_figure(figsize)
+    else:
+        fig.clear()
+        fig.subplots_adjust(**{name: mpl.rcParams[f"figure.subplot.{name}"] for name in _SUBPLOT_PARAMS})
+    return fig, fig.add_subplot()
+
+
+def save(fig, path, dpi=150, tight=True):
+    """Write fig as a PNG. tight=True crops to the drawn artists (legends placed outside the axes),
+    tight=False keeps the figure size. The figure's artists are released afterwards."""
+    fig.savefig(path, format="png", dpi=dpi, bbox_inches="tight" if tight else None)
+    fig.clear()